@@ -0,0 +1,196 @@
+"""
+画面变化检测基准测试（合成画面，无需桌面）
+
+1. 探测开销：整屏画面缩小为探测画面、两张探测画面按块比较的耗时，以及按探测间隔折算的CPU占用
+   （Windows 下用 StretchBlt 直接抓取缩小画面，实际开销低于这里的整屏缩小）
+2. 模拟一段监控：长时间不动、滚动阅读长文档、逐字输入，比较固定间隔定时截图与变化检测截图：
+   截图张数，以及停留超过最短间隔的画面中有多少从未被截图
+
+示例：
+    python benchmarks/bench_change_probe.py
+    python benchmarks/bench_change_probe.py --minutes 60 --probe-interval 1
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+
+from change_detector import ChangeDetector, make_probe, changed_fraction
+
+SCREEN = (1920, 1080)
+
+
+def make_document(pages, seed):
+    """生成一份长文档画面：白底上的若干行"文字"（深色短条）"""
+    rng = random.Random(seed)
+    height = SCREEN[1] * pages
+    image = Image.new("RGB", (SCREEN[0], height), "white")
+    draw = ImageDraw.Draw(image)
+    y = 40
+    while y < height - 40:
+        x = 200
+        while x < SCREEN[0] - 300:
+            width = rng.randint(20, 120)
+            draw.rectangle((x, y, x + width, y + 14), fill=(rng.randint(0, 60),) * 3)
+            x += width + rng.randint(8, 16)
+        y += rng.choice([28, 28, 28, 60])
+    return image
+
+
+class SimulatedScreen:
+    """按时间线变化的屏幕：state 为当前画面的标识，frame() 返回当前整屏画面"""
+
+    def __init__(self, document):
+        self.document = document
+        self.scroll = 0
+        self.typed = 0
+        self.frame_cache = None
+
+    @property
+    def state(self):
+        return (self.scroll, self.typed)
+
+    def frame(self):
+        if self.frame_cache is None:
+            top = self.scroll
+            frame = self.document.crop((0, top, SCREEN[0], top + SCREEN[1]))
+            if self.typed:
+                draw = ImageDraw.Draw(frame)
+                # 逐字输入：在页面下方逐个出现的字符
+                for i in range(self.typed):
+                    x = 200 + (i % 100) * 15
+                    y = 700 + (i // 100) * 28
+                    draw.rectangle((x, y, x + 10, y + 14), fill="black")
+            self.frame_cache = frame
+        return self.frame_cache
+
+    def change(self, scroll=None, typed=None):
+        if scroll is not None:
+            self.scroll = scroll
+        if typed is not None:
+            self.typed = typed
+        self.frame_cache = None
+
+
+def generate_timeline(minutes, seed):
+    """生成 (时间, 滚动位置或None, 已输入字数或None) 的变化序列"""
+    rng = random.Random(seed)
+    events = []
+    t = 0.0
+    scroll = 0
+    typed = 0
+    end = minutes * 60
+    while t < end:
+        activity = rng.choice(["空闲", "阅读", "阅读", "输入"])
+        duration = rng.uniform(30, 180)
+        stop = min(end, t + duration)
+        if activity == "空闲":
+            t = stop
+        elif activity == "阅读":
+            while t < stop:
+                t += rng.uniform(3, 25)       # 阅读一屏
+                scroll = min(scroll + rng.randint(300, 900), SCREEN[1] * 7)
+                events.append((t, scroll, None))
+        else:
+            while t < stop:
+                t += rng.uniform(0.2, 0.6)    # 逐字输入
+                typed += 1
+                events.append((t, None, typed))
+    return [e for e in events if e[0] < end]
+
+
+def simulate(timeline, minutes, document, mode, probe_interval, min_interval, max_interval, threshold):
+    """返回 (截图张数, 被截图的画面集合, 画面停留时间表)"""
+    screen = SimulatedScreen(document)
+    now = [0.0]
+    captured_states = set()
+    captures = [0]
+
+    def capture(reason):
+        captures[0] += 1
+        captured_states.add(screen.state)
+
+    detector = ChangeDetector(lambda: make_probe(screen.frame()), capture, min_interval=min_interval,
+                              max_interval=max_interval, change_threshold=threshold, clock=lambda: now[0])
+    tick = probe_interval if mode == "change" else max_interval
+    next_tick = 0.0
+    dwell = {}
+    last_change = 0.0
+    index = 0
+    end = minutes * 60
+    while next_tick < end:
+        # 应用到 next_tick 为止的画面变化
+        while index < len(timeline) and timeline[index][0] <= next_tick:
+            t, scroll, typed = timeline[index]
+            dwell[screen.state] = dwell.get(screen.state, 0.0) + t - last_change
+            last_change = t
+            screen.change(scroll, typed)
+            index += 1
+        now[0] = next_tick
+        if mode == "change":
+            detector.check()
+        else:
+            capture("定时截图")
+        next_tick += tick
+    dwell[screen.state] = dwell.get(screen.state, 0.0) + end - last_change
+    return captures[0], captured_states, dwell, detector
+
+
+def main():
+    parser = argparse.ArgumentParser(description="画面变化检测基准测试")
+    parser.add_argument("--minutes", type=int, default=30, help="模拟的监控时长(分钟)")
+    parser.add_argument("--probe-interval", type=float, default=2.0, help="探测间隔(秒)")
+    parser.add_argument("--min-interval", type=float, default=10.0, help="两次截图的最短间隔(秒)")
+    parser.add_argument("--max-interval", type=float, default=60.0, help="最长截图间隔(秒)，即原定时截图间隔")
+    parser.add_argument("--threshold", type=float, default=0.1, help="触发截图的变化块比例")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    document = make_document(8, args.seed)
+
+    # 探测开销
+    frames = [document.crop((0, y, SCREEN[0], y + SCREEN[1])) for y in range(0, 4000, 400)]
+    start = time.perf_counter()
+    probes = [make_probe(frame) for frame in frames]
+    reduce_ms = (time.perf_counter() - start) / len(frames) * 1000
+    start = time.perf_counter()
+    for _ in range(50):
+        for a, b in zip(probes, probes[1:]):
+            changed_fraction(a, b)
+    compare_ms = (time.perf_counter() - start) / (50 * (len(probes) - 1)) * 1000
+    cpu = (reduce_ms + compare_ms) / (args.probe_interval * 1000)
+    print(f"探测开销:   整屏缩小 {reduce_ms:.2f} ms，按块比较 {compare_ms:.3f} ms，"
+          f"每 {args.probe_interval:g} 秒一次约占 {cpu:.2%} CPU（单核）")
+
+    timeline = generate_timeline(args.minutes, args.seed)
+    results = {}
+    for mode in ("timer", "change"):
+        results[mode] = simulate(timeline, args.minutes, document, mode, args.probe_interval,
+                                 args.min_interval, args.max_interval, args.threshold)
+
+    for mode, label in (("timer", "固定定时"), ("change", "变化检测")):
+        count, captured_states, dwell, detector = results[mode]
+        visible = [state for state, seconds in dwell.items() if seconds >= args.min_interval]
+        missed = sum(1 for state in visible if state not in captured_states)
+        extra = ""
+        if mode == "change":
+            stats = detector.stats()
+            extra = f"（内容变化 {stats['change_captures']} 张，最长间隔 {stats['forced_captures']} 张，探测 {stats['probes']} 次）"
+        print(f"{label}:   截图 {count:4d} 张{extra}，停留≥{args.min_interval:g}秒的画面 {len(visible)} 个，"
+              f"未截到 {missed} 个")
+
+    timer_missed = sum(1 for s, d in results["timer"][2].items() if d >= args.min_interval and s not in results["timer"][1])
+    change_missed = sum(1 for s, d in results["change"][2].items() if d >= args.min_interval and s not in results["change"][1])
+    ok = cpu < 0.01 and change_missed < timer_missed
+    print("核对: " + ("探测开销低于1% CPU，变化检测漏截的画面更少" if ok else "探测开销或漏截画面数不符合预期"))
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
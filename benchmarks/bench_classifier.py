@@ -0,0 +1,99 @@
+"""
+操作类型分类基准测试
+
+先用原有的逐类别扫描逻辑作为基准，对映射中的全部模式及其变形
+（加前缀/后缀、去掉通配符、真实事件详情等）逐条核对预编译分类器的结果，
+再比较两者每次分类的耗时。
+
+示例：
+    python benchmarks/bench_classifier.py
+    python benchmarks/bench_classifier.py --events 200000
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_logger import OPERATION_MAPPING
+from event_sources import generate_events
+from operation_classifier import OperationClassifier
+
+
+def legacy_classify(operation_detail):
+    """原 log_window_event 中的逐类别扫描逻辑（作为基准）"""
+    operation_type = "其他"  # 默认操作类型
+    for op_type, patterns in OPERATION_MAPPING.items():
+        if operation_detail in patterns:
+            operation_type = op_type
+            break
+        elif any(operation_detail.startswith(p.replace('*', '')) for p in patterns if '*' in p):
+            operation_type = op_type
+            break
+        elif any(pattern in operation_detail for pattern in patterns if '*' not in pattern):
+            operation_type = op_type
+    return operation_type
+
+
+def golden_inputs():
+    """构造核对用的操作详情"""
+    inputs = set()
+    for patterns in OPERATION_MAPPING.values():
+        for pattern in patterns:
+            stripped = pattern.replace('*', '')
+            inputs.update([
+                pattern, stripped, stripped + "abc", "前缀" + pattern, pattern + "后缀",
+                pattern[:-1], pattern + pattern, pattern.replace("：", ":"),
+            ])
+    # 组合不同类别的模式，检查优先级
+    all_patterns = [p for patterns in OPERATION_MAPPING.values() for p in patterns]
+    for a in all_patterns:
+        for b in all_patterns:
+            inputs.add(a.replace('*', '') + b)
+    inputs.update([
+        "", "键盘-输入：你好，世界！", "键盘-特殊键：回车", "键盘-特殊键：退格", "键盘-特殊键：删除",
+        "键盘-特殊键：f5", "窗口-切换至：百度一下 - Google Chrome", "窗口-状态：MINIMIZED",
+        "截图：内容变化", "鼠标-单击：中键", "鼠标-滚轮：向下滑动（12格，0.8秒）",
+    ])
+    inputs.update(event["detail"] for event in generate_events(2000, seed=1))
+    return sorted(inputs)
+
+
+def time_per_call(func, details, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for detail in details:
+            func(detail)
+    return (time.perf_counter() - start) / (repeat * len(details)) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description="操作类型分类基准测试")
+    parser.add_argument("--events", type=int, default=50000, help="计时用的合成事件数")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数")
+    args = parser.parse_args()
+
+    classifier = OperationClassifier(OPERATION_MAPPING)
+    inputs = golden_inputs()
+    mismatches = [(d, legacy_classify(d), classifier.classify(d)) for d in inputs
+                  if legacy_classify(d) != classifier.classify(d)]
+    print(f"核对 {len(inputs)} 条操作详情：" + ("全部一致" if not mismatches else f"{len(mismatches)} 条不一致"))
+    for detail, expected, actual in mismatches[:20]:
+        print(f"  {detail!r}: 原逻辑={expected} 分类器={actual}")
+
+    details = [event["detail"] for event in generate_events(args.events, seed=0)]
+    legacy_ns = time_per_call(legacy_classify, details, args.repeat)
+    fresh = OperationClassifier(OPERATION_MAPPING, cache_size=0)
+    uncached_ns = time_per_call(fresh.classify, details, args.repeat)
+    cached_ns = time_per_call(classifier.classify, details, args.repeat)
+    print(f"原逐类别扫描:     {legacy_ns:8.0f} ns/次")
+    print(f"预编译(无缓存):   {uncached_ns:8.0f} ns/次")
+    print(f"预编译(带缓存):   {cached_ns:8.0f} ns/次  {classifier.cache_info()}")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
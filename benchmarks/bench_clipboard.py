@@ -0,0 +1,186 @@
+"""
+剪贴板采集基准测试（模拟的慢速剪贴板，无需 pyperclip）
+
+模拟一段复制/粘贴操作：剪贴板每次读取耗时若干毫秒，偶尔读取失败需要重试，
+粘贴内容多为重复文本。比较原先在钩子线程中同步读取（失败时重试3次、每次等待0.1秒）
+与后台读取线程：钩子线程中每个事件的耗时，以及按内容哈希保存的文件数和字节数，
+并核对每条记录的哈希都能读回完整的剪贴板内容。
+另外在复制/粘贴之间连续输入文字（不等待后台读取），核对剪贴板记录虽然晚于其后的输入记录输出，
+时间戳仍是操作发生时的时间，按时间戳排序后与操作顺序一致。
+
+示例：
+    python benchmarks/bench_clipboard.py
+    python benchmarks/bench_clipboard.py --events 500 --read-ms 30 --fail-rate 0.2
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_logger import EventLogger
+from clipboard_capture import ClipboardCapture, ClipboardStore, format_clipboard
+from window_info import ForegroundWindow
+
+WINDOW = ForegroundWindow(1, "考试系统 - Microsoft Edge", "msedge.exe")
+
+
+class SlowClipboard:
+    """模拟剪贴板：每次读取耗时 read_ms 毫秒，按 fail_rate 的概率抛出异常"""
+
+    def __init__(self, read_ms, fail_rate, seed):
+        self.read_ms = read_ms
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+        self.text = ""
+
+    def paste(self):
+        time.sleep(self.read_ms / 1000)
+        if self.rng.random() < self.fail_rate:
+            raise RuntimeError("剪贴板被其他程序占用")
+        return self.text
+
+
+def legacy_reader(clipboard):
+    """原实现：失败时重试3次，每次等待0.1秒"""
+    def read():
+        clip_text = None
+        for _ in range(3):
+            try:
+                clip_text = clipboard.paste()
+                if clip_text is not None:
+                    break
+            except RuntimeError:
+                time.sleep(0.1)
+                clip_text = None
+        return clip_text
+    return read
+
+
+def generate_operations(events, seed):
+    """生成 (操作详情, 剪贴板文本) 序列：少量不同文本被反复粘贴"""
+    rng = random.Random(seed)
+    texts = ["".join(rng.choice("剪贴板内容abcdefg ") for _ in range(rng.randint(5, 3000)))
+             for _ in range(max(1, events // 10))]
+    operations = []
+    text = texts[0]
+    for _ in range(events):
+        if rng.random() < 0.2:
+            text = rng.choice(texts)
+            operations.append(("键盘-组合键：Ctrl+C", text))
+        else:
+            operations.append(("键盘-组合键：Ctrl+V", text))
+    return operations
+
+
+def run(operations, clipboard, asynchronous, folder):
+    rows = []
+    capture = None
+    if asynchronous:
+        capture = ClipboardCapture(clipboard.paste, rows.append, store=ClipboardStore(folder),
+                                   timeout=0.5, retry_interval=0.05)
+        capture.start()
+        logger = EventLogger(rows.append, clipboard_capture=capture)
+    else:
+        logger = EventLogger(rows.append, clipboard_reader=legacy_reader(clipboard))
+    hook_times = []
+    for index, (detail, text) in enumerate(operations):
+        clipboard.text = text
+        start = time.perf_counter()
+        logger.log_event(WINDOW, detail)
+        hook_times.append(time.perf_counter() - start)
+        if capture is not None:
+            # 模拟两次操作之间的间隔，使后台线程读取到与本次操作对应的剪贴板内容
+            while len(rows) <= index:
+                time.sleep(0.001)
+    if capture is not None:
+        capture.stop()
+        return rows, hook_times, capture.stats()
+    return rows, hook_times, None
+
+
+def run_interleaved(operations, clipboard, folder):
+    """
+    每次复制/粘贴后立即记录一条输入事件，不等待后台读取
+    返回 (按输出顺序的记录, 按操作顺序的操作详情)
+    """
+    rows = []
+    capture = ClipboardCapture(clipboard.paste, rows.append, store=ClipboardStore(folder),
+                               timeout=0.5, retry_interval=0.05)
+    capture.start()
+    logger = EventLogger(rows.append, clipboard_capture=capture)
+    expected = []
+    for index, (detail, text) in enumerate(operations):
+        clipboard.text = text
+        logger.log_event(WINDOW, detail)
+        logger.log_event(WINDOW, f"键盘-输入：{index}")
+        expected.extend([detail, f"键盘-输入：{index}"])
+    capture.stop()
+    return rows, expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="剪贴板采集基准测试")
+    parser.add_argument("--events", type=int, default=200, help="复制/粘贴操作次数")
+    parser.add_argument("--read-ms", type=float, default=15.0, help="每次读取剪贴板的耗时(毫秒)")
+    parser.add_argument("--fail-rate", type=float, default=0.1, help="读取失败的概率")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    operations = generate_operations(args.events, args.seed)
+    folder = tempfile.mkdtemp(prefix="ubc_clipboard_")
+
+    legacy_rows, legacy_times, _ = run(operations, SlowClipboard(args.read_ms, args.fail_rate, args.seed),
+                                       False, folder)
+    rows, hook_times, stats = run(operations, SlowClipboard(args.read_ms, args.fail_rate, args.seed),
+                                  True, folder)
+    late_rows, late_expected = run_interleaved(operations[:50], SlowClipboard(args.read_ms, 0.0, args.seed),
+                                               folder)
+
+    # 核对：每次读取成功的记录都带有哈希，保存的全文与操作时的剪贴板内容一致
+    store = ClipboardStore(folder)
+    ok = len(rows) == len(operations)
+    for record, (_, text) in zip(rows, operations):
+        if record.clipboard.startswith("无法获取剪贴板内容"):
+            continue
+        key = record.clipboard.rsplit("[sha256:", 1)[1].rstrip("]")
+        ok = ok and record.clipboard == format_clipboard(text, WINDOW.core_title, key) and store.read(key) == text
+
+    # 核对：剪贴板记录晚于其后的输入记录输出，但按时间戳排序后与操作顺序一致
+    late = 0
+    newest = 0
+    for record in late_rows:
+        if record.timestamp_ns < newest:
+            late += 1   # 输出时已有更晚发生的事件先输出
+        newest = max(newest, record.timestamp_ns)
+    by_time = [record.detail for record in sorted(late_rows, key=lambda record: record.timestamp_ns)]
+    order_ok = late > 0 and by_time == late_expected and all(record.clipboard for record in late_rows
+                                                if not record.detail.startswith("键盘-输入"))
+    inline_bytes = sum(len(r.clipboard.encode("utf-8")) for r in legacy_rows)
+    full_bytes = sum(len(text.encode("utf-8")) for _, text in operations)
+
+    def describe(times):
+        times = sorted(times)
+        return (f"平均 {sum(times) / len(times) * 1000:7.3f} ms，"
+                f"p99 {times[int(len(times) * 0.99) - 1] * 1000:7.3f} ms，最大 {times[-1] * 1000:7.3f} ms")
+
+    print(f"复制/粘贴:  {len(operations)} 次，剪贴板读取 {args.read_ms:g} ms，失败率 {args.fail_rate:.0%}")
+    print(f"同步读取:   钩子线程 {describe(legacy_times)}")
+    print(f"后台读取:   钩子线程 {describe(hook_times)}")
+    print(f"后台线程:   读取 {stats['captured']} 次，失败 {stats['failed']} 次，平均 {stats['avg_read_ms']:.1f} ms，"
+          f"最长 {stats['max_read_ms']:.1f} ms")
+    print(f"内容保存:   {stats['stored']} 份 {stats['bytes_written']} 字节，重复 {stats['reused']} 次"
+          f"（全部内容共 {full_bytes} 字节，CSV内联预览 {inline_bytes} 字节）")
+    print(f"输出顺序:   连续输入时 {len(late_rows)} 条记录中 {late} 条剪贴板记录晚于其后的输入记录输出")
+    print("核对: " + ("记录完整，哈希均可读回原文" if ok else "记录或保存内容不一致"))
+    print("核对: " + ("剪贴板记录保留操作时的时间戳，按时间戳排序与操作顺序一致" if order_ok
+                     else "按时间戳排序与操作顺序不一致"))
+    if not ok or not order_ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
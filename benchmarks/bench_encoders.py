@@ -0,0 +1,130 @@
+"""
+截图编码基准测试
+
+对样本画面分别使用不同的格式、质量和最大边长进行编码，
+统计每帧编码耗时和文件大小，用于按机器配置选择截图编码设置。
+
+示例：
+    python benchmarks/bench_encoders.py                       # 合成样本画面 1920x1080
+    python benchmarks/bench_encoders.py --width 3840 --height 2160
+    python benchmarks/bench_encoders.py --images D:/samples    # 使用真实截图
+"""
+import io
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+
+from screenshot_pipeline import EncodeProfile
+
+# 待比较的编码设置
+CANDIDATE_PROFILES = [
+    EncodeProfile("PNG", compress_level=6),
+    EncodeProfile("PNG", compress_level=1),
+    EncodeProfile("PNG", compress_level=1, max_dimension=1920),
+    EncodeProfile("WEBP", quality=None, method=0),
+    EncodeProfile("WEBP", quality=80, method=4),
+    EncodeProfile("WEBP", quality=75, method=0, max_dimension=1920),
+    EncodeProfile("WEBP", quality=60, method=0, max_dimension=1280),
+    EncodeProfile("JPEG", quality=85),
+    EncodeProfile("JPEG", quality=75, max_dimension=1920),
+    EncodeProfile("JPEG", quality=60, max_dimension=1280),
+]
+
+
+def make_document_frame(width, height, seed=0):
+    """合成文档类画面：白底黑字"""
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, width, 40), fill=(43, 87, 154))
+    for y in range(60, height - 20, 22):
+        words = " ".join("".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 9)))
+                         for _ in range(rng.randint(3, width // 60)))
+        draw.text((40, y), words, fill="black")
+    return image
+
+
+def make_ui_frame(width, height, seed=0):
+    """合成应用界面类画面：色块、按钮和少量文字"""
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width, height), (240, 240, 240))
+    draw = ImageDraw.Draw(image)
+    for _ in range(60):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        x1, y1 = x0 + rng.randint(40, 400), y0 + rng.randint(20, 200)
+        color = tuple(rng.randint(80, 255) for _ in range(3))
+        draw.rectangle((x0, y0, x1, y1), fill=color, outline="black")
+        draw.text((x0 + 5, y0 + 5), f"按钮{rng.randint(1, 99)} Button", fill="black")
+    return image
+
+
+def make_photo_frame(width, height, seed=0):
+    """合成图片/视频类画面：渐变叠加噪声"""
+    gradient = Image.linear_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 40)
+    return Image.merge("RGB", (gradient, noise, gradient.transpose(Image.FLIP_LEFT_RIGHT)))
+
+
+def load_sample_frames(args):
+    """读取样本画面，返回 [(名称, 画面)]"""
+    if args.images:
+        frames = []
+        for filename in sorted(os.listdir(args.images)):
+            if filename.lower().endswith((".png", ".jpg", ".jpeg", ".bmp", ".webp")):
+                image = Image.open(os.path.join(args.images, filename))
+                image.load()
+                frames.append((filename, image.convert("RGB")))
+        return frames
+    return [
+        ("document", make_document_frame(args.width, args.height)),
+        ("ui", make_ui_frame(args.width, args.height)),
+        ("photo", make_photo_frame(args.width, args.height)),
+    ]
+
+
+def bench_profile(profile, image, repeat):
+    """返回 (平均编码毫秒数, 字节数)"""
+    size = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        buffer = io.BytesIO()
+        profile.encode(image, buffer)
+        size = buffer.tell()
+    return (time.perf_counter() - start) / repeat * 1000, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="截图编码基准测试")
+    parser.add_argument("--images", help="样本截图所在文件夹，不指定则使用合成画面")
+    parser.add_argument("--width", type=int, default=1920, help="合成画面宽度")
+    parser.add_argument("--height", type=int, default=1080, help="合成画面高度")
+    parser.add_argument("--repeat", type=int, default=3, help="每种设置重复编码次数")
+    args = parser.parse_args()
+
+    frames = load_sample_frames(args)
+    if not frames:
+        print("没有找到样本画面")
+        return
+
+    print(f"{'编码设置':<32}{'样本':<16}{'耗时(ms)':>10}{'大小(KB)':>12}{'压缩比':>10}")
+    for profile in CANDIDATE_PROFILES:
+        total_ms = total_bytes = 0
+        for name, image in frames:
+            ms, size = bench_profile(profile, image, args.repeat)
+            raw_size = image.size[0] * image.size[1] * 3
+            total_ms += ms
+            total_bytes += size
+            print(f"{profile.describe():<32}{name[:15]:<16}{ms:>10.1f}{size / 1024:>12.1f}{raw_size / size:>10.1f}")
+        print(f"{profile.describe():<32}{'平均':<16}{total_ms / len(frames):>10.1f}"
+              f"{total_bytes / len(frames) / 1024:>12.1f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+有界事件队列基准测试（无需Windows桌面，可在Linux下无界面运行）
+
+模拟写入停滞（U盘或网络驱动器卡顿）：写入线程的输出端在一段时间内阻塞，
+期间钩子线程持续送入连续输入、滚轮、点击、窗口切换和剪贴板事件。
+比较无上限队列与有界事件队列的最大队列长度和放入耗时，并核对：
+窗口切换和剪贴板事件全部写入，合并和丢弃的条数与标记行中的计数一致，输入的文字在合并后没有丢失。
+
+示例：
+    python benchmarks/bench_event_queue.py
+    python benchmarks/bench_event_queue.py --stall 3 --queue-size 500
+"""
+import os
+import re
+import sys
+import time
+import queue
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_queue import BoundedEventQueue
+from event_logger import EventLogger
+from event_writer import EventWriter
+from input_coalescer import format_scroll_summary
+from window_info import ForegroundWindow
+
+WINDOWS = [ForegroundWindow(1, "文档1.docx - Word", "WINWORD.EXE"),
+           ForegroundWindow(2, "考试系统 - Microsoft Edge", "msedge.exe")]
+
+
+class StallingSink:
+    """内存输出端：stall_until 之前每次写入都阻塞到该时刻"""
+
+    kind = "memory"
+
+    def __init__(self, stall_until):
+        self.stall_until = stall_until
+        self.rows = []
+
+    def write_rows(self, records):
+        delay = self.stall_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self.rows.extend(records)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def generate_events(count, seed):
+    """生成 (窗口, 操作详情) 序列：大部分为连续输入和连续滚动，夹杂点击、窗口切换和复制粘贴"""
+    rng = random.Random(seed)
+    events = []
+    window = WINDOWS[0]
+    while len(events) < count:
+        r = rng.random()
+        if r < 0.45:
+            for _ in range(rng.randint(5, 30)):
+                events.append((window, f"键盘-输入：{rng.choice('abcdefg')}"))
+        elif r < 0.75:
+            for _ in range(rng.randint(3, 20)):
+                events.append((window, format_scroll_summary("向下", 1, 0.1, -1)))
+        elif r < 0.9:
+            events.append((window, "鼠标-单击：左键"))
+        elif r < 0.95:
+            window = WINDOWS[1] if window is WINDOWS[0] else WINDOWS[0]
+            events.append((window, f"窗口-切换至：{window.title}"))
+        else:
+            events.append((window, rng.choice(["键盘-组合键：Ctrl+C", "键盘-组合键：Ctrl+V"])))
+    return events[:count]
+
+
+def run(events, data_queue, stall, rate):
+    """在写入停滞期间按速率送入事件，返回 (写入的记录, 最大队列长度, 最长放入耗时 ms)"""
+    sink = StallingSink(time.monotonic() + stall)
+    writer = EventWriter(data_queue, [sink], batch_size=100, flush_interval=0.2)
+    writer.start()
+    logger = EventLogger(writer.put, clipboard_reader=lambda: "复制的文字")
+    max_depth = 0
+    max_put = 0.0
+    start = time.monotonic()
+    for i, (window, detail) in enumerate(events):
+        # 按速率送入
+        delay = start + i / rate - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        t = time.perf_counter()
+        logger.log_event(window, detail)
+        max_put = max(max_put, time.perf_counter() - t)
+        max_depth = max(max_depth, data_queue.qsize())
+    writer.stop(timeout=stall + 30)
+    return sink.rows, max_depth, max_put * 1000
+
+
+def parse_markers(rows):
+    """从标记行中汇总 {类别: [合并数, 丢弃数]}"""
+    losses = {}
+    for record in rows:
+        if not record.detail.startswith("事件队列-丢失："):
+            continue
+        body = record.detail[len("事件队列-丢失："):].split("（")[0]
+        for part in body.split("；"):
+            name, counts = part.split(" ", 1)
+            coalesced = re.search(r"合并(\d+)条", counts)
+            dropped = re.search(r"丢弃(\d+)条", counts)
+            entry = losses.setdefault(name, [0, 0])
+            entry[0] += int(coalesced.group(1)) if coalesced else 0
+            entry[1] += int(dropped.group(1)) if dropped else 0
+    return losses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="有界事件队列基准测试")
+    parser.add_argument("--events", type=int, default=20000, help="事件数")
+    parser.add_argument("--rate", type=int, default=5000, help="每秒送入的事件数")
+    parser.add_argument("--stall", type=float, default=2.0, help="写入停滞时长(秒)")
+    parser.add_argument("--queue-size", type=int, default=1000, help="有界队列上限")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    events = generate_events(args.events, args.seed)
+    _, unbounded_depth, unbounded_put = run(events, queue.Queue(), args.stall, args.rate)
+    bounded = BoundedEventQueue(maxsize=args.queue_size)
+    rows, bounded_depth, bounded_put = run(events, bounded, args.stall, args.rate)
+    stats = bounded.stats()
+
+    print(f"写入停滞:   {args.stall:g} 秒，送入 {len(events)} 条事件（每秒 {args.rate} 条）")
+    print(f"无上限队列: 最大长度 {unbounded_depth}，最长放入 {unbounded_put:.2f} ms")
+    print(f"有界队列:   最大长度 {bounded_depth}（上限 {args.queue_size}），最长放入 {bounded_put:.2f} ms，"
+          f"合并 {stats['coalesced']} 条，丢弃 {stats['dropped']} 条，标记行 {stats['markers']} 行")
+
+    # 核对
+    written = [r for r in rows if not r.detail.startswith("事件队列-丢失：")]
+    kept = lambda details: sum(1 for d in details if d.startswith("窗口-") or "Ctrl+C" in d or "Ctrl+V" in d)
+    kept_ok = kept(d for _, d in events) == kept(r.detail for r in written)
+    losses = parse_markers(rows)
+    coalesced = sum(c for c, _ in losses.values())
+    dropped = sum(d for _, d in losses.values())
+    accounted = len(written) + coalesced + dropped == len(events)
+    typed = sum(1 for _, d in events if d.startswith("键盘-输入："))
+    typed_written = sum(len(r.detail) - len("键盘-输入：") for r in written if r.detail.startswith("键盘-输入："))
+    text_ok = typed_written + losses.get("键盘-输入", [0, 0])[1] == typed
+    ok = (kept_ok and accounted and text_ok and coalesced == stats["coalesced"] and dropped == stats["dropped"]
+          and bounded_depth <= args.queue_size + stats["over_bound"])
+    print(f"标记行计数: 合并 {coalesced} 条，丢弃 {dropped} 条；写入 {len(written)} 条 + 丢失 {coalesced + dropped} 条"
+          f" = {len(written) + coalesced + dropped} 条")
+    print("核对: " + ("窗口切换和剪贴板事件全部写入，丢失条数均记录在标记行中" if ok else "写入结果与标记行不符合预期"))
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
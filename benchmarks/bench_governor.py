@@ -0,0 +1,103 @@
+"""
+负载自适应采集基准测试
+
+1. 用合成的负载曲线（平稳、考试软件短时占满CPU、长时间高负载、在阈值附近抖动）驱动
+   采集配置调节器，比较带迟滞（连续多次采样才切换、降级和恢复阈值不同）与单阈值立即切换：
+   配置切换次数和各配置所占的时间比例
+2. 测量一次 psutil 采样的耗时
+
+示例：
+    python benchmarks/bench_governor.py
+    python benchmarks/bench_governor.py --minutes 120 --interval 5
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capture_governor import CaptureProfile, CaptureGovernor, SystemSampler
+
+PROFILES = [CaptureProfile("正常"), CaptureProfile("节能", screenshot_interval=120),
+            CaptureProfile("最低", screenshot_interval=300)]
+
+
+def generate_load(samples, seed):
+    """生成系统CPU占用序列(%)"""
+    rng = random.Random(seed)
+    load = []
+    while len(load) < samples:
+        phase = rng.choice(["平稳", "尖峰", "高负载", "抖动"])
+        length = rng.randint(10, 60)
+        for i in range(length):
+            if phase == "平稳":
+                cpu = rng.uniform(10, 35)
+            elif phase == "尖峰":
+                cpu = 95 if i < 2 else rng.uniform(15, 35)
+            elif phase == "高负载":
+                cpu = rng.uniform(80, 100)
+            else:
+                cpu = rng.uniform(60, 85)
+            load.append(cpu)
+    return load[:samples]
+
+
+def run(governor, load):
+    """按负载序列驱动调节器，返回各配置的采样次数"""
+    levels = [0] * len(PROFILES)
+    last_level = 0
+    ok = True
+    for cpu in load:
+        governor.update({"cpu": cpu, "process_cpu": 2.0, "memory": 50.0, "process_memory_mb": 80.0})
+        ok = ok and abs(governor.level - last_level) <= 1
+        last_level = governor.level
+        levels[governor.level] += 1
+    return levels, ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="负载自适应采集基准测试")
+    parser.add_argument("--minutes", type=int, default=90, help="模拟的监控时长(分钟)")
+    parser.add_argument("--interval", type=float, default=5.0, help="采样间隔(秒)")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    load = generate_load(int(args.minutes * 60 / args.interval), args.seed)
+    naive = CaptureGovernor(PROFILES, None, cpu_high=75.0, cpu_low=75.0 - 1e-9,
+                            degrade_samples=1, recover_samples=1)
+    governor = CaptureGovernor(PROFILES, None)
+    naive_levels, _ = run(naive, load)
+    levels, ok = run(governor, load)
+
+    def describe(levels):
+        return "，".join(f"{p.name} {n / len(load):.0%}" for p, n in zip(PROFILES, levels))
+
+    print(f"负载曲线:   {len(load)} 次采样（{args.minutes} 分钟，每 {args.interval:g} 秒）")
+    print(f"单阈值:     切换 {naive.changes:4d} 次（{describe(naive_levels)}）")
+    print(f"迟滞切换:   切换 {governor.changes:4d} 次（{describe(levels)}）")
+
+    # 持续高负载时降到最低配置，负载回落后恢复正常配置
+    check = CaptureGovernor(PROFILES, None)
+    high = {"cpu": 95.0, "process_cpu": 2.0, "memory": 50.0}
+    low = {"cpu": 10.0, "process_cpu": 1.0, "memory": 50.0}
+    for _ in range(10):
+        check.update(high)
+    degraded = check.level == len(PROFILES) - 1
+    for _ in range(20):
+        check.update(low)
+    ok = ok and degraded and check.level == 0 and governor.changes < naive.changes
+
+    sampler = SystemSampler()
+    start = time.perf_counter()
+    for _ in range(200):
+        sampler.sample()
+    print(f"psutil采样: {(time.perf_counter() - start) / 200 * 1e6:.0f} µs/次")
+    print("核对: " + ("每次只切换一级，持续高负载时降到最低配置并能恢复" if ok else "切换结果不符合预期"))
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+崩溃恢复日志基准测试
+
+1. 在子进程中运行完整管线（大批量写入），写入一部分事件后直接结束进程，
+   模拟强制结束/断电；再用恢复流程补写，核对CSV分段和SQLite中的记录
+   与子进程送入写入线程的事件逐条一致、无重复；恢复日志在落盘后改写，只保留最后落盘之后的事件。
+2. 比较开启/关闭恢复日志时的吞吐量。
+
+示例：
+    python benchmarks/bench_journal.py
+    python benchmarks/bench_journal.py --events 50000 --kill-after 30000
+"""
+import os
+import sys
+import json
+import time
+import queue
+import sqlite3
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_writer import EventWriter
+from event_logger import EventLogger
+from event_record import CsvRowFormatter
+from event_sources import generate_events
+from event_journal import EventJournal, journal_path, scan_journal, recover_journal
+from csv_segments import RotatingCsvSink, iter_session_rows
+from sqlite_store import SqliteSink
+from bench_support import ReplayPipeline
+
+CSV_HEADER = ",".join(CsvRowFormatter.HEADER) + "\r\n"
+
+
+def open_sinks(folder, sqlite=True):
+    csv_filepath = os.path.join(folder, "bench.csv")
+    if not os.path.exists(csv_filepath):
+        with open(csv_filepath, 'w', newline='', encoding='utf-8-sig') as f:
+            f.write(CSV_HEADER)
+    formatter = CsvRowFormatter("20230001", "测试", folder)
+    sinks = [RotatingCsvSink(csv_filepath, formatter, max_bytes=256 * 1024)]
+    if sqlite:
+        sinks.append(SqliteSink(os.path.join(folder, "bench.db"), "20230001", "测试", folder))
+    return csv_filepath, sinks
+
+
+def run_pipeline(folder, events, batch_size, flush_interval, journal=True, kill_after=None, fsync_interval=5.0):
+    """运行管线；kill_after 不为空时写入该数量的事件后直接结束进程"""
+    csv_filepath, sinks = open_sinks(folder)
+    event_journal = EventJournal(journal_path(csv_filepath), {"csv_filepath": csv_filepath},
+                                 fsync_interval=fsync_interval) if journal else None
+    writer = EventWriter(queue.Queue(), sinks, batch_size=batch_size, flush_interval=flush_interval,
+                         journal=event_journal)
+    if kill_after is not None:
+        events = events[:kill_after]
+    pipeline = ReplayPipeline(events, lambda window, detail: event_logger.log_event(window, detail),
+                              record_latency=False)
+    emitted = []
+
+    def emit(record):
+        if kill_after is not None:
+            emitted.append(record.detail)
+        writer.put(record)
+
+    event_logger = EventLogger(emit, clipboard_reader=pipeline.read_clipboard)
+    writer.start()
+    start = time.perf_counter()
+    pipeline.run()
+    if kill_after is not None:
+        # 等待写入线程取走队列中的事件（写入日志），记下送入的事件后不经 stop 直接结束进程
+        while not writer.data_queue.empty():
+            time.sleep(0.01)
+        time.sleep(0.1)
+        with open(os.path.join(folder, "emitted.json"), 'w', encoding='utf-8') as f:
+            json.dump(emitted, f, ensure_ascii=False)
+        os._exit(9)
+    writer.stop(timeout=60)
+    return time.perf_counter() - start
+
+
+def check_recovery(folder, events, kill_after, batch_size):
+    """子进程中途结束后恢复并核对"""
+    child = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", folder,
+                            "--events", str(len(events)), "--kill-after", str(kill_after),
+                            "--batch-size", str(batch_size)])
+    csv_filepath = os.path.join(folder, "bench.csv")
+    path = journal_path(csv_filepath)
+    _, checkpoints, journaled, closed = scan_journal(path)
+    with open(os.path.join(folder, "emitted.json"), encoding='utf-8') as f:
+        expected = json.load(f)
+    before = sum(1 for _ in iter_session_rows(folder)) - 1
+    print(f"子进程退出码 {child.returncode}：送入 {len(expected)} 条事件，日志中保留 {journaled} 条事件、"
+          f"{len(checkpoints)} 个检查点（{os.path.getsize(path)} 字节），CSV中已有 {before} 行")
+
+    _, sinks = open_sinks(folder)
+    replayed = recover_journal(path, sinks)
+    rows = list(iter_session_rows(folder))[1:]
+    details = [row[4] for row in rows]
+    conn = sqlite3.connect(os.path.join(folder, "bench.db"))
+    db_details = [row[0] for row in conn.execute("SELECT detail FROM events ORDER BY id")]
+    conn.close()
+    ok = details == expected and db_details == expected and not os.path.exists(path)
+    print(f"恢复后补写 {replayed} 条：CSV {len(details)} 行，SQLite {len(db_details)} 行，"
+          f"与送入的事件{'一致' if ok else '不一致'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="崩溃恢复日志基准测试")
+    parser.add_argument("--events", type=int, default=20000, help="合成事件数")
+    parser.add_argument("--kill-after", type=int, default=12345, help="写入该数量的事件后结束子进程")
+    parser.add_argument("--batch-size", type=int, default=1000, help="写入线程批量大小")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    events = generate_events(args.events, seed=0)
+    if args.child:
+        # 缩短落盘间隔，使结束进程前日志已改写过多次
+        run_pipeline(args.child, events, args.batch_size, 5.0, kill_after=args.kill_after, fsync_interval=0.05)
+        return
+
+    ok = check_recovery(tempfile.mkdtemp(prefix="ubc_journal_"), events, args.kill_after, args.batch_size)
+
+    for journal in (False, True):
+        elapsed = run_pipeline(tempfile.mkdtemp(prefix="ubc_journal_"), events, args.batch_size, 5.0,
+                               journal=journal)
+        print(f"恢复日志{'开启' if journal else '关闭'}: {len(events) / elapsed:8.0f} 事件/秒")
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+键盘输入合并基准测试（无需键盘钩子）
+
+1. 模拟打字：按突发输入若干单词，单词间停顿超过空闲时间，核对每个单词恰好提交为一条
+   "键盘-输入"记录，并统计定时线程的唤醒次数（原实现每秒固定唤醒10次）。
+2. 并发压力：多个线程同时输入字符和特殊键，定时线程同时按空闲超时提交，
+   核对所有字符都恰好提交一次、特殊键前的输入先于特殊键提交。
+
+示例：
+    python benchmarks/bench_keystrokes.py
+    python benchmarks/bench_keystrokes.py --threads 8 --chars 20000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+import collections
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler import Scheduler
+from input_coalescer import KeystrokeCoalescer
+from window_info import ForegroundWindow
+
+WINDOW = ForegroundWindow(1, "文档1.docx - Word", "WINWORD.EXE")
+
+INPUT_PREFIX = "键盘-输入："
+
+
+def typing_session(words, idle_timeout, seed):
+    """按单词突发输入，返回 (是否一致, 耗时, 定时线程唤醒次数)"""
+    rows = []
+    scheduler = Scheduler()
+    scheduler.start()
+    coalescer = KeystrokeCoalescer(lambda window, detail: rows.append(detail), lambda: WINDOW, scheduler,
+                                   idle_timeout=idle_timeout)
+    rng = random.Random(seed)
+    expected = []
+    start = time.perf_counter()
+    for _ in range(words):
+        word = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 8)))
+        expected.append(INPUT_PREFIX + word)
+        for char in word:
+            coalescer.add(char)
+            time.sleep(idle_timeout / 10)
+        time.sleep(idle_timeout * 1.5)
+    elapsed = time.perf_counter() - start
+    scheduler.stop()
+    return rows == expected, elapsed, scheduler.wakeups
+
+
+def stress(threads, chars, idle_timeout):
+    """并发输入，返回 (是否一致, 提交次数, 耗时)"""
+    rows = []
+    scheduler = Scheduler()
+    scheduler.start()
+    coalescer = KeystrokeCoalescer(lambda window, detail: rows.append(detail), lambda: WINDOW, scheduler,
+                                   idle_timeout=idle_timeout)
+
+    def typist(index):
+        rng = random.Random(index)
+        for i in range(chars):
+            coalescer.add(str(index))
+            if i % 97 == 96:
+                coalescer.log_key(f"键盘-特殊键：回车{index}")
+            if rng.random() < 0.001:
+                time.sleep(idle_timeout * 2)
+
+    workers = [threading.Thread(target=typist, args=(t,)) for t in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    coalescer.flush()
+    elapsed = time.perf_counter() - start
+    scheduler.stop()
+
+    # 不应出现空记录；每个特殊键之前，其线程已输入的字符都已提交
+    ok = INPUT_PREFIX not in rows
+    seen = collections.Counter()
+    specials = collections.Counter()
+    for detail in rows:
+        if detail.startswith(INPUT_PREFIX):
+            seen.update(detail[len(INPUT_PREFIX):])
+        else:
+            index = detail[-1]
+            specials[index] += 1
+            ok = ok and seen[index] >= specials[index] * 97
+    # 所有字符恰好提交一次
+    ok = ok and all(seen[str(t)] == chars for t in range(threads))
+    return ok, len(rows), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="键盘输入合并基准测试")
+    parser.add_argument("--words", type=int, default=20, help="模拟打字的单词数")
+    parser.add_argument("--idle", type=float, default=0.05, help="空闲提交时间(秒)，测试时按比例缩短")
+    parser.add_argument("--threads", type=int, default=4, help="并发压力测试的线程数")
+    parser.add_argument("--chars", type=int, default=10000, help="每个线程输入的字符数")
+    args = parser.parse_args()
+
+    typing_ok, elapsed, wakeups = typing_session(args.words, args.idle, seed=0)
+    # 原实现：空闲时间 1 秒、每 0.1 秒轮询一次；按测试中缩短的空闲时间等比例换算
+    polling = elapsed / (0.1 * args.idle)
+    print(f"模拟打字:  {args.words} 个单词，{'逐词提交一致' if typing_ok else '提交结果不一致'}；"
+          f"定时线程唤醒 {wakeups} 次（原轮询方式按比例约 {polling:.0f} 次，无输入时不唤醒）")
+
+    stress_ok, rows, elapsed = stress(args.threads, args.chars, args.idle)
+    total = args.threads * args.chars
+    print(f"并发压力:  {args.threads} 线程共 {total} 个字符，{rows} 条记录，{elapsed:.2f} s，"
+          f"{total / elapsed:.0f} 字符/秒，{'无丢失/重复' if stress_ok else '存在丢失/重复'}")
+
+    if not (typing_ok and stress_ok):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+界面日志基准测试（使用模拟文本框，无需图形界面）
+
+多个线程同时大量写日志（模拟滚轮、Alt-Tab 等事件风暴），比较原先每条日志都
+重建文本框的做法与队列+批量刷新的调用耗时和文本框操作次数，并核对
+最终显示的行和错误样式、没有日志丢失，以及没有新日志时不再安排刷新。
+
+示例：
+    python benchmarks/bench_log_panel.py
+    python benchmarks/bench_log_panel.py --threads 8 --per-thread 5000
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_panel import LogPanel
+
+
+class FakeText:
+    """模拟 Tk 文本框：按行保存内容和样式，统计操作次数"""
+
+    def __init__(self):
+        self.lines = []     # (文本, 样式)
+        self.inserted = []  # 插入过的全部行，按插入顺序
+        self.operations = 0
+        self.lock = threading.Lock()
+        self.callbacks = []  # 已安排、尚未执行的 after() 回调
+        self.scheduled = 0
+
+    def config(self, **kwargs):
+        self.operations += 1
+
+    def insert(self, index, text, tag=None):
+        self.operations += 1
+        self.lines.append((text.rstrip("\n"), tag == "error"))
+        self.inserted.append(self.lines[-1])
+
+    def delete(self, start, end):
+        self.operations += 1
+        if end == "end":
+            self.lines = []
+        else:
+            del self.lines[:int(end.split(".")[0]) - 1]
+
+    def see(self, index):
+        self.operations += 1
+
+    def after(self, ms, func):
+        with self.lock:
+            self.callbacks.append(func)
+            self.scheduled += 1
+            return self.scheduled
+
+    def after_cancel(self, after_id):
+        pass
+
+    def run_due(self):
+        """模拟主线程事件循环：执行已安排的回调，返回执行的个数"""
+        with self.lock:
+            callbacks, self.callbacks = self.callbacks, []
+        for func in callbacks:
+            func()
+        return len(callbacks)
+
+
+def legacy_log(widget, entries, log_text, error=False):
+    """原 log_activity：每条日志都清空文本框并重新插入最新10行"""
+    log_entry = f"[2025-01-01 00:00:00] {log_text}"
+    entries.append(log_entry)
+    if len(entries) > 1000:
+        entries.pop(0)
+    widget.config(state="normal")
+    widget.delete("1.0", "end")
+    for entry in entries[-10:]:
+        if error and entry == log_entry:
+            widget.insert("end", entry + "\n", "error")
+        else:
+            widget.insert("end", entry + "\n")
+    widget.config(state="disabled")
+    widget.see("end")
+
+
+def storm(log, threads, per_thread):
+    """多个线程同时写日志，返回耗时（秒）"""
+    def worker(index):
+        for i in range(per_thread):
+            log(f"线程{index} 日志{i}", i % 50 == 49)
+
+    workers = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="界面日志基准测试")
+    parser.add_argument("--threads", type=int, default=4, help="写日志的线程数")
+    parser.add_argument("--per-thread", type=int, default=5000, help="每个线程的日志条数")
+    args = parser.parse_args()
+    total = args.threads * args.per_thread
+
+    legacy_widget, legacy_entries = FakeText(), []
+    lock = threading.Lock()  # 原实现没有锁，这里加锁只为让计时结果可比
+
+    def legacy(text, error):
+        with lock:
+            legacy_log(legacy_widget, legacy_entries, text, error)
+
+    legacy_time = storm(legacy, args.threads, args.per_thread)
+
+    widget = FakeText()
+    panel = LogPanel(widget)
+    panel.start()
+    stop = threading.Event()
+    added = []
+
+    def refresh():
+        added.append(LogPanel.refresh(panel))
+        return added[-1]
+
+    panel.refresh = refresh
+
+    def ui_loop():
+        # 模拟主线程：每个刷新间隔执行一次已安排的 after() 回调
+        while not stop.wait(panel.refresh_interval_ms / 1000):
+            widget.run_due()
+
+    ui = threading.Thread(target=ui_loop)
+    ui.start()
+    panel_time = storm(panel.append, args.threads, args.per_thread)
+    stop.set()
+    ui.join()
+    widget.run_due()
+    # 日志写完后界面空闲：不再有刷新被安排
+    idle_runs = widget.run_due() + widget.run_due()
+
+    print(f"日志条数:   {total}  ({args.threads} 线程)")
+    print(f"原实现:     {legacy_time / total * 1e6:8.2f} µs/条  文本框操作 {legacy_widget.operations} 次")
+    print(f"队列+刷新:  {panel_time / total * 1e6:8.2f} µs/条  文本框操作 {widget.operations} 次"
+          f"  ({panel.refresh_count} 次刷新，安排 {widget.scheduled} 次)")
+
+    # 核对：全部日志都被刷新，显示最新的若干行，错误行保留样式，每个线程的日志保持顺序，空闲后不再刷新
+    shown = widget.lines
+    ok = sum(added) == total and shown == widget.inserted[-panel.visible_lines:]
+    ok = ok and len(shown) == min(total, panel.visible_lines)
+    ok = ok and all(is_error == (int(text.rsplit("日志", 1)[1]) % 50 == 49) for text, is_error in shown)
+    last = {}
+    for text, _ in widget.inserted:
+        thread, index = text.split("] ", 1)[1].split(" 日志")
+        ok = ok and int(index) > last.get(thread, -1)
+        last[thread] = int(index)
+    ok = ok and idle_runs == 0 and not panel.armed
+    print("显示内容核对: " + ("一致" if ok else "不一致"))
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+运行统计开销基准测试（无需Windows桌面，可在Linux下无界面运行）
+
+1. 单事件开销：同一批事件分别以空统计(NULL_METRICS)和启用统计送入 EventLogger.log_event，
+   比较每个事件的耗时；以及包装钩子回调(wrap)的每次调用开销
+2. 启用统计运行写入线程，写入两行统计快照，核对 JSON 行可解析、各阶段计数与事件数一致
+
+示例：
+    python benchmarks/bench_metrics.py
+    python benchmarks/bench_metrics.py --events 200000
+"""
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import Metrics, MetricsReporter, NULL_METRICS, summarize
+from event_logger import EventLogger
+from event_record import CsvRowFormatter
+from event_writer import EventWriter, CsvSink
+from window_info import ForegroundWindow
+
+WINDOW = ForegroundWindow(1, "文档1.docx - Word", "WINWORD.EXE")
+DETAILS = ["键盘-输入：你好", "鼠标-左键单击", "鼠标-滚轮：向下3格", "窗口-切换：文档1.docx - Word"]
+
+
+def time_log_event(events, metrics, repeat):
+    """返回 log_event 每个事件的最短耗时(微秒)"""
+    best = None
+    for _ in range(repeat):
+        rows = []
+        logger = EventLogger(rows.append, metrics=metrics)
+        start = time.perf_counter()
+        for i in range(events):
+            logger.log_event(WINDOW, DETAILS[i % len(DETAILS)])
+        elapsed = (time.perf_counter() - start) / events * 1e6
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def time_hook(calls, metrics):
+    """返回包装后的空回调每次调用的耗时(微秒)"""
+    hook = metrics.wrap("hook.test", lambda event: None)
+    start = time.perf_counter()
+    for i in range(calls):
+        hook(i)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="运行统计开销基准测试")
+    parser.add_argument("--events", type=int, default=50000, help="事件数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数（取最短耗时）")
+    args = parser.parse_args()
+
+    disabled = time_log_event(args.events, NULL_METRICS, args.repeat)
+    enabled = time_log_event(args.events, Metrics(), args.repeat)
+    hook_disabled = time_hook(args.events, NULL_METRICS)
+    hook_enabled = time_hook(args.events, Metrics())
+    print(f"log_event:  未启用 {disabled:.2f} µs/事件，启用 {enabled:.2f} µs/事件（增加 {enabled - disabled:.2f} µs）")
+    print(f"钩子包装:   未启用 {hook_disabled:.2f} µs/次，启用 {hook_enabled:.2f} µs/次")
+
+    # 启用统计运行写入线程并写入快照
+    output_dir = tempfile.mkdtemp(prefix="ubc_bench_")
+    csv_filepath = os.path.join(output_dir, "bench.csv")
+    with open(csv_filepath, 'w', newline='', encoding='utf-8-sig') as f:
+        f.write(",".join(CsvRowFormatter.HEADER) + "\r\n")
+    metrics = Metrics()
+    data_queue = queue.Queue()
+    writer = EventWriter(data_queue, [CsvSink(csv_filepath, CsvRowFormatter("20230001", "测试", output_dir))],
+                         metrics=metrics)
+    metrics.gauge("queue.events", data_queue.qsize)
+    metrics.gauge("thread.writer", writer.is_alive)
+    reporter = MetricsReporter(metrics, os.path.join(output_dir, "metrics.jsonl"))
+    writer.start()
+    logger = EventLogger(writer.put, metrics=metrics)
+    for i in range(args.events):
+        logger.log_event(WINDOW, DETAILS[i % len(DETAILS)])
+    reporter.write_snapshot()
+    writer.stop(timeout=10)
+    reporter.write_snapshot(final=True)
+
+    with open(reporter.path, encoding='utf-8') as f:
+        snapshots = [json.loads(line) for line in f]
+    final = snapshots[-1]
+    histograms = final["histograms"]
+    print(f"统计快照:   {len(snapshots)} 行，{os.path.getsize(reporter.path)} 字节")
+    for line in summarize(final):
+        print(f"    {line}")
+
+    ok = (len(snapshots) == 2 and final.get("final") is True
+          and histograms["logger.log_event"]["count"] == args.events
+          and final["counters"]["writer.rows"] == args.events
+          and histograms["writer.write.csv"]["count"] == final["counters"]["writer.batches"]
+          and final["gauges"]["thread.writer"] is False
+          and enabled - disabled < 5)
+    print("核对: " + ("快照可解析，各阶段计数与事件数一致，启用统计后每事件增加不超过 5 µs" if ok
+                    else "统计快照或开销不符合预期"))
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+事件管线基准测试（无需Windows桌面，可在Linux下无界面运行）
+
+使用合成/回放事件源，将键盘、鼠标、窗口、剪贴板事件还原为钩子事件，送入
+键盘/鼠标钩子事件源 → 输入合并、滚动汇总、窗口切换判断 → log_event → 写入线程 → CSV
+的完整路径（与采集程序相同），统计吞吐量、单事件延迟分位数和CPU时间。
+
+示例：
+    python benchmarks/bench_pipeline.py --events 50000
+    python benchmarks/bench_pipeline.py --events 2000 --rate 500
+    python benchmarks/bench_pipeline.py --record events.jsonl --events 1000
+    python benchmarks/bench_pipeline.py --replay events.jsonl --speed 10
+    python benchmarks/bench_pipeline.py --sqlite    # 同时写入SQLite，并核对导出的CSV与直接写入的CSV一致
+    python benchmarks/bench_pipeline.py --segment-kb 256    # 同时分段写入，并核对读回的内容
+"""
+import os
+import csv
+import sys
+import time
+import queue
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_writer import EventWriter, CsvSink
+from event_logger import EventLogger
+from event_record import CsvRowFormatter
+from event_sources import generate_events, load_events, save_events
+from sqlite_store import SqliteSink, export_csv
+from csv_segments import RotatingCsvSink, iter_session_rows, session_segment_files
+from bench_support import ReplayPipeline
+
+CSV_HEADER = ",".join(CsvRowFormatter.HEADER) + "\r\n"
+
+
+def percentile(sorted_values, pct):
+    """计算已排序数据的分位数"""
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_benchmark(events, rate=0, speed=1.0, batch_size=100, flush_interval=1.0, output_dir=None,
+                  sqlite=False, segment_kb=0):
+    """运行一次基准测试，返回统计结果字典"""
+    output_dir = output_dir or tempfile.mkdtemp(prefix="ubc_bench_")
+    csv_filepath = os.path.join(output_dir, "bench.csv")
+    with open(csv_filepath, 'w', newline='', encoding='utf-8-sig') as f:
+        f.write(CSV_HEADER)
+
+    errors = []
+    formatter = CsvRowFormatter("20230001", "测试", output_dir)
+    sinks = [CsvSink(csv_filepath, formatter)]
+    db_filepath = os.path.join(output_dir, "bench.db")
+    if sqlite:
+        sinks.append(SqliteSink(db_filepath, "20230001", "测试", output_dir))
+    segment_folder = os.path.join(output_dir, "segments")
+    if segment_kb:
+        os.makedirs(segment_folder, exist_ok=True)
+        segment_filepath = os.path.join(segment_folder, "bench.csv")
+        with open(segment_filepath, 'w', newline='', encoding='utf-8-sig') as f:
+            f.write(CSV_HEADER)
+        sinks.append(RotatingCsvSink(segment_filepath, formatter, max_bytes=segment_kb * 1024,
+                                     on_error=errors.append))
+    writer = EventWriter(queue.Queue(), sinks, batch_size=batch_size,
+                         flush_interval=flush_interval, on_error=errors.append)
+    pipeline = ReplayPipeline(events, lambda window, detail: event_logger.log_event(window, detail),
+                              rate=rate, speed=speed)
+    source = pipeline.source
+    event_logger = EventLogger(writer.put, clipboard_reader=pipeline.read_clipboard, on_error=errors.append)
+
+    writer.start()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    pipeline.run()
+    produce_time = time.perf_counter() - wall_start
+    writer.stop(timeout=60)
+    total_time = time.perf_counter() - wall_start
+    cpu_time = time.process_time() - cpu_start
+
+    latencies = sorted(source.latencies_ns)
+    result = {
+        "events": source.events_sent,
+        "rows_written": writer.rows_written,
+        "flushes": writer.flush_count,
+        "produce_time": produce_time,
+        "total_time": total_time,
+        "events_per_sec": source.events_sent / total_time if total_time else 0,
+        "cpu_time": cpu_time,
+        "cpu_per_event_us": cpu_time / source.events_sent * 1e6 if source.events_sent else 0,
+        "p50_us": percentile(latencies, 50) / 1000,
+        "p90_us": percentile(latencies, 90) / 1000,
+        "p99_us": percentile(latencies, 99) / 1000,
+        "max_us": (latencies[-1] if latencies else 0) / 1000,
+        "csv_bytes": os.path.getsize(csv_filepath),
+        "errors": errors,
+    }
+    if sqlite:
+        # 从数据库导出CSV，应与直接写入的CSV逐字节一致
+        export_filepath = os.path.join(output_dir, "export.csv")
+        export_csv(db_filepath, export_filepath)
+        with open(csv_filepath, 'rb') as a, open(export_filepath, 'rb') as b:
+            result["sqlite_export_match"] = a.read() == b.read()
+        result["db_bytes"] = sum(os.path.getsize(db_filepath + suffix) for suffix in ("", "-wal")
+                                 if os.path.exists(db_filepath + suffix))
+    if segment_kb:
+        # 分段读回的内容应与不分段的CSV逐行一致
+        with open(csv_filepath, newline='', encoding='utf-8-sig') as f:
+            expected = list(csv.reader(f))
+        files = session_segment_files(segment_folder)
+        result["segments"] = len(files)
+        result["segment_bytes"] = sum(os.path.getsize(path) for path in files)
+        result["segments_match"] = list(iter_session_rows(segment_folder)) == expected
+    return result
+
+
+def print_report(result):
+    """打印统计结果"""
+    print(f"事件数:         {result['events']}  (写入 {result['rows_written']} 行, {result['flushes']} 次刷新)")
+    print(f"总耗时:         {result['total_time']:.3f} s  (生产 {result['produce_time']:.3f} s)")
+    print(f"吞吐量:         {result['events_per_sec']:.0f} 事件/秒")
+    print(f"CPU时间:        {result['cpu_time']:.3f} s  ({result['cpu_per_event_us']:.1f} µs/事件)")
+    print(f"单事件延迟(µs): p50={result['p50_us']:.1f}  p90={result['p90_us']:.1f}  "
+          f"p99={result['p99_us']:.1f}  max={result['max_us']:.1f}")
+    print(f"CSV大小:        {result['csv_bytes']} 字节")
+    if "sqlite_export_match" in result:
+        print(f"SQLite大小:     {result['db_bytes']} 字节  (导出CSV与直接写入"
+              f"{'一致' if result['sqlite_export_match'] else '不一致'})")
+    if "segments_match" in result:
+        print(f"分段:           {result['segments']} 个，共 {result['segment_bytes']} 字节（压缩后）"
+              f"  (读回内容{'一致' if result['segments_match'] else '不一致'})")
+    if result["errors"]:
+        print(f"错误:           {len(result['errors'])} 条，首条: {result['errors'][0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="事件管线基准测试")
+    parser.add_argument("--events", type=int, default=20000, help="生成的合成事件数")
+    parser.add_argument("--rate", type=float, default=0, help="每秒事件数，0 表示不限速")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--replay", help="回放JSON Lines事件文件（按其中的时间偏移 t）")
+    parser.add_argument("--speed", type=float, default=1.0, help="回放倍速")
+    parser.add_argument("--record", help="将生成的事件保存到JSON Lines文件后退出")
+    parser.add_argument("--batch-size", type=int, default=100, help="写入线程批量大小")
+    parser.add_argument("--flush-interval", type=float, default=1.0, help="写入线程刷新间隔(秒)")
+    parser.add_argument("--sqlite", action="store_true", help="同时写入SQLite会话库并核对导出结果")
+    parser.add_argument("--segment-kb", type=int, default=0, help="同时按该大小(KB)分段写入并核对读回结果")
+    args = parser.parse_args()
+
+    if args.replay:
+        events = load_events(args.replay)
+        rate = None
+    else:
+        events = generate_events(args.events, seed=args.seed)
+        rate = args.rate
+
+    if args.record:
+        # 按速率写入时间偏移，便于之后回放
+        for i, event in enumerate(events):
+            event["t"] = i / args.rate if args.rate > 0 else 0.0
+        save_events(events, args.record)
+        print(f"已保存 {len(events)} 条事件到 {args.record}")
+        return
+
+    result = run_benchmark(events, rate=rate, speed=args.speed, batch_size=args.batch_size,
+                           flush_interval=args.flush_interval, sqlite=args.sqlite,
+                           segment_kb=args.segment_kb)
+    print_report(result)
+    if result.get("sqlite_export_match") is False or result.get("segments_match") is False:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
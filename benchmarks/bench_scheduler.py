@@ -0,0 +1,161 @@
+"""
+共享定时线程基准测试（无需键盘/鼠标钩子）
+
+在一段空闲的监控时间内比较两种做法的线程数、唤醒次数和停止耗时：
+1. 原做法：键盘、鼠标监听线程注册钩子后每 0.1 秒空转检查停止标志，定时截图线程每 0.1 秒
+   检查一次，窗口轮询线程每 0.5 秒查询一次，写入线程每 1 秒超时唤醒；停止时按 0.5 秒步长等待线程退出
+2. 共享定时线程：窗口轮询和定时截图为定时任务，写入线程无数据时阻塞等待，停止时直接取消任务
+并核对周期任务的执行次数和取消后不再执行。
+
+示例：
+    python benchmarks/bench_scheduler.py
+    python benchmarks/bench_scheduler.py --seconds 10 --screenshot-interval 2
+"""
+import os
+import sys
+import time
+import queue
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler import Scheduler
+from event_sources import PeriodicSource
+from event_writer import EventWriter
+
+
+class CountingSink:
+    """只计数的输出端"""
+
+    kind = "count"
+
+    def __init__(self):
+        self.rows = 0
+
+    def write_rows(self, records):
+        self.rows += len(records)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def run_legacy(seconds, poll_interval, screenshot_interval):
+    """原做法的各个循环线程，返回 (线程数, 唤醒次数, 停止耗时)"""
+    stop_flag = threading.Event()
+    wakeups = [0]
+    lock = threading.Lock()
+
+    def wake():
+        with lock:
+            wakeups[0] += 1
+
+    def spin():                      # 键盘、鼠标监听线程
+        while not stop_flag.is_set():
+            time.sleep(0.1)
+            wake()
+
+    def screenshot_timer():
+        while not stop_flag.is_set():
+            for _ in range(int(screenshot_interval * 10)):
+                if stop_flag.is_set():
+                    break
+                time.sleep(0.1)
+                wake()
+
+    def polling():
+        while not stop_flag.is_set():
+            stop_flag.wait(poll_interval)
+            wake()
+
+    def writer():
+        data_queue = queue.Queue()
+        while not stop_flag.is_set():
+            try:
+                data_queue.get(timeout=1.0)
+            except queue.Empty:
+                pass
+            wake()
+
+    threads = [threading.Thread(target=target, daemon=True)
+               for target in (spin, spin, screenshot_timer, polling, writer)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    start = time.perf_counter()
+    stop_flag.set()
+    wait_time = 0
+    while any(t.is_alive() for t in threads) and wait_time < 5:
+        time.sleep(0.5)
+        wait_time += 0.5
+    return len(threads), wakeups[0], time.perf_counter() - start
+
+
+def run_scheduler(seconds, poll_interval, screenshot_interval):
+    """共享定时线程，返回 (线程数, 唤醒次数, 停止耗时, 轮询次数, 截图次数)"""
+    counts = {"poll": 0, "screenshot": 0}
+    scheduler = Scheduler()
+    scheduler.start()
+    writer = EventWriter(queue.Queue(), [CountingSink()])
+    writer.start()
+    sources = [PeriodicSource("window_polling", scheduler, poll_interval,
+                              lambda: counts.__setitem__("poll", counts["poll"] + 1), first_delay=0),
+               PeriodicSource("screenshot_timer", scheduler, screenshot_interval,
+                              lambda: counts.__setitem__("screenshot", counts["screenshot"] + 1), first_delay=0)]
+    for source in sources:
+        source.start()
+    time.sleep(seconds)
+    start = time.perf_counter()
+    for source in sources:
+        source.stop()
+    deadline = time.monotonic() + 5
+    for source in sources:
+        source.join(max(0.0, deadline - time.monotonic()))
+    writer.stop()
+    scheduler.stop()
+    elapsed = time.perf_counter() - start
+    return 2, scheduler.wakeups, elapsed, counts["poll"], counts["screenshot"]
+
+
+def check_cancel():
+    """取消后的周期任务不再执行"""
+    runs = []
+    scheduler = Scheduler()
+    scheduler.start()
+    periodic = scheduler.call_every(0.01, lambda: runs.append(time.monotonic()))
+    time.sleep(0.2)
+    periodic.cancel()
+    count = len(runs)
+    time.sleep(0.1)
+    scheduler.stop()
+    return count > 5 and len(runs) == count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="共享定时线程基准测试")
+    parser.add_argument("--seconds", type=float, default=3.0, help="模拟空闲监控的时长(秒)")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="窗口轮询间隔(秒)")
+    parser.add_argument("--screenshot-interval", type=float, default=1.0, help="定时截图间隔(秒)，测试时缩短")
+    args = parser.parse_args()
+
+    threads, wakeups, stop_time = run_legacy(args.seconds, args.poll_interval, args.screenshot_interval)
+    print(f"原做法:     {threads} 个线程，{args.seconds:g} 秒内唤醒 {wakeups} 次，停止耗时 {stop_time * 1000:.0f} ms")
+    threads, wakeups, stop_time, polls, screenshots = run_scheduler(args.seconds, args.poll_interval,
+                                                                    args.screenshot_interval)
+    print(f"共享定时:   {threads} 个线程（定时线程+写入线程），{args.seconds:g} 秒内唤醒 {wakeups} 次，"
+          f"停止耗时 {stop_time * 1000:.0f} ms")
+
+    expected_polls = int(args.seconds / args.poll_interval) + 1
+    expected_screenshots = int(args.seconds / args.screenshot_interval) + 1
+    ok = abs(polls - expected_polls) <= 1 and abs(screenshots - expected_screenshots) <= 1 and check_cancel()
+    print(f"核对: 轮询 {polls} 次（预期约 {expected_polls}），截图 {screenshots} 次（预期约 {expected_screenshots}），"
+          + ("取消后不再执行" if ok else "执行次数或取消结果不一致"))
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+滚轮滚动汇总基准测试（使用模拟时钟和定时器，结果可重复）
+
+生成一段阅读时的滚轮事件流（连续滚动、停顿、反向、切换窗口），比较原先
+0.4 秒冷却丢弃的做法与连续滚动汇总：记录行数、保留下来的滚动格数，以及
+每个滚轮事件在钩子线程中的耗时。
+
+示例：
+    python benchmarks/bench_scroll.py
+    python benchmarks/bench_scroll.py --bursts 2000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_logger import EventLogger
+from input_coalescer import ScrollAggregator
+from window_info import ForegroundWindow
+from bench_support import ManualScheduler
+
+WINDOWS = [ForegroundWindow(1, "文档1.docx - Word", "WINWORD.EXE"),
+           ForegroundWindow(2, "考试系统 - Microsoft Edge", "msedge.exe")]
+
+
+def generate_wheel_stream(bursts, seed):
+    """生成 (时间, 滚动量, 窗口序号) 序列"""
+    rng = random.Random(seed)
+    events = []
+    t = 0.0
+    window = 0
+    for _ in range(bursts):
+        if rng.random() < 0.1:
+            window = 1 - window
+        sign = 1 if rng.random() < 0.3 else -1
+        for _ in range(rng.randint(1, 40)):
+            events.append((t, sign, window))
+            t += rng.uniform(0.01, 0.08)
+            if rng.random() < 0.03:
+                sign = -sign   # 滚过头往回滚
+        t += rng.uniform(0.5, 5.0)   # 停顿阅读
+    return events
+
+
+def run_legacy(stream):
+    """原实现：距上次记录不足 0.4 秒的滚轮事件直接丢弃"""
+    rows = []
+    logger = EventLogger(rows.append)
+    last = -1e9
+    start = time.perf_counter()
+    for t, delta, window in stream:
+        if t - last < 0.4:
+            continue
+        last = t
+        logger.log_event(WINDOWS[window], f"鼠标-滚轮：{'向上' if delta > 0 else '向下'}滑动")
+    return rows, time.perf_counter() - start
+
+
+def run_aggregator(stream):
+    rows = []
+    logger = EventLogger(rows.append)
+    now = [0.0]
+    window = [0]
+    scheduler = ManualScheduler()
+    aggregator = ScrollAggregator(logger.log_event, lambda: WINDOWS[window[0]], scheduler,
+                                  idle_timeout=0.4, clock=lambda: now[0])
+    start = time.perf_counter()
+    for t, delta, index in stream:
+        now[0] = t
+        scheduler.run_until(t)
+        if index != window[0]:
+            aggregator.flush()   # 窗口切换
+            window[0] = index
+        aggregator.add(delta)
+    now[0] += 1.0
+    scheduler.run_until(now[0])
+    return rows, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="滚轮滚动汇总基准测试")
+    parser.add_argument("--bursts", type=int, default=500, help="连续滚动的次数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    stream = generate_wheel_stream(args.bursts, args.seed)
+    legacy_rows, legacy_time = run_legacy(stream)
+    rows, elapsed = run_aggregator(stream)
+
+    notches = sum(int(record.detail.split("（")[1].split("格")[0]) for record in rows)
+    net = sum(float(record.detail.split("净值")[1].rstrip("）")) for record in rows)
+    expected_net = sum(delta for _, delta, _ in stream)
+    ok = notches == len(stream) and net == expected_net and all(r.operation_type == "查看" for r in rows)
+
+    print(f"滚轮事件:  {len(stream)} 个（{args.bursts} 次连续滚动）")
+    print(f"原冷却丢弃: {len(legacy_rows):6d} 行，保留 {len(legacy_rows)} 格，"
+          f"{legacy_time / len(stream) * 1e6:.2f} µs/事件")
+    print(f"滚动汇总:   {len(rows):6d} 行，保留 {notches} 格（净值 {net:+g}），"
+          f"{elapsed / len(stream) * 1e6:.2f} µs/事件")
+    print(f"示例: {rows[0].detail}")
+    print("核对: " + ("格数和净值完整，操作类型均为 查看" if ok else "汇总结果不一致"))
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+基准测试共用的辅助组件
+"""
+import os
+import sys
+import heapq
+import itertools
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_sources import ReplayEventSource
+from input_coalescer import KeystrokeCoalescer, ScrollAggregator
+from input_hooks import KeyboardHookSource, MouseHookSource
+from scheduler import ScheduledCall, Scheduler
+from window_tracker import WindowTracker
+
+
+class ManualScheduler:
+    """模拟定时器：由测试按模拟时间推进并执行到期任务，已取消的任务不执行"""
+
+    def __init__(self):
+        self.heap = []
+        self.counter = itertools.count()
+
+    def call_at(self, deadline, func):
+        call = ScheduledCall(deadline, func)
+        heapq.heappush(self.heap, (deadline, next(self.counter), call))
+        return call
+
+    def run_until(self, now):
+        while self.heap and self.heap[0][0] <= now:
+            _, _, call = heapq.heappop(self.heap)
+            if not call.cancelled:
+                call.func()
+
+
+class ReplayPipeline:
+    """
+    把回放事件源接到与采集程序相同的处理路径上：
+    键盘钩子事件源 → 输入合并，鼠标钩子事件源 → 滚动汇总，窗口快照 → 窗口切换判断，
+    合并器的空闲提交由共享定时线程完成；log_event 参数为 (窗口快照, 操作详情)
+    """
+
+    def __init__(self, events, log_event, rate=None, speed=1.0, record_latency=True):
+        self.scheduler = Scheduler()
+        self.source = ReplayEventSource(events, log_event=log_event, rate=rate, speed=speed,
+                                        record_latency=record_latency)
+        current_window = self.source.current_window
+        self.coalescer = KeystrokeCoalescer(log_event, current_window, self.scheduler)
+        self.aggregator = ScrollAggregator(log_event, current_window, self.scheduler)
+        self.source.keyboard = KeyboardHookSource(None, self.coalescer)
+        self.source.mouse = MouseHookSource(None, lambda detail: log_event(current_window(), detail),
+                                            self.aggregator, get_position=self.source.get_position)
+        self.source.observe_window = WindowTracker(log_event).observe
+        self.source.flushers = (self.coalescer, self.aggregator)
+
+    def read_clipboard(self):
+        """返回模拟的剪贴板内容"""
+        return self.source.read_clipboard()
+
+    def run(self):
+        """在当前线程中回放全部事件，提交尚未提交的输入和滚动后停止定时线程"""
+        self.scheduler.start()
+        self.source.run()
+        self.coalescer.flush()
+        self.aggregator.flush()
+        self.scheduler.stop()
@@ -0,0 +1,87 @@
+"""
+窗口切换截图防抖基准测试（使用模拟时钟和定时器，结果可重复）
+
+生成一段窗口切换序列：正常切换后停留阅读，以及快速 Alt+Tab 连续经过多个窗口，
+比较每次切换立即截图与防抖截图的截图张数，并核对：停留超过防抖时间的窗口都截了图
+（超出每分钟次数时除外），短暂经过的窗口不截图，任意一分钟内的截图数不超过上限。
+
+示例：
+    python benchmarks/bench_switch_capture.py
+    python benchmarks/bench_switch_capture.py --dwell 0.3 --budget 10
+"""
+import os
+import sys
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capture_debouncer import SwitchCaptureDebouncer
+from window_info import ForegroundWindow
+from bench_support import ManualScheduler
+
+
+def generate_switches(count, seed):
+    """生成 (时间, 窗口句柄) 序列：正常切换停留 1-30 秒，约 1/5 为经过 3-8 个窗口的快速切换"""
+    rng = random.Random(seed)
+    switches = []
+    t = 0.0
+    while len(switches) < count:
+        if rng.random() < 0.2:
+            for _ in range(rng.randint(3, 8)):
+                switches.append((t, rng.randint(1, 8)))
+                t += rng.uniform(0.08, 0.3)
+        switches.append((t, rng.randint(1, 8)))
+        t += rng.uniform(1, 30)
+    return switches[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="窗口切换截图防抖基准测试")
+    parser.add_argument("--switches", type=int, default=2000, help="窗口切换次数")
+    parser.add_argument("--dwell", type=float, default=0.5, help="停留多久(秒)才截图")
+    parser.add_argument("--budget", type=int, default=20, help="每分钟最多截图次数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    switches = generate_switches(args.switches, args.seed)
+    now = [0.0]
+    foreground = [None]
+    captures = []
+    scheduler = ManualScheduler()
+    debouncer = SwitchCaptureDebouncer(scheduler, lambda window: captures.append((now[0], window)),
+                                       lambda: foreground[0], dwell=args.dwell, max_per_minute=args.budget,
+                                       clock=lambda: now[0])
+    windows = []
+    for t, handle in switches:
+        now[0] = t
+        scheduler.run_until(t)
+        foreground[0] = handle
+        windows.append(ForegroundWindow(handle, f"窗口{handle}", "app.exe"))
+        debouncer.on_switch(windows[-1])
+    now[0] += 60
+    scheduler.run_until(now[0])
+    stats = debouncer.stats()
+
+    # 核对
+    ends = [t for t, _ in switches[1:]] + [now[0]]
+    settled = [end - t > args.dwell for (t, _), end in zip(switches, ends)]
+    captured = {id(window) for _, window in captures}
+    transient_captured = sum(1 for window, ok in zip(windows, settled) if not ok and id(window) in captured)
+    settled_missed = sum(1 for window, ok in zip(windows, settled) if ok and id(window) not in captured)
+    times = [t for t, _ in captures]
+    max_per_minute = max((sum(1 for u in times if t <= u < t + 60) for t in times), default=0)
+    ok = (transient_captured == 0 and settled_missed == stats["over_budget"]
+          and max_per_minute <= args.budget and len(captures) == stats["captured"])
+
+    print(f"窗口切换:   {len(switches)} 次，停留超过 {args.dwell:g} 秒的 {sum(settled)} 次")
+    print(f"立即截图:   {len(switches)} 张")
+    print(f"防抖截图:   {len(captures)} 张（被后续切换取代 {stats['superseded']} 次，"
+          f"超出每分钟 {args.budget} 张的限制 {stats['over_budget']} 次），任意一分钟最多 {max_per_minute} 张")
+    print("核对: " + ("短暂经过的窗口未截图，停留的窗口均已截图（超出次数限制的除外）" if ok else "截图结果不符合预期"))
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
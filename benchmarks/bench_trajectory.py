@@ -0,0 +1,132 @@
+"""
+鼠标轨迹记录基准测试
+
+合成若干段人手移动鼠标的轨迹（加速-减速的曲线移动、停顿、微小抖动，采样率可调），
+送入轨迹记录器，统计：每个移动事件的耗时、采集点数与保存点数、文件大小，
+以及保存后的折线与原始轨迹的最大/平均偏差（像素），用于调节抽稀阈值。
+核对采集/保存点数与文件一致，且最大偏差不超过偏差阈值。
+
+示例：
+    python benchmarks/bench_trajectory.py
+    python benchmarks/bench_trajectory.py --rate 1000 --min-distance 2 --max-deviation 1 --angle 10
+"""
+import os
+import sys
+import math
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trajectory import TrajectoryRecorder, read_trajectory
+
+
+def generate_moves(movements, rate, seed):
+    """生成 (x, y, 时间) 序列：每次移动为一段二次贝塞尔曲线，速度先快后慢，之间有停顿"""
+    rng = random.Random(seed)
+    points = []
+    t = 1_700_000_000.0
+    x, y = 960.0, 540.0
+    for _ in range(movements):
+        tx, ty = rng.uniform(0, 1920), rng.uniform(0, 1080)
+        cx, cy = (x + tx) / 2 + rng.uniform(-200, 200), (y + ty) / 2 + rng.uniform(-200, 200)
+        duration = rng.uniform(0.2, 1.2)
+        steps = max(2, int(duration * rate))
+        for i in range(steps + 1):
+            s = i / steps
+            s = s * s * (3 - 2 * s)   # 先加速后减速
+            px = (1 - s) ** 2 * x + 2 * (1 - s) * s * cx + s * s * tx
+            py = (1 - s) ** 2 * y + 2 * (1 - s) * s * cy + s * s * ty
+            points.append((px + rng.uniform(-0.8, 0.8), py + rng.uniform(-0.8, 0.8), t))
+            t += 1.0 / rate
+        x, y = tx, ty
+        # 停顿时的手部微小抖动
+        for _ in range(rng.randint(0, int(rate * 0.3))):
+            points.append((x + rng.uniform(-1.5, 1.5), y + rng.uniform(-1.5, 1.5), t))
+            t += 1.0 / rate
+        t += rng.uniform(0.2, 3.0)
+    return points
+
+
+def segment_distance(px, py, ax, ay, bx, by):
+    dx, dy = bx - ax, by - ay
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        return math.hypot(px - ax, py - ay)
+    s = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length_sq))
+    return math.hypot(px - ax - s * dx, py - ay - s * dy)
+
+
+def deviation(original, stored):
+    """
+    原始点到保存折线（按时间对应的线段）的最大和平均距离
+    保存的时间取整到毫秒（文件起点时间再取整一次），距线段起点不足 2 毫秒的点也与前一线段比较
+    """
+    if len(stored) < 2:
+        return 0.0, 0.0
+    distances = []
+    start_ms = original[0][2]
+    segment = 0
+    for x, y, t in original:
+        ms = (t - start_ms) * 1000
+        while segment < len(stored) - 2 and stored[segment + 1][2] <= ms:
+            segment += 1
+        (ax, ay, start), (bx, by, _) = stored[segment], stored[segment + 1]
+        distance = segment_distance(x, y, ax, ay, bx, by)
+        if segment > 0 and ms - start < 2:
+            px, py, _ = stored[segment - 1]
+            distance = min(distance, segment_distance(x, y, px, py, ax, ay))
+        distances.append(distance)
+    return max(distances), sum(distances) / len(distances)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="鼠标轨迹记录基准测试")
+    parser.add_argument("--movements", type=int, default=300, help="鼠标移动次数")
+    parser.add_argument("--rate", type=int, default=250, help="移动事件采样率(Hz)")
+    parser.add_argument("--min-distance", type=int, default=2, help="抖动距离阈值(像素)")
+    parser.add_argument("--max-deviation", type=float, default=2.0, help="偏差阈值(像素)")
+    parser.add_argument("--angle", type=float, default=15.0, help="方向变化角度阈值(度)")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    points = generate_moves(args.movements, args.rate, args.seed)
+    folder = tempfile.mkdtemp(prefix="ubc_traj_")
+    rows = []
+    recorder = TrajectoryRecorder(folder, lambda window, detail: rows.append(detail), lambda: None,
+                                  min_distance=args.min_distance, max_deviation=args.max_deviation,
+                                  angle_threshold=args.angle)
+    start = time.perf_counter()
+    for x, y, t in points:
+        recorder.add_point(x, y, t)
+    elapsed = time.perf_counter() - start
+    recorder.flush()
+    recorder.drain()
+    stats = recorder.stats()
+
+    stored = []
+    for name in sorted(os.listdir(folder)):
+        start_wall_ns, _, chunk = read_trajectory(os.path.join(folder, name))
+        offset_ms = (start_wall_ns - int(points[0][2] * 1e9)) // 1_000_000
+        stored.extend((x, y, ms + offset_ms) for x, y, ms in chunk)
+    max_dev, mean_dev = deviation([(int(x), int(y), t) for x, y, t in points], stored)
+    csv_bytes = sum(len(f"{int(x)},{int(y)},{t:.3f}\r\n") for x, y, t in points)
+
+    print(f"移动事件:   {len(points)} 个（{args.rate} Hz），{elapsed / len(points) * 1e6:.2f} µs/事件")
+    print(f"保存点数:   {stats['stored']} / 采集 {stats['captured']}（{stats['ratio']:.1%}），"
+          f"{stats['chunks']} 个文件共 {stats['bytes']} 字节（逐点写CSV约 {csv_bytes} 字节）")
+    print(f"轨迹偏差:   最大 {max_dev:.1f} 像素，平均 {mean_dev:.2f} 像素")
+    print(f"CSV引用行: {rows[0]}")
+    if stats["captured"] != len(points) or stats["stored"] != len(stored):
+        print("核对: 点数不一致")
+        sys.exit(1)
+    if max_dev > args.max_deviation + 1e-6:
+        print(f"核对: 最大偏差超过偏差阈值 {args.max_deviation:g} 像素")
+        sys.exit(1)
+    print(f"核对: 点数一致，最大偏差不超过偏差阈值 {args.max_deviation:g} 像素")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+窗口监听基准测试（模拟桌面，可在Linux下无界面运行）
+
+在模拟桌面上按随机停留时间切换窗口、改变窗口状态，比较事件驱动后端与
+轮询后端的检测延迟、漏记的快速切换次数和唤醒次数；运行前先用固定脚本
+检查窗口切换、状态变化和补记最终状态的逻辑。
+
+示例：
+    python benchmarks/bench_window_tracker.py
+    python benchmarks/bench_window_tracker.py --switches 200 --min-dwell 0.05 --max-dwell 1.0
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from window_tracker import (WindowTracker, PollingWindowBackend, SimulatedDesktop,
+                            SimulatedWindowBackend)
+
+
+def make_desktop(count=6):
+    desktop = SimulatedDesktop()
+    for handle in range(1, count + 1):
+        desktop.add_window(handle, f"窗口{handle}", f"app{handle}.exe")
+    return desktop
+
+
+def check_logic():
+    """用固定脚本检查切换/状态变化/补记逻辑，返回不符合预期的说明列表"""
+    desktop = make_desktop(3)
+    rows = []
+    switches = []
+    tracker = WindowTracker(lambda window, detail: rows.append((window.title, window.process_name, window.state, detail)),
+                            on_switch=lambda window: switches.append(window.title),
+                            final_state_lookup=desktop.window_state)
+    backend = SimulatedWindowBackend(tracker, desktop)
+    backend.start()
+
+    desktop.switch_to(1)
+    desktop.set_state(1, "MAXIMIZED")
+    # 窗口1最小化后焦点立即转到窗口2：最小化状态应补记到窗口1自己名下
+    with desktop.lock:
+        desktop.windows[1][2] = "MINIMIZED"
+    desktop.switch_to(2)
+    desktop.switch_to(None)
+    desktop.switch_to(3)
+    backend.stop()
+
+    expected = [
+        ("窗口1", "app1.exe", "NORMAL", "窗口-切换至：窗口1"),
+        ("窗口1", "app1.exe", "MAXIMIZED", "窗口-状态：MAXIMIZED"),
+        ("窗口1", "app1.exe", "MINIMIZED", "窗口-状态：MINIMIZED"),
+        ("窗口2", "app2.exe", "NORMAL", "窗口-切换至：窗口2"),
+        ("窗口3", "app3.exe", "NORMAL", "窗口-切换至：窗口3"),
+    ]
+    problems = []
+    if rows != expected:
+        problems.append(f"记录不符合预期: {rows}")
+    if switches != ["窗口1", "窗口2", "窗口3"]:
+        problems.append(f"切换截图回调不符合预期: {switches}")
+    return problems
+
+
+def run_scenario(desktop, backend_factory, dwell_times, handles):
+    """按给定停留时间依次切换窗口，返回 (检测延迟列表, 漏记次数, 观察次数)"""
+    detected = {}
+    switch_times = {}
+
+    def log_event(window, detail):
+        if detail.startswith("窗口-切换至") and window.handle not in detected:
+            detected[window.handle] = time.perf_counter()
+
+    tracker = WindowTracker(log_event, final_state_lookup=desktop.window_state)
+    backend = backend_factory(tracker, desktop)
+    backend.start()
+
+    for handle, dwell in zip(handles, dwell_times):
+        # 每个窗口句柄在场景中只出现一次，便于对应检测时间
+        desktop.switch_to(handle)
+        switch_times[handle] = desktop.last_change
+        time.sleep(dwell)
+
+    backend.stop()
+    backend.join(1)
+    latencies = [detected[h] - switch_times[h] for h in handles if h in detected]
+    missed = sum(1 for h in handles if h not in detected)
+    return latencies, missed, tracker.observations
+
+
+def summarize(name, latencies, missed, observations, duration, wakeups):
+    latencies = sorted(latencies)
+    if latencies:
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+        worst = latencies[-1] * 1000
+    else:
+        p50 = p99 = worst = 0
+    print(f"{name:<10}检测 {len(latencies):>4}  漏记 {missed:>4}  "
+          f"延迟(ms) p50={p50:.2f} p99={p99:.2f} max={worst:.2f}  "
+          f"唤醒 {wakeups:>5} 次 ({wakeups / duration:.1f}/s)  观察 {observations}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="窗口监听基准测试")
+    parser.add_argument("--switches", type=int, default=40, help="窗口切换次数")
+    parser.add_argument("--min-dwell", type=float, default=0.05, help="最短停留时间(秒)")
+    parser.add_argument("--max-dwell", type=float, default=0.6, help="最长停留时间(秒)")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="轮询间隔(秒)")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    problems = check_logic()
+    print("逻辑检查：" + ("通过" if not problems else "失败"))
+    for problem in problems:
+        print("  " + problem)
+
+    rng = random.Random(args.seed)
+    dwell_times = [rng.uniform(args.min_dwell, args.max_dwell) for _ in range(args.switches)]
+    handles = list(range(1, args.switches + 1))
+    duration = sum(dwell_times)
+    print(f"场景：{args.switches} 次切换，停留 {args.min_dwell}-{args.max_dwell} 秒，共 {duration:.1f} 秒")
+
+    desktop = make_desktop(args.switches)
+    latencies, missed, observations = run_scenario(
+        desktop, lambda tracker, d: SimulatedWindowBackend(tracker, d), dwell_times, handles)
+    summarize("事件驱动", latencies, missed, observations, duration, observations)
+
+    desktop = make_desktop(args.switches)
+    polling = {}
+
+    def polling_factory(tracker, d):
+        polling["backend"] = PollingWindowBackend(tracker, d.query, interval=args.poll_interval)
+        return polling["backend"]
+
+    latencies, missed, observations = run_scenario(desktop, polling_factory, dwell_times, handles)
+    summarize("轮询", latencies, missed, observations, duration, polling["backend"].polls)
+
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+窗口切换截图防抖
+
+窗口切换时不立即截图，而是在共享定时线程中安排一次延迟截图：
+窗口在前台停留超过 dwell 秒才截图；期间又切换到其他窗口时，前一次截图被取代（切换事件照常记录），
+快速 Alt+Tab 经过的中间窗口不再逐个截图。另外按最近一分钟的截图次数限制最坏情况下的开销。
+"""
+import time
+import threading
+from collections import deque
+
+
+class SwitchCaptureDebouncer:
+    """
+    窗口切换截图防抖
+    on_switch 在窗口监听线程中调用，只安排定时任务；到期时窗口仍在前台且未超出每分钟次数才调用 capture(窗口快照)
+    """
+
+    def __init__(self, scheduler, capture, current_handle, dwell=0.5, max_per_minute=20, is_paused=None,
+                 clock=time.monotonic):
+        self.scheduler = scheduler
+        self.capture = capture                  # 截图函数，参数为窗口快照
+        self.current_handle = current_handle    # 返回当前前台窗口句柄
+        self.dwell = dwell                      # 窗口在前台停留超过该时间(秒)才截图
+        self.max_per_minute = max_per_minute    # 最近一分钟内最多截图次数
+        self.is_paused = is_paused
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.pending = None                     # 等待截图的窗口快照
+        self.timer = None
+        self.recent = deque()                   # 最近一分钟内的截图时间
+
+        # 统计
+        self.switches = 0
+        self.captured = 0
+        self.superseded = 0
+        self.left_early = 0
+        self.over_budget = 0
+
+    def on_switch(self, window):
+        """窗口切换：安排一次延迟截图，取代尚未执行的截图"""
+        with self.lock:
+            self.switches += 1
+            if self.timer is not None:
+                self.timer.cancel()
+                self.superseded += 1
+            self.pending = window
+            self.timer = self.scheduler.call_at(self.clock() + self.dwell, lambda: self._fire(window))
+
+    def _fire(self, window):
+        """定时任务：窗口仍在前台且未超出次数限制时截图"""
+        with self.lock:
+            if self.pending is not window:
+                return
+            self.pending = None
+            self.timer = None
+            if self.is_paused is not None and self.is_paused():
+                return
+            if self.current_handle() != window.handle:
+                self.left_early += 1
+                return
+            now = self.clock()
+            while self.recent and self.recent[0] <= now - 60:
+                self.recent.popleft()
+            if len(self.recent) >= self.max_per_minute:
+                self.over_budget += 1
+                return
+            self.recent.append(now)
+            self.captured += 1
+        self.capture(window)
+
+    def cancel(self):
+        """取消尚未执行的截图（停止监控时调用）"""
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = None
+            self.pending = None
+
+    def stats(self):
+        """切换和截图统计"""
+        with self.lock:
+            return {
+                "switches": self.switches,
+                "captured": self.captured,
+                "superseded": self.superseded,
+                "left_early": self.left_early,
+                "over_budget": self.over_budget,
+            }
@@ -0,0 +1,126 @@
+"""
+负载自适应采集
+
+定时采样系统和本进程的CPU/内存占用，负载持续偏高时逐级切换到更省资源的采集配置
+（更长的定时截图间隔、更低的截图分辨率/质量和更快的编码、更长的窗口轮询间隔、更粗的滚动汇总），
+负载持续回落后再逐级恢复。降级和恢复需要连续若干次采样满足条件（恢复需要的次数更多），
+避免在阈值附近来回切换。
+"""
+import os
+
+import psutil
+
+
+class CaptureProfile:
+    """
+    采集配置
+    为 None 的项使用程序的默认设置
+    encode_profiles: 各截图原因的编码设置 {原因: EncodeProfile}，未列出的原因使用默认设置
+    """
+
+    def __init__(self, name, screenshot_interval=None, window_poll_interval=None, scroll_idle_flush=None,
+                 encode_profiles=None, change_min_interval=None):
+        self.name = name
+        self.screenshot_interval = screenshot_interval    # 定时截图间隔(秒)，变化检测方式下为最长截图间隔
+        self.change_min_interval = change_min_interval    # 变化检测方式下两次截图的最短间隔(秒)
+        self.window_poll_interval = window_poll_interval  # 窗口轮询间隔(秒)，仅轮询方式有效
+        self.scroll_idle_flush = scroll_idle_flush        # 滚动汇总的空闲提交时间(秒)
+        self.encode_profiles = encode_profiles or {}
+
+    def describe(self):
+        """简短描述，用于日志"""
+        parts = [self.name]
+        if self.screenshot_interval is not None:
+            parts.append(f"定时截图{self.screenshot_interval:g}秒")
+        for reason, profile in self.encode_profiles.items():
+            parts.append(f"{reason}{profile.describe()}")
+        return " ".join(parts)
+
+
+class SystemSampler:
+    """用 psutil 采样系统和本进程的CPU/内存占用（CPU为两次采样之间的平均值，不阻塞）"""
+
+    def __init__(self, pid=None):
+        self.process = psutil.Process(pid or os.getpid())
+        self.cpu_count = psutil.cpu_count() or 1
+        # 第一次调用只建立基准
+        psutil.cpu_percent(None)
+        self.process.cpu_percent(None)
+
+    def sample(self):
+        """返回 {cpu: 系统CPU%, process_cpu: 本进程CPU%(按全部核心折算), memory: 系统内存%, process_memory_mb}"""
+        return {
+            "cpu": psutil.cpu_percent(None),
+            "process_cpu": self.process.cpu_percent(None) / self.cpu_count,
+            "memory": psutil.virtual_memory().percent,
+            "process_memory_mb": self.process.memory_info().rss / (1024 * 1024),
+        }
+
+
+class CaptureGovernor:
+    """
+    采集配置调节器
+    tick 由共享定时线程定时调用；配置变化时调用 on_change(原配置, 新配置, 采样结果)
+    """
+
+    def __init__(self, profiles, sample, on_change=None, cpu_high=75.0, cpu_low=40.0,
+                 process_cpu_high=15.0, process_cpu_low=5.0, memory_high=90.0, memory_low=80.0,
+                 degrade_samples=2, recover_samples=6):
+        self.profiles = list(profiles)        # 按精度从高到低排列
+        self.sample = sample                  # 返回采样结果
+        self.on_change = on_change
+        self.cpu_high = cpu_high              # 系统CPU(%)达到该值视为负载高
+        self.cpu_low = cpu_low                # 系统CPU(%)不超过该值视为负载低
+        self.process_cpu_high = process_cpu_high
+        self.process_cpu_low = process_cpu_low
+        self.memory_high = memory_high
+        self.memory_low = memory_low
+        self.degrade_samples = degrade_samples  # 连续几次负载高时降一级
+        self.recover_samples = recover_samples  # 连续几次负载低时升一级
+        self.level = 0
+        self.high_count = 0
+        self.low_count = 0
+        self.samples = 0
+        self.changes = 0
+        self.last_sample = None
+
+    @property
+    def profile(self):
+        """当前采集配置"""
+        return self.profiles[self.level]
+
+    def tick(self):
+        """采样一次并按需切换配置"""
+        self.update(self.sample())
+
+    def update(self, sample):
+        """根据一次采样结果更新计数，满足条件时切换一级，返回是否切换"""
+        self.samples += 1
+        self.last_sample = sample
+        overloaded = (sample["cpu"] >= self.cpu_high or sample["process_cpu"] >= self.process_cpu_high
+                      or sample["memory"] >= self.memory_high)
+        relaxed = (sample["cpu"] <= self.cpu_low and sample["process_cpu"] <= self.process_cpu_low
+                   and sample["memory"] <= self.memory_low)
+        self.high_count = self.high_count + 1 if overloaded else 0
+        self.low_count = self.low_count + 1 if relaxed else 0
+
+        if self.high_count >= self.degrade_samples and self.level < len(self.profiles) - 1:
+            return self._switch(self.level + 1, sample)
+        if self.low_count >= self.recover_samples and self.level > 0:
+            return self._switch(self.level - 1, sample)
+        return False
+
+    def _switch(self, level, sample):
+        old = self.profile
+        self.level = level
+        self.high_count = 0
+        self.low_count = 0
+        self.changes += 1
+        if self.on_change is not None:
+            self.on_change(old, self.profile, sample)
+        return True
+
+
+def describe_sample(sample):
+    """采样结果的简短描述，如：CPU 82%，本程序 6%，内存 71%"""
+    return f"CPU {sample['cpu']:.0f}%，本程序 {sample['process_cpu']:.0f}%，内存 {sample['memory']:.0f}%"
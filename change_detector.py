@@ -0,0 +1,114 @@
+"""
+画面变化检测
+
+以较低频率抓取一张大幅缩小的灰度探测画面，与上次截图时的探测画面按块比较：
+两张画面差值图缩小到"每块一个像素"即为各块的平均差异，平均差异超过像素阈值的块计为变化，
+变化块所占比例超过阈值时触发一次截图。两次截图之间至少间隔 min_interval 秒，
+超过 max_interval 秒没有截图时无论画面是否变化都截图一次。
+"""
+import time
+import threading
+
+from PIL import Image, ImageChops
+
+
+def make_probe(image, size=(160, 90)):
+    """把画面缩小为探测画面（灰度）"""
+    if image.size != size:
+        # 先按整数倍快速缩小，再缩放到探测尺寸
+        factor = max(1, min(image.size[0] // size[0], image.size[1] // size[1]))
+        if factor > 1:
+            image = image.reduce(factor)
+        image = image.resize(size, Image.BOX)
+    return image.convert("L")
+
+
+def changed_fraction(reference, probe, tile_size=10, pixel_threshold=10):
+    """两张探测画面中平均差异超过 pixel_threshold 的块所占的比例"""
+    width, height = probe.size
+    tiles = (max(1, width // tile_size), max(1, height // tile_size))
+    diff = ImageChops.difference(reference, probe).resize(tiles, Image.BOX)
+    values = diff.tobytes()
+    return sum(1 for value in values if value > pixel_threshold) / len(values)
+
+
+class ChangeDetector:
+    """
+    画面变化触发截图
+    check 由截图抓取线程按探测间隔执行（共享定时线程只提交请求）；截图由 capture(原因) 完成，
+    其他原因的截图（如窗口切换）完成后调用 mark_captured，下一次探测以新画面为基准
+    """
+
+    def __init__(self, grab_probe, capture, min_interval=10.0, max_interval=60.0, change_threshold=0.1,
+                 tile_size=10, pixel_threshold=10, is_paused=None, clock=time.monotonic):
+        self.grab_probe = grab_probe              # 返回探测画面（已缩小的灰度图）
+        self.capture = capture                    # 截图函数，参数为截图原因
+        self.min_interval = min_interval          # 两次截图的最短间隔(秒)
+        self.max_interval = max_interval          # 超过该时间(秒)没有截图时强制截图
+        self.change_threshold = change_threshold  # 触发截图的变化块比例
+        self.tile_size = tile_size
+        self.pixel_threshold = pixel_threshold
+        self.is_paused = is_paused
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.reference = None                     # 上次截图时的探测画面
+        self.last_capture = None
+
+        # 统计
+        self.probes = 0
+        self.probe_time = 0.0
+        self.change_captures = 0
+        self.forced_captures = 0
+
+    def mark_captured(self, probe=None):
+        """记录一次截图；未提供探测画面时，下一次探测的画面作为比较基准"""
+        with self.lock:
+            self.last_capture = self.clock()
+            self.reference = probe
+
+    def check(self):
+        """探测一次画面，需要时截图，返回触发的截图原因或 None"""
+        if self.is_paused is not None and self.is_paused():
+            return None
+        now = self.clock()
+        with self.lock:
+            last_capture = self.last_capture
+            reference = self.reference
+        if last_capture is None or now - last_capture >= self.max_interval:
+            self.forced_captures += 1
+            self._capture("定时截图")
+            return "定时截图"
+        if now - last_capture < self.min_interval and reference is not None:
+            return None  # 未到最短间隔，不必探测
+
+        start = time.perf_counter()
+        probe = self.grab_probe()
+        fraction = None
+        if reference is not None and reference.size == probe.size:
+            fraction = changed_fraction(reference, probe, self.tile_size, self.pixel_threshold)
+        self.probes += 1
+        self.probe_time += time.perf_counter() - start
+
+        if fraction is None:
+            with self.lock:
+                if self.reference is None:
+                    self.reference = probe
+            return None
+        if fraction >= self.change_threshold:
+            self.change_captures += 1
+            self._capture("内容变化", probe)
+            return "内容变化"
+        return None
+
+    def _capture(self, reason, probe=None):
+        self.capture(reason)
+        self.mark_captured(probe)
+
+    def stats(self):
+        """探测和截图统计"""
+        return {
+            "probes": self.probes,
+            "avg_probe_ms": self.probe_time / self.probes * 1000 if self.probes else 0.0,
+            "change_captures": self.change_captures,
+            "forced_captures": self.forced_captures,
+        }
@@ -0,0 +1,205 @@
+"""
+剪贴板内容采集
+
+复制/剪贴/粘贴事件不在钩子线程中读取剪贴板，而是把事件记录交给后台线程：
+后台线程在限定时间内（可重试）读取剪贴板，计算内容的SHA-256，
+按哈希把全文保存到剪贴板文件夹（相同内容只保存一次），
+再把"【字数】预览（来源：窗口）[sha256:哈希]"填入记录的剪贴板列后交给写入线程。
+
+因此复制/剪贴/粘贴的记录在读取完成后才写入，CSV中可能排在其后发生的少量事件之后；
+记录的时间戳仍是操作发生时（钩子线程中）的时间，按时间戳排序即可恢复操作顺序。
+"""
+import os
+import time
+import queue
+import hashlib
+import threading
+
+# 剪贴板列中引用的哈希长度（十六进制字符数）
+KEY_LENGTH = 16
+
+
+def format_clipboard(text, source_title, key=None):
+    """格式化剪贴板内容: 【字数】内容（来源：窗口标签），超过200字只显示前50个和后50个字符"""
+    text_len = len(text)
+    if text_len > 200:
+        preview = f"{text[:50]}......{text[-50:]}"
+    else:
+        preview = text
+    content = f"【{text_len}】{preview}（来源：{source_title}）"
+    if key:
+        content += f"[sha256:{key}]"
+    return content
+
+
+def content_key(text):
+    """剪贴板文本的内容哈希（SHA-256 的前 KEY_LENGTH 个十六进制字符）"""
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()[:KEY_LENGTH]
+
+
+class ClipboardStore:
+    """
+    按内容哈希保存剪贴板全文
+    文件名为 <哈希>.txt，已存在的内容不再写入；最近一次的文本和哈希会缓存，
+    连续多次粘贴同一内容时不重复计算哈希
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.known = set()          # 已保存的哈希
+        self.last_text = None
+        self.last_key = None
+
+        # 统计
+        self.stored = 0
+        self.reused = 0
+        self.bytes_written = 0
+        self.bytes_saved = 0
+
+    def path_for(self, key):
+        return os.path.join(self.folder, f"{key}.txt")
+
+    def put(self, text):
+        """保存文本（已存在时跳过），返回内容哈希"""
+        if text == self.last_text:
+            key = self.last_key
+        else:
+            key = content_key(text)
+            self.last_text = text
+            self.last_key = key
+        if key in self.known or os.path.exists(self.path_for(key)):
+            self.known.add(key)
+            self.reused += 1
+            self.bytes_saved += len(text.encode("utf-8", "surrogatepass"))
+            return key
+        data = text.encode("utf-8", "surrogatepass")
+        path = self.path_for(key)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self.known.add(key)
+        self.stored += 1
+        self.bytes_written += len(data)
+        return key
+
+    def read(self, key):
+        """按哈希读取保存的全文"""
+        with open(self.path_for(key), 'rb') as f:
+            return f.read().decode("utf-8", "surrogatepass")
+
+
+class ClipboardCapture:
+    """
+    剪贴板读取线程
+    submit 在钩子线程中调用，只把事件记录放入队列；后台线程读取剪贴板、保存全文后
+    填写记录的剪贴板列并交给输出函数。读取失败时在 timeout 秒内按 retry_interval 重试。
+    记录的时间戳（timestamp_ns、wall_ns）在事件发生时已确定，不会改为输出时的时间；
+    输出的先后顺序可能晚于其后的少量事件（最多晚一次读取的时间预算加上排队等待的时间）
+    """
+
+    # 停止信号
+    _STOP = object()
+
+    def __init__(self, reader, emit, store=None, timeout=0.5, retry_interval=0.05, max_queue=64,
+                 on_error=None, clock=time.monotonic):
+        self.reader = reader                  # 返回剪贴板文本
+        self.emit = emit                      # 事件记录输出函数
+        self.store = store                    # ClipboardStore，为 None 时不保存全文
+        self.timeout = timeout                # 单次读取的时间预算(秒)
+        self.retry_interval = retry_interval  # 读取失败后的重试间隔(秒)
+        self.on_error = on_error              # 错误回调，参数为错误信息
+        self.clock = clock
+        self.requests = queue.Queue(maxsize=max_queue)
+        self.thread = None
+
+        # 统计
+        self.lock = threading.Lock()
+        self.captured = 0
+        self.failed = 0
+        self.overflow = 0
+        self.total_read_time = 0.0
+        self.max_read_time = 0.0
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="ClipboardCapture", daemon=True)
+        self.thread.start()
+
+    def submit(self, record):
+        """提交一条剪贴板操作的事件记录；队列已满时不读取剪贴板，直接输出记录"""
+        try:
+            self.requests.put_nowait(record)
+        except queue.Full:
+            with self.lock:
+                self.overflow += 1
+            record.clipboard = "无法获取剪贴板内容: 读取队列已满"
+            self.emit(record)
+
+    def _read(self):
+        """在时间预算内读取剪贴板，返回 (文本, 错误信息)"""
+        deadline = self.clock() + self.timeout
+        while True:
+            try:
+                return self.reader(), None
+            except Exception as e:
+                error = e
+            if self.clock() + self.retry_interval > deadline:
+                return None, f"无法获取剪贴板内容: {error}"
+            time.sleep(self.retry_interval)
+
+    def _run(self):
+        while True:
+            record = self.requests.get()
+            if record is self._STOP:
+                break
+            start = time.perf_counter()
+            text, error = self._read()
+            elapsed = time.perf_counter() - start
+            if error is not None:
+                record.clipboard = error
+                with self.lock:
+                    self.failed += 1
+            elif text:
+                key = None
+                if self.store is not None:
+                    try:
+                        key = self.store.put(text)
+                    except Exception as e:
+                        if self.on_error:
+                            self.on_error(f"错误：剪贴板内容保存失败 - {str(e)}")
+                record.clipboard = format_clipboard(text, record.window_title, key)
+            with self.lock:
+                self.captured += 1
+                self.total_read_time += elapsed
+                if elapsed > self.max_read_time:
+                    self.max_read_time = elapsed
+            try:
+                self.emit(record)
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(f"记录剪贴板事件失败: {str(e)}")
+
+    def stats(self):
+        """返回读取统计信息"""
+        with self.lock:
+            result = {
+                "captured": self.captured,
+                "failed": self.failed,
+                "overflow": self.overflow,
+                "avg_read_ms": self.total_read_time / self.captured * 1000 if self.captured else 0.0,
+                "max_read_ms": self.max_read_time * 1000,
+            }
+        if self.store is not None:
+            result.update(stored=self.store.stored, reused=self.store.reused,
+                          bytes_written=self.store.bytes_written, bytes_saved=self.store.bytes_saved)
+        return result
+
+    def stop(self, timeout=5):
+        """处理完队列中剩余的记录后停止线程"""
+        if self.thread is None:
+            return True
+        self.requests.put(self._STOP)
+        self.thread.join(timeout)
+        alive = self.thread.is_alive()
+        self.thread = None
+        return not alive
@@ -0,0 +1,280 @@
+"""
+CSV分段写入与读取
+
+会话CSV超过设定大小或时长后切换到新的分段文件（学号_姓名_日期_时间_002.csv ...），
+第一段沿用原文件名；已关闭的分段由后台线程压缩为 .csv.gz。
+清单文件（..._manifest.json）按顺序记录各分段，读取工具据此把整个会话还原为一张表。
+
+命令行用法：
+    python csv_segments.py 会话文件夹 -o 合并.csv
+"""
+import os
+import csv
+import sys
+import json
+import glob
+import gzip
+import time
+import queue
+import shutil
+import argparse
+import threading
+
+from event_writer import CsvSink
+from event_record import CsvRowFormatter
+
+MANIFEST_SUFFIX = "_manifest.json"
+
+
+def segment_path(base_path, index):
+    """第 index 段的文件路径（第一段即原文件）"""
+    if index == 1:
+        return base_path
+    root, ext = os.path.splitext(base_path)
+    return f"{root}_{index:03d}{ext}"
+
+
+def manifest_path(base_path):
+    return os.path.splitext(base_path)[0] + MANIFEST_SUFFIX
+
+
+class SegmentCompressor(threading.Thread):
+    """后台压缩线程：将已关闭的分段压缩为 .gz，完成后回调更新清单"""
+
+    # 停止信号
+    _STOP = object()
+
+    def __init__(self, on_done, on_error=None, compress_level=6):
+        super().__init__(name="SegmentCompressor", daemon=True)
+        self.on_done = on_done
+        self.on_error = on_error
+        self.compress_level = compress_level
+        self.tasks = queue.Queue()
+        self.compressed = 0
+
+    def submit(self, index, path):
+        self.tasks.put((index, path))
+
+    def run(self):
+        while True:
+            task = self.tasks.get()
+            if task is self._STOP:
+                break
+            index, path = task
+            gz_path = path + ".gz"
+            try:
+                # 先写临时文件再改名，中途崩溃时原CSV仍然完整
+                with open(path, 'rb') as src, gzip.open(gz_path + ".tmp", 'wb', self.compress_level) as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+                os.replace(gz_path + ".tmp", gz_path)
+                self.on_done(index, gz_path)
+                os.remove(path)
+                self.compressed += 1
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(f"错误：压缩分段失败 - {str(e)}")
+
+    def stop(self, timeout=None):
+        """处理完已提交的分段后停止"""
+        self.tasks.put(self._STOP)
+        self.join(timeout)
+        return not self.is_alive()
+
+
+class RotatingCsvSink(CsvSink):
+    """
+    分段CSV输出端
+    每批写入前检查当前分段的大小和时长，超过限制则关闭当前分段、写入清单并开始新分段；
+    每个分段都带表头，可单独用 Excel 打开；清单已存在时（恢复未结束的会话）接着最后一个分段写入
+    """
+
+    def __init__(self, csv_filepath, formatter, max_bytes=0, max_seconds=0, compress=True,
+                 on_error=None, clock=time.monotonic):
+        self.base_path = csv_filepath
+        self.manifest_path = manifest_path(csv_filepath)
+        self.segments = [self._segment_entry(1, csv_filepath)]
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding='utf-8') as f:
+                self.segments = json.load(f)["segments"]
+            self.segments[-1]["closed"] = False
+        super().__init__(segment_path(csv_filepath, self.segments[-1]["index"]), formatter)
+        self.max_bytes = max_bytes        # 单个分段最大字节数，0 表示不限
+        self.max_seconds = max_seconds    # 单个分段最长时长(秒)，0 表示不限
+        self.clock = clock
+        self.segment_start = clock()
+        self.manifest_lock = threading.Lock()
+        self.compressor = None
+        if compress:
+            self.compressor = SegmentCompressor(self._on_compressed, on_error)
+            self.compressor.start()
+        self._write_manifest()
+
+    @staticmethod
+    def _segment_entry(index, path):
+        return {"index": index, "file": os.path.basename(path), "rows": 0, "closed": False}
+
+    def write_rows(self, records):
+        """批量写入事件记录，必要时先切换分段"""
+        if self._should_rotate():
+            self.rotate()
+        records = list(records)
+        super().write_rows(records)
+        self.segments[-1]["rows"] += len(records)
+
+    def _should_rotate(self):
+        if self.segments[-1]["rows"] == 0:
+            return False
+        if self.max_seconds and self.clock() - self.segment_start >= self.max_seconds:
+            return True
+        return bool(self.max_bytes) and self.file.tell() >= self.max_bytes
+
+    def rotate(self):
+        """关闭当前分段并开始新分段"""
+        closed = self.segments[-1]
+        closed_path = self.csv_filepath
+        super().close()
+        index = closed["index"] + 1
+        path = segment_path(self.base_path, index)
+        self.csv_filepath = path
+        self.file = open(path, 'w', newline='', encoding='utf-8-sig')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(CsvRowFormatter.HEADER)
+        self.segment_start = self.clock()
+        with self.manifest_lock:
+            closed["closed"] = True
+            self.segments.append(self._segment_entry(index, path))
+        self._write_manifest()
+        if self.compressor is not None:
+            self.compressor.submit(closed["index"], closed_path)
+
+    def position(self):
+        """当前分段及写入位置（用于崩溃恢复的检查点）"""
+        segment = self.segments[-1]
+        return {"segment": segment["index"], "offset": self.file.tell(), "rows": segment["rows"]}
+
+    def can_restore(self, position):
+        index = position["segment"]
+        if index < self.segments[-1]["index"]:
+            # 检查点所在分段之后已切换过，该分段是完整的
+            return True
+        return index == self.segments[-1]["index"] and os.path.getsize(self.csv_filepath) >= position["offset"]
+
+    def truncate_to(self, position):
+        """回到检查点所在分段并截断，删除之后的分段"""
+        index = position["segment"]
+        if index < self.segments[-1]["index"]:
+            self.file.close()
+            for segment in self.segments[index:]:
+                path = segment_path(self.base_path, segment["index"])
+                for candidate in (path, path + ".gz"):
+                    if os.path.exists(candidate):
+                        os.remove(candidate)
+            path = segment_path(self.base_path, index)
+            if not os.path.exists(path) and os.path.exists(path + ".gz"):
+                # 该分段已被压缩：解压回CSV以便继续写入
+                with gzip.open(path + ".gz", 'rb') as src, open(path, 'wb') as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+                os.remove(path + ".gz")
+            del self.segments[index:]
+            self.segments[-1].update(file=os.path.basename(path), closed=False)
+            self.csv_filepath = path
+            self.file = open(path, 'a', newline='', encoding='utf-8-sig')
+            self.writer = csv.writer(self.file)
+        super().truncate_to(position)
+        self.segments[-1]["rows"] = position["rows"]
+        self._write_manifest()
+
+    def _on_compressed(self, index, gz_path):
+        """压缩完成：清单改为指向 .gz 文件"""
+        with self.manifest_lock:
+            self.segments[index - 1]["file"] = os.path.basename(gz_path)
+        self._write_manifest()
+
+    def _write_manifest(self, closed=False):
+        """原子地写入清单文件"""
+        with self.manifest_lock:
+            manifest = {"header": CsvRowFormatter.HEADER, "closed": closed,
+                        "segments": [dict(segment) for segment in self.segments]}
+            tmp_path = self.manifest_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.manifest_path)
+
+    def close(self):
+        """关闭当前分段，等待后台压缩完成并标记会话结束"""
+        super().close()
+        with self.manifest_lock:
+            self.segments[-1]["closed"] = True
+        if self.compressor is not None:
+            self.compressor.stop(timeout=30)
+        self._write_manifest(closed=True)
+
+
+def find_manifest(session):
+    """session 可以是清单文件、第一段CSV或会话文件夹"""
+    if session.endswith(MANIFEST_SUFFIX):
+        return session
+    if os.path.isdir(session):
+        found = sorted(glob.glob(os.path.join(session, "*" + MANIFEST_SUFFIX)))
+        return found[0] if found else None
+    candidate = manifest_path(session)
+    return candidate if os.path.exists(candidate) else None
+
+
+def session_segment_files(session):
+    """按顺序返回会话的全部分段文件路径"""
+    manifest = find_manifest(session)
+    if manifest is None:
+        # 没有清单（未分段的旧会话）：直接读取CSV文件
+        if os.path.isdir(session):
+            return sorted(glob.glob(os.path.join(session, "*.csv")))
+        return [session]
+    with open(manifest, encoding='utf-8') as f:
+        segments = json.load(f)["segments"]
+    folder = os.path.dirname(manifest)
+    files = []
+    for segment in segments:
+        path = os.path.join(folder, segment["file"])
+        if not os.path.exists(path):
+            # 清单写入后压缩尚未记录（或相反）时，尝试另一种扩展名
+            alternative = path[:-3] if path.endswith(".gz") else path + ".gz"
+            if os.path.exists(alternative):
+                path = alternative
+        files.append(path)
+    return files
+
+
+def open_segment(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, 'rt', newline='', encoding='utf-8-sig')
+    return open(path, 'r', newline='', encoding='utf-8-sig')
+
+
+def iter_session_rows(session, include_header=True):
+    """逐行读取整个会话（各分段首行的表头只输出一次）"""
+    header_sent = not include_header
+    for path in session_segment_files(session):
+        with open_segment(path) as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is not None and not header_sent:
+                header_sent = True
+                yield header
+            yield from reader
+
+
+def main():
+    parser = argparse.ArgumentParser(description="读取分段保存的会话CSV")
+    parser.add_argument("session", help="会话文件夹、清单文件或第一段CSV文件")
+    parser.add_argument("-o", "--output", help="合并后的CSV文件（默认输出到屏幕）")
+    args = parser.parse_args()
+
+    if args.output:
+        with open(args.output, 'w', newline='', encoding='utf-8-sig') as f:
+            csv.writer(f).writerows(iter_session_rows(args.session))
+    else:
+        csv.writer(sys.stdout).writerows(iter_session_rows(args.session))
+
+
+if __name__ == "__main__":
+    main()
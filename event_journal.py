@@ -0,0 +1,248 @@
+"""
+崩溃恢复日志（journal）
+
+写入线程每从队列取出一批事件，就先以带长度前缀的二进制记录追加到日志文件，
+再按批量策略写入CSV/数据库；每次写入输出端后追加一条检查点记录（各输出端的写入位置），
+并按时间间隔让输出端落盘。输出端落盘后，此前的事件恢复时不再需要：
+此时改写为只含会话信息和该检查点的新日志（写入临时文件并 fsync 后替换），日志不会随会话增长。
+正常结束时写入结束标记并删除日志。
+
+下次启动时若会话文件夹中仍有日志文件，说明上次没有正常结束：
+选取与输出端实际内容一致的最后一个检查点，将输出端截断到该位置，再补写之后的事件。
+
+记录格式：4字节长度 + 4字节CRC32（小端）+ 内容；内容首字节为记录类型：
+    H 会话信息(JSON)  E 事件(JSON数组)  C 检查点(JSON)  X 结束标记
+"""
+import os
+import json
+import time
+import glob
+import struct
+import zlib
+
+from event_record import EventRecord, OPERATION_TYPES, WINDOW_STATES, wall_to_monotonic_ns
+
+MAGIC = b"UBCJ1\n"
+JOURNAL_SUFFIX = ".journal"
+_RECORD_HEADER = struct.Struct("<II")
+
+RECORD_HEADER = b"H"
+RECORD_EVENT = b"E"
+RECORD_CHECKPOINT = b"C"
+RECORD_CLOSE = b"X"
+
+
+def journal_path(csv_filepath):
+    return os.path.splitext(csv_filepath)[0] + JOURNAL_SUFFIX
+
+
+def encode_event(record):
+    """事件记录 → 日志内容（保存记录的系统时间，补写时原样使用）"""
+    return RECORD_EVENT + json.dumps(
+        [record.wall_ns, OPERATION_TYPES.names[record.op_code], record.detail,
+         record.process_name, record.window_title, WINDOW_STATES.names[record.state_code],
+         record.clipboard or "", record.screenshot],
+        ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def decode_event(payload):
+    wall_ns, operation_type, detail, process_name, window_title, state, clipboard, screenshot = \
+        json.loads(payload[1:].decode("utf-8"))
+    return EventRecord(operation_type, detail, process_name, window_title, state, clipboard, screenshot,
+                       timestamp_ns=wall_to_monotonic_ns(wall_ns), wall_ns=wall_ns)
+
+
+class EventJournal:
+    """追加写入的日志文件（仅由写入线程使用）"""
+
+    def __init__(self, path, header, fsync_interval=5.0, clock=time.monotonic):
+        self.path = path
+        self.header = header
+        self.fsync_interval = fsync_interval  # fsync 间隔(秒)
+        self.clock = clock
+        self.base_rows = 0                    # 当前日志文件第一条事件之前已写入输出端的事件数
+        self.events_appended = 0
+        self.sync_count = 0
+        self.rotations = 0
+        self.file = open(path, 'wb')
+        self.file.write(MAGIC)
+        self._write(self._header_record())
+        self.last_sync = clock()
+
+    def _header_record(self):
+        return RECORD_HEADER + json.dumps(self.header, ensure_ascii=False).encode("utf-8")
+
+    def _write(self, payload, file=None):
+        file = file or self.file
+        file.write(_RECORD_HEADER.pack(len(payload), zlib.crc32(payload)))
+        file.write(payload)
+
+    def append_events(self, records):
+        """追加一批事件并交给操作系统（进程被结束时不丢失）"""
+        parts = []
+        pack = _RECORD_HEADER.pack
+        crc32 = zlib.crc32
+        for record in records:
+            payload = encode_event(record)
+            parts.append(pack(len(payload), crc32(payload)))
+            parts.append(payload)
+        self.file.write(b"".join(parts))
+        self.events_appended += len(records)
+        self.file.flush()
+
+    def sync_due(self):
+        return self.clock() - self.last_sync >= self.fsync_interval
+
+    def checkpoint(self, rows, positions, sync=False):
+        """
+        记录前 rows 条事件已写入各输出端，positions 为各输出端的写入位置
+        sync 为真时调用方已让输出端落盘：改写为只含该检查点的新日志
+        """
+        if sync:
+            self._rotate(rows, positions)
+            self.last_sync = self.clock()
+            self.sync_count += 1
+            return
+        self._write(self._checkpoint_record(rows - self.base_rows, positions))
+        self.file.flush()
+
+    def _checkpoint_record(self, rows, positions):
+        return RECORD_CHECKPOINT + json.dumps({"rows": rows, "sinks": positions},
+                                              ensure_ascii=False).encode("utf-8")
+
+    def _rotate(self, rows, positions):
+        """
+        写入只含会话信息和检查点的新日志并替换原日志（调用时已追加的事件都已写入输出端）
+        先写临时文件并 fsync，任何时刻崩溃都保留一份完整的日志
+        """
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(MAGIC)
+            self._write(self._header_record(), f)
+            self._write(self._checkpoint_record(0, positions), f)
+            f.flush()
+            os.fsync(f.fileno())
+        # Windows 下不能替换已打开的文件，先关闭原日志
+        self.file.close()
+        os.replace(temp_path, self.path)
+        self.file = open(self.path, 'ab')
+        self.base_rows = rows
+        self.rotations += 1
+
+    def close(self, completed=True):
+        """关闭日志；completed 为真时写入结束标记并删除日志文件"""
+        if self.file.closed:
+            return
+        if completed:
+            self._write(RECORD_CLOSE)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        self.file.close()
+        if completed:
+            os.remove(self.path)
+
+
+def iter_records(path):
+    """逐条读取日志记录，遇到不完整或校验失败的尾部记录时停止"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            return
+        while True:
+            head = f.read(_RECORD_HEADER.size)
+            if len(head) < _RECORD_HEADER.size:
+                return
+            length, crc = _RECORD_HEADER.unpack(head)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                return
+            yield payload
+
+
+def scan_journal(path):
+    """返回 (会话信息, 检查点列表, 事件数, 是否已结束)"""
+    header, checkpoints, events, closed = None, [], 0, False
+    for payload in iter_records(path):
+        kind = payload[:1]
+        if kind == RECORD_EVENT:
+            events += 1
+        elif kind == RECORD_CHECKPOINT:
+            checkpoints.append(json.loads(payload[1:].decode("utf-8")))
+        elif kind == RECORD_HEADER:
+            header = json.loads(payload[1:].decode("utf-8"))
+        elif kind == RECORD_CLOSE:
+            closed = True
+    return header, checkpoints, events, closed
+
+
+def read_events(path, skip=0):
+    """读取第 skip 条之后的事件记录"""
+    index = 0
+    for payload in iter_records(path):
+        if payload[:1] == RECORD_EVENT:
+            if index >= skip:
+                yield decode_event(payload)
+            index += 1
+
+
+def find_unfinished_journals(storage_path):
+    """查找存储目录下各会话文件夹中残留的日志文件"""
+    try:
+        folders = [entry.path for entry in os.scandir(storage_path) if entry.is_dir()]
+    except OSError:
+        return []
+    journals = []
+    for folder in folders:
+        journals.extend(glob.glob(os.path.join(folder, "*" + JOURNAL_SUFFIX)))
+    return sorted(journals)
+
+
+def read_journal_header(path):
+    for payload in iter_records(path):
+        if payload[:1] == RECORD_HEADER:
+            return json.loads(payload[1:].decode("utf-8"))
+    return None
+
+
+def recover_journal(path, sinks, batch_size=1000, on_progress=None):
+    """
+    恢复一个未正常结束的会话，返回补写的事件数
+    sinks 为按会话信息重新打开的输出端（需提供 kind / can_restore / truncate_to）；
+    on_progress 在每补写一批后以已补写的事件数调用
+    """
+    _, checkpoints, _, closed = scan_journal(path)
+    if closed:
+        os.remove(path)
+        return 0
+
+    # 从后往前找与输出端实际内容一致的检查点（断电时检查点可能比数据先落盘）
+    chosen = {"rows": 0, "sinks": {}}
+    for checkpoint in reversed(checkpoints):
+        positions = checkpoint["sinks"]
+        if all(sink.can_restore(positions[sink.kind]) for sink in sinks if sink.kind in positions):
+            chosen = checkpoint
+            break
+
+    for sink in sinks:
+        if sink.kind in chosen["sinks"]:
+            sink.truncate_to(chosen["sinks"][sink.kind])
+
+    replayed = 0
+    batch = []
+    for record in read_events(path, skip=chosen["rows"]):
+        batch.append(record)
+        if len(batch) >= batch_size:
+            for sink in sinks:
+                sink.write_rows(batch)
+            replayed += len(batch)
+            batch = []
+            if on_progress is not None:
+                on_progress(replayed)
+    if batch:
+        for sink in sinks:
+            sink.write_rows(batch)
+        replayed += len(batch)
+    for sink in sinks:
+        sink.flush()
+        sink.close()
+    os.remove(path)
+    return replayed
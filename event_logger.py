@@ -0,0 +1,90 @@
+from event_record import EventRecord
+from operation_classifier import OperationClassifier
+from clipboard_capture import format_clipboard
+from metrics import NULL_METRICS
+
+# 操作类型映射
+OPERATION_MAPPING = {
+    "剪贴": ["键盘-组合键：Ctrl+X", "鼠标-操作：剪贴", "剪贴板操作：剪贴"],
+    "复制": ["键盘-组合键：Ctrl+C", "键盘-组合键：Ctrl+Insert", "鼠标-右键菜单：复制", "剪贴板操作：复制"],
+    "粘贴": ["键盘-组合键：Ctrl+V", "键盘-组合键：Shift+Insert", "鼠标-右键菜单：粘贴", "剪贴板操作：粘贴"],
+    "删除": ["键盘-特殊键：Delete", "键盘-特殊键：Backspace"],
+    "查看": ["截图：窗口切换", "窗口-状态：最小化", "窗口-状态：最大化", "窗口-状态：关闭",
+            "键盘-特殊键：↑", "键盘-特殊键：↓", "键盘-特殊键：←", "键盘-特殊键：→",
+            "键盘-特殊键：PageUp", "键盘-特殊键：PageDown",
+            "鼠标-滚轮：向上滑动", "鼠标-滚轮：向下滑动",
+            "鼠标-拖拽：完成",
+            "鼠标-拖拽：滚动条"],
+    "输入": ["键盘-输入：*", "键盘-特殊键：Space", "键盘-特殊键：Enter"],
+    "点击": ["鼠标-单击：左键", "鼠标-单击：右键", "鼠标-双击：左键", "鼠标-双击：右键"],
+    "其他": ["截图：定时截图", "截图：内容变化", "键盘-组合键：Ctrl+A", "键盘-组合键：Ctrl+Z", "鼠标-操作：右键点击"]
+}
+
+# 加载时预编译的操作类型分类器
+OPERATION_CLASSIFIER = OperationClassifier(OPERATION_MAPPING)
+
+# 需要记录剪贴板内容的操作类型
+CLIPBOARD_OPERATIONS = ("复制", "剪贴", "粘贴")
+
+
+class EventLogger:
+    """
+    事件记录器
+    将窗口、键盘、鼠标等事件整理为事件记录(EventRecord)交给输出函数，不依赖任何平台相关模块，
+    前台窗口快照(ForegroundWindow)随事件传入，剪贴板的获取方式由调用方注入；CSV等格式化工作由写入线程中的输出端完成。
+    注入 clipboard_capture 时剪贴板操作的记录交给后台线程读取剪贴板后再输出，否则在调用线程中读取
+    """
+
+    def __init__(self, emit, clipboard_reader=None, on_error=None, clipboard_capture=None, metrics=NULL_METRICS):
+        self.emit = emit                                    # 事件记录输出函数
+        self.clipboard_reader = clipboard_reader            # 返回剪贴板文本
+        self.on_error = on_error                            # 错误回调，参数为错误信息
+        self.clipboard_capture = clipboard_capture          # 后台剪贴板读取线程(ClipboardCapture)
+        self.metrics = metrics                              # 运行统计（各阶段耗时）
+
+    def log_event(self, window, operation_detail, screenshot_filename=None):
+        """根据已解析的前台窗口快照记录事件到CSV"""
+        metrics = self.metrics
+        start = metrics.clock()
+        try:
+            process_name = window.process_name
+            window_core_title = window.core_title
+            window_state = window.state
+
+            # 操作类型映射 - 移到前面，以便后面判断剪贴板
+            operation_type = OPERATION_CLASSIFIER.classify(operation_detail)
+            metrics.observe("logger.classify", start)
+
+            record = EventRecord(operation_type, operation_detail, process_name, window_core_title,
+                                 window_state, "", screenshot_filename)
+
+            # 获取剪贴板内容 - 根据 operation_type 判断
+            if operation_type in CLIPBOARD_OPERATIONS:
+                clipboard_start = metrics.clock()
+                if self.clipboard_capture is not None:
+                    # 由后台线程读取剪贴板后交给写入线程
+                    self.clipboard_capture.submit(record)
+                    metrics.observe("logger.clipboard", clipboard_start)
+                    metrics.observe("logger.log_event", start)
+                    return
+                if self.clipboard_reader is not None:
+                    try:
+                        clip_text = self.clipboard_reader()
+                        if clip_text:
+                            record.clipboard = format_clipboard(clip_text, window_core_title)
+                    except Exception as e: # 捕获更广泛的异常
+                        record.clipboard = f"无法获取剪贴板内容: {e}"
+                metrics.observe("logger.clipboard", clipboard_start)
+
+            # 交给写入线程
+            emit_start = metrics.clock()
+            self.emit(record)
+            metrics.observe("logger.emit", emit_start)
+            metrics.observe("logger.log_event", start)
+
+        except Exception as e:
+            self._report_error(f"记录窗口事件失败: {str(e)}")
+
+    def _report_error(self, message):
+        if self.on_error:
+            self.on_error(message)
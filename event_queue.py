@@ -0,0 +1,232 @@
+"""
+有界事件队列
+
+钩子线程把事件记录放入队列，由写入线程取出写入各输出端。队列有上限，放入时从不阻塞：
+磁盘写入停滞（U盘、网络驱动器）时不会卡住钩子线程，内存也不会无限增长。
+队列已满时按事件类别的策略处理：
+    POLICY_KEEP      从不丢弃（窗口切换、剪贴板、截图等）；先挤出队列中可丢弃的事件，没有时允许超出上限
+    POLICY_COALESCE  连续输入和滚轮等高频事件：能与队尾同类事件合并时合并，否则挤出最早的高频事件或丢弃
+    POLICY_DROP      其他事件：先挤出队列中的高频事件腾出位置，没有时丢弃
+被合并和丢弃的事件按类别计数，在队列回落到低水位（或写入线程即将停止）时
+由写入线程取出一行"事件队列-丢失"标记记录写入CSV，数据丢失不会悄无声息。
+"""
+import re
+import time
+import queue
+import threading
+from collections import deque
+
+from event_record import EventRecord
+from event_logger import CLIPBOARD_OPERATIONS
+from input_coalescer import format_scroll_summary
+
+POLICY_KEEP = "keep"
+POLICY_COALESCE = "coalesce"
+POLICY_DROP = "drop"
+
+# 默认策略：键为操作详情中"："前的类别（如"键盘-输入"），未列出时按"-"前的大类（如"窗口"）查找
+DEFAULT_POLICIES = {
+    "窗口": POLICY_KEEP,
+    "截图": POLICY_KEEP,
+    "采集": POLICY_KEEP,
+    "剪贴板操作": POLICY_KEEP,
+    "鼠标-轨迹": POLICY_KEEP,
+    "键盘-输入": POLICY_COALESCE,
+    "键盘-特殊键": POLICY_COALESCE,
+    "鼠标-滚轮": POLICY_COALESCE,
+}
+
+_SCROLL_PATTERN = re.compile(r"鼠标-滚轮：(.+?)滑动（(\d+)格，([\d.]+)秒，净值([+-]?[\d.]+)）$")
+_TEXT_PREFIX = "键盘-输入："
+
+
+def event_class(detail):
+    """操作详情的类别，如"键盘-输入：abc"→"键盘-输入" """
+    return detail.split("：", 1)[0]
+
+
+def merge_records(tail, record):
+    """
+    把 record 合并到队尾的同类记录 tail 中，返回是否合并
+    只合并同一窗口中的连续输入文字和同方向的滚轮汇总
+    """
+    if tail.window_title != record.window_title or tail.process_name != record.process_name:
+        return False
+    if tail.detail.startswith(_TEXT_PREFIX) and record.detail.startswith(_TEXT_PREFIX):
+        tail.detail += record.detail[len(_TEXT_PREFIX):]
+        return True
+    first = _SCROLL_PATTERN.match(tail.detail)
+    second = _SCROLL_PATTERN.match(record.detail)
+    if first and second and first.group(1) == second.group(1):
+        tail.detail = format_scroll_summary(first.group(1), int(first.group(2)) + int(second.group(2)),
+                                            float(first.group(3)) + float(second.group(3)),
+                                            float(first.group(4)) + float(second.group(4)))
+        return True
+    return False
+
+
+class BoundedEventQueue:
+    """
+    有界事件队列（接口与 queue.Queue 的 put/get/get_nowait/qsize/empty 相同）
+    非事件记录的对象（如写入线程的停止信号）按从不丢弃处理
+    """
+
+    def __init__(self, maxsize=5000, policies=None, default_policy=POLICY_DROP, low_watermark=None,
+                 clock=time.monotonic_ns):
+        self.maxsize = maxsize
+        self.policies = DEFAULT_POLICIES if policies is None else policies
+        self.default_policy = default_policy
+        # 丢失计数在队列回落到该长度时写出标记记录
+        self.low_watermark = maxsize // 2 if low_watermark is None else low_watermark
+        self.clock = clock
+        self.items = deque()            # [策略, 记录, 已合并的条数]
+        self.counts = {POLICY_KEEP: 0, POLICY_COALESCE: 0, POLICY_DROP: 0}
+        self.not_empty = threading.Condition(threading.Lock())
+        self.policy_cache = {}
+
+        # 尚未写出标记的丢失计数 {类别: [合并数, 丢弃数]}，以及第一次丢失的时间（单调时钟和系统时间）
+        self.pending_losses = {}
+        self.first_loss_ns = None
+        self.first_loss_wall_ns = None
+
+        # 统计
+        self.coalesced = 0
+        self.dropped = 0
+        self.over_bound = 0             # 队列已满仍放入的从不丢弃事件数
+        self.max_depth = 0
+        self.markers = 0
+
+    def policy(self, record):
+        """事件记录的处理策略"""
+        if not isinstance(record, EventRecord):
+            return POLICY_KEEP
+        if record.clipboard or record.operation_type in CLIPBOARD_OPERATIONS:
+            return POLICY_KEEP
+        name = event_class(record.detail)
+        policy = self.policy_cache.get(name)
+        if policy is None:
+            policy = self.policies.get(name)
+            if policy is None:
+                policy = self.policies.get(name.split("-", 1)[0], self.default_policy)
+            self.policy_cache[name] = policy
+        return policy
+
+    def put(self, record, block=True, timeout=None):
+        """放入事件记录，从不阻塞（block、timeout 参数仅为与 queue.Queue 兼容）"""
+        policy = self.policy(record)
+        with self.not_empty:
+            if len(self.items) >= self.maxsize and not self._make_room(policy, record):
+                return
+            self.items.append([policy, record, 0])
+            self.counts[policy] += 1
+            depth = len(self.items)
+            if depth > self.max_depth:
+                self.max_depth = depth
+            self.not_empty.notify()
+
+    def put_nowait(self, record):
+        self.put(record)
+
+    def _make_room(self, policy, record):
+        """队列已满：按策略合并、挤出或丢弃，返回 record 是否仍需放入队列（调用方持有锁）"""
+        if policy == POLICY_COALESCE:
+            tail = self.items[-1]
+            if tail[0] == POLICY_COALESCE and merge_records(tail[1], record):
+                tail[2] += 1
+                self._record_loss(record, coalesced=True)
+                return False
+        # 挤出最早的高频事件（新的高频事件放入队尾后，后续同类事件可与之合并）
+        if self.counts[POLICY_COALESCE] and self._evict(POLICY_COALESCE):
+            return True
+        if policy != POLICY_KEEP:
+            self._record_loss(record)
+            return False
+        # 从不丢弃的事件：再挤出普通事件，都没有时允许超出上限
+        if self.counts[POLICY_DROP] and self._evict(POLICY_DROP):
+            return True
+        self.over_bound += 1
+        return True
+
+    def _evict(self, policy):
+        """挤出队列中最早的一条指定策略的事件（已合并了其他事件的记录不挤出，合并的事件不会再丢失）"""
+        for index, (item_policy, item, merged) in enumerate(self.items):
+            if item_policy == policy and not merged:
+                del self.items[index]
+                self.counts[policy] -= 1
+                self._record_loss(item)
+                return True
+        return False
+
+    def _record_loss(self, record, coalesced=False):
+        losses = self.pending_losses.setdefault(event_class(record.detail), [0, 0])
+        if coalesced:
+            losses[0] += 1
+            self.coalesced += 1
+        else:
+            losses[1] += 1
+            self.dropped += 1
+        if self.first_loss_ns is None:
+            self.first_loss_ns = self.clock()
+            self.first_loss_wall_ns = time.time_ns()
+
+    def get(self, block=True, timeout=None):
+        """取出一条事件记录；有未写出的丢失计数且队列已回落时先取出标记记录"""
+        with self.not_empty:
+            if block:
+                if timeout is None:
+                    while not self.items and not self.pending_losses:
+                        self.not_empty.wait()
+                else:
+                    deadline = time.monotonic() + timeout
+                    while not self.items and not self.pending_losses:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise queue.Empty
+                        self.not_empty.wait(remaining)
+            if self.pending_losses and (len(self.items) <= self.low_watermark
+                                        or not isinstance(self.items[0][1], EventRecord)):
+                return self._take_marker()
+            if not self.items:
+                raise queue.Empty
+            policy, record, _ = self.items.popleft()
+            self.counts[policy] -= 1
+            return record
+
+    def get_nowait(self):
+        return self.get(False)
+
+    def _take_marker(self):
+        """生成丢失标记记录并清空计数（调用方持有锁）"""
+        parts = []
+        for name, (coalesced, dropped) in self.pending_losses.items():
+            counts = []
+            if coalesced:
+                counts.append(f"合并{coalesced}条")
+            if dropped:
+                counts.append(f"丢弃{dropped}条")
+            parts.append(f"{name} {'、'.join(counts)}")
+        marker = EventRecord("其他", f"事件队列-丢失：{'；'.join(parts)}（队列上限{self.maxsize}条）",
+                             "", "", "NORMAL", timestamp_ns=self.first_loss_ns, wall_ns=self.first_loss_wall_ns)
+        self.pending_losses = {}
+        self.first_loss_ns = None
+        self.first_loss_wall_ns = None
+        self.markers += 1
+        return marker
+
+    def qsize(self):
+        return len(self.items)
+
+    def empty(self):
+        return not self.items and not self.pending_losses
+
+    def stats(self):
+        """队列统计"""
+        with self.not_empty:
+            return {
+                "depth": len(self.items),
+                "max_depth": self.max_depth,
+                "coalesced": self.coalesced,
+                "dropped": self.dropped,
+                "over_bound": self.over_bound,
+                "markers": self.markers,
+            }
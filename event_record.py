@@ -0,0 +1,136 @@
+import os
+import sys
+import time
+import datetime
+import threading
+
+# 单调时钟与系统时间的对应关系（导入时记录一次），只用于在两种时间戳之间近似换算
+# （如恢复日志补写时为记录生成排序用的单调时间戳）；写入CSV的时间使用记录自身的系统时间
+_WALL_ANCHOR_NS = time.time_ns()
+_MONO_ANCHOR_NS = time.monotonic_ns()
+
+
+def monotonic_to_wall_ns(timestamp_ns):
+    """将单调时钟纳秒时间戳换算为系统时间（Unix纳秒）"""
+    return _WALL_ANCHOR_NS + (timestamp_ns - _MONO_ANCHOR_NS)
+
+
+def wall_to_monotonic_ns(wall_ns):
+    """将系统时间（Unix纳秒）换算为本进程的单调时钟时间戳"""
+    return _MONO_ANCHOR_NS + (wall_ns - _WALL_ANCHOR_NS)
+
+
+class CodeTable:
+    """字符串 ↔ 小整数编码表，预置常用取值，遇到新取值时自动追加"""
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.codes = {name: code for code, name in enumerate(self.names)}
+        self.lock = threading.Lock()
+
+    def code(self, name):
+        code = self.codes.get(name)
+        if code is None:
+            with self.lock:
+                code = self.codes.get(name)
+                if code is None:
+                    code = len(self.names)
+                    self.names.append(name)
+                    self.codes[name] = code
+        return code
+
+    def name(self, code):
+        return self.names[code]
+
+
+# 操作类型和窗口状态编码
+OPERATION_TYPES = CodeTable(["剪贴", "复制", "粘贴", "删除", "查看", "输入", "点击", "其他"])
+WINDOW_STATES = CodeTable(["NORMAL", "MINIMIZED", "MAXIMIZED"])
+
+
+class EventRecord:
+    """
+    事件记录
+    只保存原始字段：单调时钟时间戳（用于排序和计算时长）、系统时间（写入各输出端的时间）、
+    操作类型/窗口状态编码、驻留(intern)的窗口标签和进程名；
+    学号姓名、时间格式、截图超链接等由各输出端在写入时格式化。
+    系统时间在创建记录时读取，启动后系统时间被校正（NTP、手动修改）时之后的记录仍是当时的系统时间
+    """
+
+    __slots__ = ("timestamp_ns", "wall_ns", "op_code", "state_code", "detail", "process_name",
+                 "window_title", "clipboard", "screenshot")
+
+    def __init__(self, operation_type, operation_detail, process_name, window_title, window_state,
+                 clipboard="", screenshot=None, timestamp_ns=None, wall_ns=None):
+        self.timestamp_ns = time.monotonic_ns() if timestamp_ns is None else timestamp_ns
+        if wall_ns is None:
+            wall_ns = time.time_ns() if timestamp_ns is None else monotonic_to_wall_ns(timestamp_ns)
+        self.wall_ns = wall_ns
+        self.op_code = OPERATION_TYPES.code(operation_type)
+        self.state_code = WINDOW_STATES.code(window_state)
+        self.detail = operation_detail
+        self.process_name = sys.intern(process_name) if process_name else "未知"
+        self.window_title = sys.intern(window_title) if window_title else ""
+        self.clipboard = clipboard
+        self.screenshot = screenshot
+
+    @property
+    def operation_type(self):
+        return OPERATION_TYPES.name(self.op_code)
+
+    @property
+    def window_state(self):
+        return WINDOW_STATES.name(self.state_code)
+
+    def datetime(self):
+        """事件发生的本地时间"""
+        return datetime.datetime.fromtimestamp(self.wall_ns / 1e9)
+
+
+class CsvRowFormatter:
+    """将事件记录格式化为原有的10列CSV数据行"""
+
+    HEADER = ['学号', '姓名', '时间戳', '操作类型', '操作详情', '窗口进程名', '窗口标签', '窗口状态', '剪贴板内容', '截图文件']
+
+    def __init__(self, student_id, name, screenshots_folder=""):
+        self.student_id = student_id
+        self.name = name
+        self.screenshots_folder = screenshots_folder
+        # 同一秒内的事件共用格式化好的时间字符串
+        self._last_second = None
+        self._last_timestamp = ""
+
+    def format_timestamp(self, wall_ns):
+        """将系统时间（Unix纳秒）格式化为 YYYY-MM-DD HH:MM:SS"""
+        second = wall_ns // 1_000_000_000
+        if second != self._last_second:
+            self._last_second = second
+            self._last_timestamp = datetime.datetime.fromtimestamp(second).strftime("%Y-%m-%d %H:%M:%S")
+        return self._last_timestamp
+
+    def format_hyperlink(self, screenshot_filename):
+        """构造截图文件的 Excel 超链接公式"""
+        if not screenshot_filename:
+            return ""
+        try:
+            # 获取截图文件的绝对路径
+            full_screenshot_path = os.path.abspath(os.path.join(self.screenshots_folder, screenshot_filename))
+            # Excel 需要双引号包围参数
+            return f'=HYPERLINK("{full_screenshot_path}", "{screenshot_filename}")'
+        except Exception:
+            return screenshot_filename # 如果失败，则只写入文件名
+
+    def format(self, record):
+        """返回CSV数据行（字符串列表）"""
+        return [
+            self.student_id,
+            self.name,
+            self.format_timestamp(record.wall_ns),
+            OPERATION_TYPES.names[record.op_code],
+            record.detail,
+            record.process_name,
+            record.window_title,
+            WINDOW_STATES.names[record.state_code],
+            record.clipboard or "",
+            self.format_hyperlink(record.screenshot),
+        ]
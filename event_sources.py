@@ -0,0 +1,300 @@
+import re
+import json
+import time
+import random
+import threading
+
+from input_coalescer import format_scroll_summary
+from window_info import ForegroundWindow
+
+
+class EventSource:
+    """
+    事件源接口
+    键盘、鼠标钩子(input_hooks)、窗口监听、定时截图以及合成回放源都实现该接口，
+    由采集程序统一启动和停止
+    """
+
+    name = "source"
+
+    def start(self):
+        """启动事件源"""
+        raise NotImplementedError
+
+    def stop(self):
+        """通知事件源停止（不等待）"""
+        raise NotImplementedError
+
+    def is_alive(self):
+        """事件源是否仍在运行"""
+        return False
+
+    def join(self, timeout=None):
+        """等待事件源结束"""
+        pass
+
+
+class PeriodicSource(EventSource):
+    """在共享定时线程中周期执行的事件源（如定时截图），不单独占用线程"""
+
+    def __init__(self, name, scheduler, interval, target, first_delay=None):
+        self.name = name
+        self.scheduler = scheduler
+        self.interval = interval        # 执行间隔(秒)
+        self.target = target
+        self.first_delay = first_delay  # 第一次执行前的等待时间(秒)，默认为一个间隔
+        self.periodic = None
+
+    def start(self):
+        self.periodic = self.scheduler.call_every(self.interval, self.target, first_delay=self.first_delay)
+
+    def stop(self):
+        if self.periodic is not None:
+            self.periodic.cancel()
+            self.periodic = None
+
+    def set_interval(self, interval):
+        """修改执行间隔，运行中时从现在起按新间隔重新计时"""
+        self.interval = interval
+        if self.periodic is not None:
+            self.periodic.cancel()
+            self.periodic = self.scheduler.call_every(interval, self.target)
+
+
+# ---------------------------------------------------------------------------
+# 合成/回放事件
+# ---------------------------------------------------------------------------
+
+# 事件种类
+EVENT_KINDS = ("keyboard", "mouse", "window", "clipboard")
+
+# 默认事件比例
+DEFAULT_EVENT_MIX = {"keyboard": 0.5, "mouse": 0.3, "window": 0.1, "clipboard": 0.1}
+
+# 合成窗口：(窗口标题, 进程名)
+SYNTHETIC_WINDOWS = [
+    ("文档1.docx - Word", "WINWORD.EXE"),
+    ("百度一下，你就知道 - Google Chrome", "chrome.exe"),
+    ("考试系统 - Microsoft Edge", "msedge.exe"),
+    ("无标题 - 记事本", "notepad.exe"),
+    ("main.py - Visual Studio Code", "Code.exe"),
+]
+
+_SPECIAL_KEYS = ["回车", "退格", "删除", "空格", "↑", "↓", "←", "→", "PageUp", "PageDown"]
+_MOUSE_DETAILS = ["鼠标-单击：左键", "鼠标-单击：右键", "鼠标-拖拽：完成", "鼠标-滚轮"]
+_WINDOW_STATES = ["NORMAL", "MAXIMIZED", "MINIMIZED"]
+_TEXT_CHARS = "abcdefghijklmnopqrstuvwxyz0123456789 "
+_SCROLL_PATTERN = re.compile(r"鼠标-滚轮：(向上|向下)滑动（(\d+)格")
+
+
+def make_event(kind, detail, title, state="NORMAL", process="未知", clipboard=None, t=None):
+    """构造一条合成事件（字典，可直接序列化为JSON）"""
+    event = {"kind": kind, "detail": detail, "title": title, "state": state, "process": process}
+    if clipboard is not None:
+        event["clipboard"] = clipboard
+    if t is not None:
+        event["t"] = t
+    return event
+
+
+def generate_events(count, mix=None, seed=0, windows=None):
+    """按比例随机生成合成事件序列"""
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_EVENT_MIX
+    windows = windows or SYNTHETIC_WINDOWS
+    kinds = [k for k in EVENT_KINDS if mix.get(k, 0) > 0]
+    weights = [mix[k] for k in kinds]
+
+    title, process = windows[0]
+    state = "NORMAL"
+    events = []
+    for _ in range(count):
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "keyboard":
+            if rng.random() < 0.7:
+                text = "".join(rng.choice(_TEXT_CHARS) for _ in range(rng.randint(1, 20)))
+                detail = f"键盘-输入：{text}"
+            else:
+                detail = f"键盘-特殊键：{rng.choice(_SPECIAL_KEYS)}"
+            events.append(make_event(kind, detail, title, state, process))
+        elif kind == "mouse":
+            detail = rng.choice(_MOUSE_DETAILS)
+            if detail == "鼠标-滚轮":
+                # 连续滚动的汇总记录
+                notches = rng.randint(1, 40)
+                sign = rng.choice([1, -1])
+                detail = format_scroll_summary("向上" if sign > 0 else "向下", notches,
+                                               notches * rng.uniform(0.02, 0.15), sign * notches)
+            events.append(make_event(kind, detail, title, state, process))
+        elif kind == "window":
+            if rng.random() < 0.8:
+                title, process = rng.choice(windows)
+                state = "NORMAL"
+                detail = f"窗口-切换至：{title}"
+            else:
+                state = rng.choice(_WINDOW_STATES)
+                detail = f"窗口-状态：{state}"
+            events.append(make_event(kind, detail, title, state, process))
+        else:
+            hotkey = rng.choice(["Ctrl+C", "Ctrl+X", "Ctrl+V", "Ctrl+Insert", "Shift+Insert"])
+            text = "".join(rng.choice(_TEXT_CHARS) for _ in range(rng.randint(1, 500)))
+            events.append(make_event(kind, f"键盘-组合键：{hotkey}", title, state, process, clipboard=text))
+    return events
+
+
+def save_events(events, path):
+    """将事件序列保存为JSON Lines文件"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for event in events:
+            f.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+
+def load_events(path):
+    """从JSON Lines文件读取事件序列"""
+    events = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                events.append(json.loads(line))
+    return events
+
+
+class ReplayEventSource(EventSource):
+    """
+    合成/回放事件源
+    按指定速率（或事件记录中的时间偏移 t）把事件还原为钩子事件，送入与采集程序相同的处理路径：
+    键盘事件送入键盘钩子事件源（输入合并），鼠标事件送入鼠标钩子事件源（滚动汇总），
+    窗口事件作为前台窗口快照送入窗口切换判断(WindowTracker.observe)；
+    同时模拟前台窗口、鼠标位置和剪贴板，供各组件注入使用。
+    其他无法还原的事件直接交给 log_event(窗口快照, 操作详情)
+    """
+
+    name = "replay"
+
+    def __init__(self, events, keyboard=None, mouse=None, observe_window=None, log_event=None,
+                 flushers=(), rate=None, speed=1.0, record_latency=True):
+        self.events = events
+        self.keyboard = keyboard              # 键盘钩子事件源(KeyboardHookSource)
+        self.mouse = mouse                    # 鼠标钩子事件源(MouseHookSource)
+        self.observe_window = observe_window  # 窗口切换判断，参数为前台窗口快照
+        self.log_event = log_event            # 记录回调，参数为 (窗口快照, 操作详情)
+        self.flushers = flushers              # 窗口切换前提交的合并器（与采集程序的 flush_input 相同）
+        self.rate = rate                  # 每秒事件数；0 表示不限速；None 表示按记录的时间偏移
+        self.speed = speed                # 按时间偏移回放时的倍速
+        self.record_latency = record_latency
+        self.latencies_ns = []            # 每个事件的处理耗时(纳秒)
+        self.events_sent = 0
+        self.elapsed = 0.0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        # 模拟的前台窗口、鼠标位置和剪贴板
+        self.handles = {}                 # 窗口标题 → 模拟的窗口句柄
+        self.foreground = ForegroundWindow(None, "未知窗口")
+        self.position = (0, 0)
+        self.clipboard_text = ""
+
+    def current_window(self):
+        """返回模拟的前台窗口快照"""
+        return self.foreground
+
+    def get_position(self):
+        """返回模拟的鼠标位置"""
+        return self.position
+
+    def _move_position(self):
+        self.position = (self.position[0] + 50, self.position[1] + 20)
+
+    def read_clipboard(self):
+        """返回模拟的剪贴板内容"""
+        return self.clipboard_text
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def is_alive(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def join(self, timeout=None):
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def _scheduled_offset(self, index, event):
+        """计算事件相对开始时间的发送时刻(秒)"""
+        if self.rate is None:
+            return event.get("t", 0.0) / self.speed
+        if self.rate <= 0:
+            return 0.0
+        return index / self.rate
+
+    def run(self):
+        """在当前线程中回放全部事件"""
+        perf_counter_ns = time.perf_counter_ns
+        start = time.monotonic()
+        for index, event in enumerate(self.events):
+            if self.stop_event.is_set():
+                break
+
+            offset = self._scheduled_offset(index, event)
+            delay = start + offset - time.monotonic()
+            if delay > 0 and self.stop_event.wait(delay):
+                break
+
+            if "clipboard" in event:
+                self.clipboard_text = event["clipboard"]
+
+            t0 = perf_counter_ns()
+            self.dispatch(event)
+            if self.record_latency:
+                self.latencies_ns.append(perf_counter_ns() - t0)
+            self.events_sent += 1
+        self.elapsed = time.monotonic() - start
+
+    def _window(self, event):
+        """事件记录对应的前台窗口快照（同一标题使用同一个模拟句柄）"""
+        title = event["title"]
+        handle = self.handles.setdefault(title, len(self.handles) + 1)
+        return ForegroundWindow(handle, title, event.get("process", "未知"), event.get("state", "NORMAL"))
+
+    def dispatch(self, event):
+        """把一条事件记录还原为钩子事件送入处理路径"""
+        detail = event["detail"]
+        window = self._window(event)
+        if window.handle != self.foreground.handle:
+            # 前台窗口变化：先提交缓冲的输入，再交给窗口切换判断
+            for flusher in self.flushers:
+                flusher.flush()
+        self.foreground = window
+        kind = event.get("kind")
+
+        if kind == "window" and self.observe_window is not None:
+            self.observe_window(window)
+            return
+        if self.keyboard is not None:
+            if detail.startswith("键盘-输入："):
+                self.keyboard.replay_text(detail[len("键盘-输入："):])
+                return
+            if detail.startswith("键盘-特殊键："):
+                self.keyboard.replay_special(detail[len("键盘-特殊键："):])
+                return
+            if detail.startswith("键盘-组合键："):
+                self.keyboard.on_hotkey(detail[len("键盘-组合键："):])
+                return
+        if self.mouse is not None:
+            if detail.startswith("鼠标-单击："):
+                self.mouse.replay_click({"右键": "right", "中键": "middle"}.get(detail[len("鼠标-单击："):], "left"))
+                return
+            if detail == "鼠标-拖拽：完成":
+                self.mouse.replay_drag(self._move_position)
+                return
+            scroll = _SCROLL_PATTERN.match(detail)
+            if scroll:
+                self.mouse.replay_scroll(1 if scroll.group(1) == "向上" else -1, int(scroll.group(2)))
+                return
+        if self.log_event is not None:
+            self.log_event(window, detail)
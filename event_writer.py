@@ -0,0 +1,212 @@
+import os
+import csv
+import time
+import queue
+import threading
+
+from metrics import NULL_METRICS
+
+
+class CsvSink:
+    """CSV输出端：整个会话保持文件句柄打开，写入时将事件记录格式化为数据行"""
+
+    kind = "csv"
+
+    def __init__(self, csv_filepath, formatter):
+        self.csv_filepath = csv_filepath
+        self.formatter = formatter        # CsvRowFormatter
+        # 以追加模式打开，表头已在创建会话文件夹时写入
+        self.file = open(csv_filepath, 'a', newline='', encoding='utf-8-sig')
+        self.writer = csv.writer(self.file)
+
+    def write_rows(self, records):
+        """批量写入事件记录"""
+        format_row = self.formatter.format
+        self.writer.writerows(format_row(record) for record in records)
+
+    def flush(self):
+        """将缓冲区内容刷新到磁盘"""
+        self.file.flush()
+
+    def sync(self):
+        """确保已写入的内容落盘"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def position(self):
+        """当前写入位置（用于崩溃恢复的检查点）"""
+        return {"offset": self.file.tell()}
+
+    def can_restore(self, position):
+        """文件内容是否至少包含到该位置"""
+        return os.path.getsize(self.csv_filepath) >= position["offset"]
+
+    def truncate_to(self, position):
+        """截断到检查点位置，丢弃之后可能不完整的数据行"""
+        self.file.flush()
+        self.file.truncate(position["offset"])
+        self.file.seek(0, os.SEEK_END)
+
+    def close(self):
+        """关闭文件"""
+        if not self.file.closed:
+            self.file.flush()
+            self.file.close()
+
+
+class EventWriter(threading.Thread):
+    """
+    后台写入线程
+    从数据队列中取出事件记录，按批量大小或时间间隔统一写入各输出端，
+    生产者（键盘、鼠标、窗口等钩子线程）只需把数据放入队列
+    """
+
+    # 停止信号
+    _STOP = object()
+
+    def __init__(self, data_queue, sinks, batch_size=100, flush_interval=1.0, on_error=None, journal=None,
+                 metrics=NULL_METRICS):
+        super().__init__(name="EventWriter", daemon=True)
+        self.data_queue = data_queue
+        self.sinks = list(sinks)
+        self.batch_size = batch_size          # 达到该行数立即写入
+        self.flush_interval = flush_interval  # 最长等待时间(秒)
+        self.on_error = on_error              # 错误回调，参数为错误信息
+        self.journal = journal                # 崩溃恢复日志（EventJournal），取出的事件先追加到日志
+        self.journal_ok = journal is not None
+        self.metrics = metrics                # 运行统计（各输出端的写入耗时）
+        self.rows_written = 0
+        self.flush_count = 0
+
+    def put(self, record):
+        """生产者接口：将事件记录放入队列"""
+        self.data_queue.put(record)
+
+    def run(self):
+        """写入线程主循环"""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        # 初始检查点：各输出端的起始位置
+        self._checkpoint(sync=True)
+        while True:
+            try:
+                if batch:
+                    item = self.data_queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                else:
+                    # 没有待写入的数据时一直等待，空闲时不定时唤醒
+                    item = self.data_queue.get()
+            except queue.Empty:
+                item = None
+            else:
+                if item is self._STOP:
+                    break
+                start = len(batch)
+                if not batch:
+                    # 最长等待时间从这一批的第一条数据开始计算
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+                # 尽量一次取走队列中已有的数据
+                stopping = False
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self.data_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is self._STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                self._append_journal(batch[start:])
+                if stopping:
+                    self._flush(batch)
+                    self._close_sinks()
+                    return
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+        # 收到停止信号：写入剩余数据
+        while True:
+            try:
+                item = self.data_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not self._STOP:
+                batch.append(item)
+        self._flush(batch)
+        self._close_sinks()
+
+    def _append_journal(self, records):
+        if not self.journal_ok:
+            return
+        start = self.metrics.clock()
+        try:
+            self.journal.append_events(records)
+            self.metrics.observe("writer.journal", start)
+        except Exception as e:
+            self.journal_ok = False
+            self._report_error(f"错误：无法写入恢复日志 - {str(e)}")
+
+    def _checkpoint(self, sync=False):
+        """记录各输出端已写入的位置；到达 fsync 间隔时先让输出端落盘"""
+        if not self.journal_ok:
+            return
+        try:
+            sync = sync or self.journal.sync_due()
+            if sync:
+                for sink in self.sinks:
+                    sink.sync()
+            self.journal.checkpoint(self.rows_written, {sink.kind: sink.position() for sink in self.sinks},
+                                    sync=sync)
+        except Exception as e:
+            self.journal_ok = False
+            self._report_error(f"错误：无法写入恢复日志 - {str(e)}")
+
+    def _flush(self, batch):
+        """将一批数据写入所有输出端"""
+        if not batch:
+            return
+        for sink in self.sinks:
+            start = self.metrics.clock()
+            try:
+                sink.write_rows(batch)
+                sink.flush()
+                self.metrics.observe(f"writer.write.{sink.kind}", start)
+            except Exception as e:
+                # 之后的检查点不再可信，保留恢复日志以便下次启动时从上一个检查点补写
+                self.journal_ok = False
+                self._report_error(f"错误：无法写入数据文件 - {str(e)}")
+        self.rows_written += len(batch)
+        self.flush_count += 1
+        self.metrics.incr("writer.rows", len(batch))
+        self.metrics.incr("writer.batches")
+        self._checkpoint()
+
+    def _close_sinks(self):
+        """关闭所有输出端，全部数据写入成功时标记恢复日志为已结束"""
+        closed = True
+        for sink in self.sinks:
+            try:
+                if self.journal_ok:
+                    sink.sync()
+                sink.close()
+            except Exception as e:
+                closed = False
+                self._report_error(f"错误：关闭数据文件失败 - {str(e)}")
+        if self.journal is not None:
+            try:
+                self.journal.close(completed=closed and self.journal_ok)
+            except Exception as e:
+                self._report_error(f"错误：无法关闭恢复日志 - {str(e)}")
+
+    def _report_error(self, message):
+        if self.on_error:
+            self.on_error(message)
+
+    def stop(self, timeout=5):
+        """发送停止信号并等待最终写入完成"""
+        self.data_queue.put(self._STOP)
+        self.join(timeout)
+        return not self.is_alive()
@@ -0,0 +1,94 @@
+import os
+import hashlib
+import threading
+from collections import deque
+
+from PIL import Image
+
+
+def dhash(image, hash_size=16):
+    """
+    计算图片的差值感知哈希（dHash）
+    先缩小为 (hash_size+1) x hash_size 的灰度图，再比较相邻像素的明暗，
+    返回 hash_size*hash_size 位的整数
+    """
+    small = image.resize((hash_size + 1, hash_size), Image.BOX).convert("L")
+    pixels = small.tobytes()
+    width = hash_size + 1
+    value = 0
+    for row in range(hash_size):
+        offset = row * width
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def pixel_digest(image):
+    """画面像素的摘要（含尺寸和颜色模式），用于确认两张画面完全相同"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{image.mode}{image.size}".encode())
+    digest.update(image.tobytes())
+    return digest.digest()
+
+
+class FrameDeduplicator:
+    """
+    重复截图检测
+    只复用完全相同的画面：新画面与最近若干张已写入文件的截图之一截图方式相同
+    （画面尺寸、截图范围和编码设置，由调用方组成 key），且像素完全一致时，直接引用已有截图文件。
+    感知哈希只用于快速筛选（像素相同则哈希必然相同），哈希相同时再比较像素摘要；
+    仅有细微变化的画面（如替换一行文字）照常保存
+    """
+
+    def __init__(self, history=8, hash_size=16):
+        self.hash_size = hash_size
+        self.recent = deque(maxlen=history)  # (key, 哈希, 像素摘要, 截图路径, 文件大小)
+        self.lock = threading.Lock()
+        self.frames_checked = 0
+        self.frames_saved = 0           # 复用已有截图的次数
+        self.bytes_saved = 0            # 复用的截图文件大小之和
+
+    def find_duplicate(self, image, key=None):
+        """
+        返回 (重复截图路径或None, 画面哈希)
+        key 为截图方式（如 (尺寸, 截图范围, 编码设置)），只与截图方式相同的截图比较
+        """
+        frame_hash = dhash(image, self.hash_size)
+        with self.lock:
+            self.frames_checked += 1
+            # 从最近的截图开始比较
+            candidates = [(digest, path, size)
+                          for recent_key, recent_hash, digest, path, size in reversed(self.recent)
+                          if recent_key == key and recent_hash == frame_hash]
+        if candidates:
+            # 哈希相同时再比较像素摘要（仅在有候选时计算）
+            frame_digest = pixel_digest(image)
+            for digest, path, size in candidates:
+                if digest == frame_digest:
+                    with self.lock:
+                        self.frames_saved += 1
+                        self.bytes_saved += size
+                    return path, frame_hash
+        return None, frame_hash
+
+    def remember(self, frame_hash, path, image, key=None):
+        """
+        记录一张已写入文件的截图（由编码线程在文件写入成功后调用，
+        编码失败的截图不会被引用）
+        """
+        digest = pixel_digest(image)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        with self.lock:
+            self.recent.append((key, frame_hash, digest, path, size))
+
+    def stats(self):
+        """返回去重统计：检测帧数、跳过帧数、节省字节数"""
+        with self.lock:
+            return {
+                "frames_checked": self.frames_checked,
+                "frames_saved": self.frames_saved,
+                "bytes_saved": self.bytes_saved,
+            }
@@ -0,0 +1,164 @@
+import time
+import threading
+
+
+def format_scroll_summary(direction, notches, duration, net_delta):
+    """滚动汇总的操作详情，如：鼠标-滚轮：向下滑动（12格，0.8秒，净值-12）"""
+    return f"鼠标-滚轮：{direction}滑动（{notches}格，{duration:.1f}秒，净值{net_delta:+g}）"
+
+
+class IdleFlusher:
+    """
+    空闲超时提交的基类
+    每次输入只推迟截止时间，由共享定时线程在截止时间到达后调用 _flush_locked；
+    任意时刻最多只有一个定时任务，到期时发现截止时间已被推迟则按新的截止时间重新安排
+    """
+
+    def __init__(self, scheduler, idle_timeout, is_paused=None, clock=time.monotonic):
+        self.scheduler = scheduler
+        self.idle_timeout = idle_timeout      # 超过该时间(秒)无输入则提交
+        self.is_paused = is_paused
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.deadline = 0.0
+        self.timer = None
+        self.flushes = 0
+
+    def _touch_locked(self, now):
+        """推迟截止时间（需持有锁）"""
+        self.deadline = now + self.idle_timeout
+        if self.timer is None:
+            self.timer = self.scheduler.call_at(self.deadline, self._on_timer)
+
+    def _on_timer(self):
+        """定时任务：截止时间被推迟则重新安排，否则提交"""
+        with self.lock:
+            self.timer = None
+            if not self._pending_locked():
+                return
+            if self.clock() < self.deadline:
+                self.timer = self.scheduler.call_at(self.deadline, self._on_timer)
+                return
+            if self.is_paused is not None and self.is_paused():
+                self._discard_locked()
+                return
+            self._flush_locked()
+
+    def flush(self):
+        """立即提交（窗口切换、停止监控时调用）"""
+        with self.lock:
+            self._flush_locked()
+
+    def _pending_locked(self):
+        raise NotImplementedError
+
+    def _discard_locked(self):
+        raise NotImplementedError
+
+    def _flush_locked(self):
+        raise NotImplementedError
+
+
+class KeystrokeCoalescer(IdleFlusher):
+    """
+    键盘输入合并
+    连续输入的字符在锁保护的缓冲区中合并为一条"键盘-输入"记录，空闲超时后由共享定时线程提交，
+    特殊键、组合键和窗口切换时立即提交。
+    记录使用输入第一个字符时的前台窗口，窗口切换后提交的内容仍归属于原窗口
+    """
+
+    def __init__(self, log_event, current_window, scheduler, idle_timeout=1.0, is_paused=None,
+                 clock=time.monotonic):
+        super().__init__(scheduler, idle_timeout, is_paused, clock)
+        self.log_event = log_event            # 记录回调，参数为 (窗口快照, 操作详情)
+        self.current_window = current_window  # 返回当前前台窗口快照
+        self.buffer = []
+        self.window = None
+
+    def add(self, char):
+        """缓冲一个输入字符；前台窗口已不是缓冲内容所属的窗口时先提交"""
+        with self.lock:
+            window = self.current_window()
+            if self.buffer and window.handle != self.window.handle:
+                self._flush_locked()
+            if not self.buffer:
+                self.window = window
+            self.buffer.append(char)
+            self._touch_locked(self.clock())
+
+    def _pending_locked(self):
+        return bool(self.buffer)
+
+    def _discard_locked(self):
+        self.buffer = []
+
+    def _flush_locked(self):
+        if self.buffer:
+            text = "".join(self.buffer)
+            self.buffer = []
+            self.flushes += 1
+            self.log_event(self.window, f"键盘-输入：{text}")
+
+    def log_key(self, operation_detail):
+        """提交缓冲区后记录一个特殊键或组合键，两条记录的先后顺序不会被定时提交打乱"""
+        with self.lock:
+            self._flush_locked()
+            self.log_event(self.current_window(), operation_detail)
+
+
+class ScrollAggregator(IdleFlusher):
+    """
+    滚轮连续滚动汇总
+    同一窗口内同方向的连续滚动累计格数、时长和滚动量净值，在空闲超时、方向改变、
+    窗口切换或单次滚动超过最长时长时提交为一条汇总记录
+    """
+
+    def __init__(self, log_event, current_window, scheduler, idle_timeout=0.4, max_duration=10.0,
+                 is_paused=None, clock=time.monotonic):
+        super().__init__(scheduler, idle_timeout, is_paused, clock)
+        self.log_event = log_event            # 记录回调，参数为 (窗口快照, 操作详情)
+        self.current_window = current_window  # 返回当前前台窗口快照
+        self.max_duration = max_duration      # 单条汇总记录的最长时长(秒)
+        self.direction = None
+        self.window = None
+        self.notches = 0
+        self.net_delta = 0.0
+        self.start_time = 0.0
+        self.last_time = 0.0
+        self.wheel_events = 0
+
+    def add(self, delta):
+        """记录一次滚轮事件，delta 为滚动量（正数向上，负数向下）"""
+        if not delta:
+            return
+        direction = "向上" if delta > 0 else "向下"
+        now = self.clock()
+        with self.lock:
+            self.wheel_events += 1
+            window = self.current_window()
+            if self.notches and (direction != self.direction or now - self.start_time >= self.max_duration
+                                 or window.handle != self.window.handle):
+                self._flush_locked()
+            if not self.notches:
+                self.direction = direction
+                self.window = window
+                self.start_time = now
+                self.net_delta = 0.0
+            self.notches += 1
+            self.net_delta += delta
+            self.last_time = now
+            self._touch_locked(now)
+
+    def _pending_locked(self):
+        return self.notches > 0
+
+    def _discard_locked(self):
+        self.notches = 0
+
+    def _flush_locked(self):
+        if self.notches:
+            detail = format_scroll_summary(self.direction, self.notches, self.last_time - self.start_time,
+                                           round(self.net_delta, 2))
+            self.notches = 0
+            self.flushes += 1
+            self.log_event(self.window, detail)
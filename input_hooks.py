@@ -0,0 +1,359 @@
+"""
+键盘、鼠标钩子事件源
+
+钩子回调在 keyboard / mouse 库的线程中执行，不单独开监听线程：
+键盘的可打印字符交给输入合并，特殊键和组合键提交缓冲区后立即记录；
+鼠标的点击和拖拽直接记录，滚轮交给滚动汇总，移动点交给轨迹记录器。
+钩子库由调用方传入，回放事件源通过 replay_* 方法构造与钩子库相同的事件，走同一套处理逻辑。
+"""
+from collections import namedtuple
+
+from event_sources import EventSource, PeriodicSource
+from metrics import NULL_METRICS
+
+# 特殊键名映射
+SPECIAL_KEY_MAP = {
+    "enter": "回车",
+    "backspace": "退格",
+    "delete": "删除",
+    "space": "空格",
+    "up": "↑",
+    "down": "↓",
+    "left": "←",
+    "right": "→",
+    "page up": "PageUp",
+    "page down": "PageDown"
+}
+
+# 记录的组合键：(keyboard 库的写法, 记录的名称)
+HOTKEYS = [
+    ("ctrl+c", "Ctrl+C"),
+    ("ctrl+insert", "Ctrl+Insert"),
+    ("ctrl+v", "Ctrl+V"),
+    ("shift+insert", "Shift+Insert"),
+    ("ctrl+x", "Ctrl+X"),
+    ("ctrl+z", "Ctrl+Z"),
+    ("ctrl+a", "Ctrl+A"),
+]
+
+MODIFIER_KEYS = ("shift", "ctrl", "alt")
+
+# 与 keyboard / mouse 库字段相同的事件，供回放使用
+KeyEvent = namedtuple("KeyEvent", ["event_type", "name"])
+ButtonEvent = namedtuple("ButtonEvent", ["event_type", "button", "time"])
+WheelEvent = namedtuple("WheelEvent", ["delta", "time"])
+
+
+class KeyboardHookSource(EventSource):
+    """键盘钩子事件源：start 注册组合键和按键释放钩子，stop 释放 keyboard 库的全部钩子"""
+
+    name = "keyboard_hook"
+
+    def __init__(self, backend, coalescer, is_paused=None, metrics=NULL_METRICS, on_error=None):
+        self.backend = backend              # keyboard 模块（回放时为 None）
+        self.coalescer = coalescer          # 键盘输入合并(KeystrokeCoalescer)
+        self.is_paused = is_paused
+        self.metrics = metrics
+        self.on_error = on_error
+        self.hooked = False
+
+    def on_hotkey(self, hotkey):
+        """组合键：先提交缓冲区，再记录组合键"""
+        if self.is_paused is not None and self.is_paused():
+            return
+        self.coalescer.log_key(f"键盘-组合键：{hotkey}")
+
+    def on_key_release(self, event):
+        """按键释放回调"""
+        if self.is_paused is not None and self.is_paused():
+            return
+
+        key_name = event.name.lower() if getattr(event, 'name', None) else ""
+
+        # 特殊键处理：先提交缓冲区，再记录特殊键
+        if key_name in SPECIAL_KEY_MAP:
+            self.coalescer.log_key(f"键盘-特殊键：{SPECIAL_KEY_MAP[key_name]}")
+
+        # ctrl, shift, alt 等修饰键不处理
+        elif key_name in MODIFIER_KEYS:
+            return
+
+        # 可打印字符：添加到缓冲区（超过空闲时间无新输入时自动提交）
+        elif len(key_name) == 1:
+            self.coalescer.add(key_name)
+
+        # 组合键已在 hotkey 处理，这里不再处理
+        elif "+" in key_name:
+            pass
+
+        # 处理其他键
+        else:
+            self.coalescer.log_key(f"键盘-特殊键：{key_name}")
+
+    def start(self):
+        on_hotkey = self.metrics.wrap("hook.hotkey", self.on_hotkey)
+        try:
+            for combination, hotkey in HOTKEYS:
+                self.backend.add_hotkey(combination, on_hotkey, args=(hotkey,))
+        except Exception as e:
+            self._report_error(f"组合键注册失败: {str(e)}")
+        try:
+            self.backend.on_release(self.metrics.wrap("hook.keyboard", self.on_key_release))
+            self.hooked = True
+        except Exception as e:
+            self._report_error(f"键盘监听失败: {str(e)}")
+
+    def stop(self):
+        if self.backend is None:
+            return
+        try:
+            self.backend.unhook_all()
+        except Exception as e:
+            self._report_error(f"键盘钩子释放失败: {str(e)}")
+        self.hooked = False
+
+    def is_alive(self):
+        return self.hooked
+
+    def replay_text(self, text):
+        """回放输入的文字：逐个字符送入按键释放回调（空格按空格键）"""
+        for char in text:
+            self.on_key_release(KeyEvent("up", "space" if char == " " else char))
+
+    def replay_special(self, label):
+        """回放一个特殊键，label 为记录中的名称（如"回车"）"""
+        for key_name, name in SPECIAL_KEY_MAP.items():
+            if name == label:
+                label = key_name
+                break
+        self.on_key_release(KeyEvent("up", label))
+
+    def _report_error(self, message):
+        if self.on_error:
+            self.on_error(message)
+
+
+class MouseHookSource(EventSource):
+    """
+    鼠标钩子事件源：start 注册通用鼠标钩子（失败时分别注册点击和滚轮，或在共享定时线程中轮询滚轮），
+    stop 释放 mouse 库的全部钩子
+    """
+
+    name = "mouse_hook"
+
+    def __init__(self, backend, log_event, scroll_aggregator, trajectory_recorder=None, is_paused=None,
+                 get_position=None, scheduler=None, wheel_poll_interval=0.05, metrics=NULL_METRICS,
+                 on_error=None):
+        self.backend = backend                          # mouse 模块（回放时为 None）
+        self.log_event = log_event                      # 记录回调，参数为操作详情（使用当前前台窗口）
+        self.scroll_aggregator = scroll_aggregator      # 滚轮连续滚动汇总(ScrollAggregator)
+        self.trajectory_recorder = trajectory_recorder  # 鼠标轨迹记录(TrajectoryRecorder)，可为 None
+        self.is_paused = is_paused
+        self.get_position = get_position or (backend.get_position if backend is not None else None)
+        self.scheduler = scheduler
+        self.wheel_poll_interval = wheel_poll_interval
+        self.metrics = metrics
+        self.on_error = on_error
+        self.mode = None                                # 注册方式，供界面日志显示
+        self.wheel_source = None
+
+        # 拖拽状态跟踪
+        self.is_dragging = False
+        self.drag_start_pos = None
+
+    def _paused(self):
+        return self.is_paused is not None and self.is_paused()
+
+    def _position(self):
+        try:
+            return self.get_position()
+        except Exception as e:
+            self._report_error(f"获取鼠标位置失败: {e}")
+            return None
+
+    def on_click(self, event=None, *args, **kwargs):
+        """鼠标按键回调：左键按下后位移超过5像素记为拖拽，否则记为单击"""
+        if self._paused():
+            return False
+
+        # 1. 通过hook函数调用时，传递event对象
+        # 2. 通过on_click函数调用时，传递x, y, button, pressed参数
+        if event is None and len(args) >= 3:
+            # on_click方式的调用 (这种方式似乎不再使用，但保留以防万一)
+            x, y, button, pressed = args[0], args[1], args[2], args[3] if len(args) > 3 else False
+
+            # 仅记录释放事件
+            if pressed:
+                return False
+
+            # 确定按钮类型
+            if hasattr(self.backend, 'LEFT') and button == self.backend.LEFT:
+                button_name = "左键"
+            elif hasattr(self.backend, 'RIGHT') and button == self.backend.RIGHT:
+                button_name = "右键"
+            else:
+                button_name = "左键" if str(button).lower() == "left" else "右键" if str(button).lower() == "right" else "中键"
+
+            # 直接记录单击 (因为旧的on_click没有拖拽逻辑)
+            self.log_event(f"鼠标-单击：{button_name}")
+            return False
+
+        # hook方式的调用
+        event_type = getattr(event, 'event_type', None)
+        button = getattr(event, 'button', None)
+
+        # 确定鼠标按钮
+        button_name = "左键"
+        if button == 'right':
+            button_name = "右键"
+        elif button == 'middle':
+            button_name = "中键"
+
+        if event_type == 'down' and button_name == '左键':
+            self.is_dragging = True
+            self.drag_start_pos = self._position()
+            return False  # 按下事件不记录，等待释放
+
+        if event_type == 'up':
+            if button_name == "左键" and self.is_dragging:
+                self.is_dragging = False
+                drag_start_pos = self.drag_start_pos
+                drag_end_pos = self._position()
+                self.drag_start_pos = None
+                # 检查位移量，位移很小时视为单击
+                if drag_start_pos and drag_end_pos and (abs(drag_start_pos[0] - drag_end_pos[0]) > 5
+                                                        or abs(drag_start_pos[1] - drag_end_pos[1]) > 5):
+                    self.log_event("鼠标-拖拽：完成")
+                else:
+                    self.log_event(f"鼠标-单击：{button_name}")
+                return False
+
+            # 非左键单击
+            if button_name != "左键":
+                self.log_event(f"鼠标-单击：{button_name}")
+                return False
+
+            # 左键释放但未处于拖拽状态：复位拖拽状态
+            self.drag_start_pos = None
+            self.is_dragging = False
+
+        return False  # 不拦截事件
+
+    def on_wheel(self, event=None, *args, **kwargs):
+        """滚轮回调：累计到本次连续滚动中，滚动结束时汇总为一条记录（滚动量为0时忽略）"""
+        if self._paused():
+            return False
+
+        wheel_value = 0
+        if event is None and len(args) >= 3:
+            # on_scroll方式的调用 (x, y, dx, dy)
+            try:
+                x, y, dx, dy = args[0], args[1], args[2], args[3] if len(args) > 3 else 0
+                wheel_value = dy
+            except Exception as e:
+                self._report_error(f"滚轮事件参数解析失败: {e}")
+        else:
+            # hook方式的调用 - 适应多种可能的属性名
+            try:
+                if hasattr(event, 'delta'):
+                    wheel_value = event.delta
+                elif hasattr(event, 'wheel_delta'):
+                    wheel_value = event.wheel_delta
+                elif hasattr(event, 'y'):
+                    wheel_value = event.y  # 有些库使用y属性表示垂直滚动
+                else:
+                    wheel_value = args[3] if len(args) > 3 else 0
+            except Exception as e:
+                self._report_error(f"无法确定滚轮方向: {e}")
+
+        self.scroll_aggregator.add(wheel_value)
+        return False
+
+    def on_move(self, event):
+        """移动回调：记录鼠标轨迹（拖拽过程也记录）"""
+        if self.trajectory_recorder is not None and not self._paused():
+            self.trajectory_recorder.add_point(event.x, event.y, getattr(event, 'time', None))
+        return False
+
+    def on_event(self, event):
+        """通用鼠标钩子：mouse 库的按键事件有 event_type，滚轮事件有 delta，移动事件只有 x、y"""
+        if hasattr(event, 'event_type'):
+            if event.event_type in ('up', 'down'):
+                return self.on_click(event)
+        elif hasattr(event, 'delta') or hasattr(event, 'wheel_delta'):
+            return self.on_wheel(event)
+        elif hasattr(event, 'x') and hasattr(event, 'y'):
+            return self.on_move(event)
+        elif hasattr(event, 'y'):  # 仅y属性可能是滚轮
+            return self.on_wheel(event)
+        return False  # 允许事件传递
+
+    def start(self):
+        try:
+            # 首选使用hook方法，兼容性更好
+            self.backend.hook(self.metrics.wrap("hook.mouse", self.on_event))
+            self.mode = "通用钩子"
+            return
+        except Exception as e:
+            self._report_error(f"通用钩子注册失败: {str(e)}")
+        try:
+            # 尝试分别注册点击和滚轮
+            if hasattr(self.backend, 'on_click'):
+                self.backend.on_click(self.on_click)
+                self.mode = "点击事件"
+            if hasattr(self.backend, 'on_scroll'):
+                self.backend.on_scroll(self.on_wheel)
+                self.mode = "点击和滚轮事件"
+            elif self.scheduler is not None:
+                # 备用滚轮监听方法：在共享定时线程中定时检测滚轮变化
+                self.wheel_source = PeriodicSource("mouse_wheel", self.scheduler, self.wheel_poll_interval,
+                                                   self._poll_wheel)
+                self.wheel_source.start()
+                self.mode = "点击事件和备用滚轮监听"
+        except Exception as e:
+            self._report_error(f"无法注册鼠标事件: {str(e)}")
+
+    def _poll_wheel(self):
+        try:
+            import pyautogui
+            if pyautogui._mouseScrolled:
+                self.scroll_aggregator.add(pyautogui._mouseScrollAmount)
+                pyautogui._mouseScrolled = False
+        except Exception:
+            self.wheel_source.stop()
+            self._report_error("备用滚轮监听失败")
+
+    def stop(self):
+        if self.wheel_source is not None:
+            self.wheel_source.stop()
+            self.wheel_source = None
+        if self.backend is None:
+            return
+        try:
+            self.backend.unhook_all()
+        except Exception as e:
+            self._report_error(f"鼠标钩子释放失败: {str(e)}")
+        self.mode = None
+
+    def is_alive(self):
+        return self.mode is not None
+
+    def replay_click(self, button="left"):
+        """回放一次单击（按下和释放，位置不变）"""
+        self.on_event(ButtonEvent("down", button, None))
+        self.on_event(ButtonEvent("up", button, None))
+
+    def replay_drag(self, move_position):
+        """回放一次左键拖拽，move_position() 在按下后移动回放的鼠标位置"""
+        self.on_event(ButtonEvent("down", "left", None))
+        move_position()
+        self.on_event(ButtonEvent("up", "left", None))
+
+    def replay_scroll(self, delta, notches):
+        """回放同方向的连续滚动"""
+        for _ in range(notches):
+            self.on_event(WheelEvent(delta, None))
+
+    def _report_error(self, message):
+        if self.on_error:
+            self.on_error(message)
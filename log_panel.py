@@ -0,0 +1,103 @@
+import queue
+import datetime
+import threading
+import tkinter as tk
+
+
+class LogPanel:
+    """
+    界面操作日志
+    任意线程调用 append 只把日志放入线程安全队列，并在没有待执行的刷新时用 after() 安排一次刷新；
+    刷新在主线程中把新增的行追加到文本框并删除超出的旧行，避免监听线程直接操作 Tk 控件。
+    没有新日志时不安排刷新，界面空闲时主线程不会被定时唤醒
+    """
+
+    def __init__(self, text_widget, visible_lines=10, refresh_interval_ms=100):
+        self.text_widget = text_widget
+        self.visible_lines = visible_lines              # 文本框中保留的行数
+        self.refresh_interval_ms = refresh_interval_ms  # 刷新间隔，限制界面刷新频率
+        self.pending = queue.SimpleQueue()
+        self.shown = 0          # 文本框当前显示的行数
+        self.lock = threading.Lock()
+        self.running = False
+        self.after_id = None
+        self.armed = False      # 是否已安排刷新（after_id 在 after() 返回后才有值）
+        self.refresh_count = 0
+
+    def append(self, log_text, error=False):
+        """
+        记录一条日志（线程安全）
+        只有空闲后的第一条日志调用 after()，此时主线程正在处理事件；
+        刷新执行前的后续日志只放入队列，主线程阻塞期间其他线程不会等待 Tk
+        """
+        now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.pending.put((f"[{now}] {log_text}", error))
+        self._arm()
+
+    def start(self):
+        """开始刷新，已有的日志在一个刷新间隔后显示"""
+        with self.lock:
+            self.running = True
+        if not self.pending.empty():
+            self._arm()
+
+    def stop(self):
+        """停止刷新，取消已安排的刷新"""
+        with self.lock:
+            self.running = False
+            after_id = self.after_id
+            self.after_id = None
+            self.armed = False
+        if after_id is not None:
+            self.text_widget.after_cancel(after_id)
+
+    def _arm(self):
+        with self.lock:
+            if not self.running or self.armed:
+                return
+            self.armed = True
+        after_id = self.text_widget.after(self.refresh_interval_ms, self._tick)
+        with self.lock:
+            if self.armed:
+                self.after_id = after_id
+
+    def _tick(self):
+        # 先清除标记再取队列：刷新期间放入的日志会重新安排刷新，不会遗漏
+        with self.lock:
+            self.armed = False
+            self.after_id = None
+        self.refresh()
+
+    def refresh(self):
+        """将队列中的新日志应用到文本框（仅在主线程调用），返回新增行数"""
+        new_entries = []
+        while True:
+            try:
+                new_entries.append(self.pending.get_nowait())
+            except queue.Empty:
+                break
+        if not new_entries:
+            return 0
+        added = len(new_entries)
+
+        widget = self.text_widget
+        widget.config(state=tk.NORMAL)
+        if len(new_entries) >= self.visible_lines:
+            # 新增行已超过显示行数：直接重建为最新的若干行
+            widget.delete("1.0", tk.END)
+            self.shown = 0
+            new_entries = new_entries[-self.visible_lines:]
+        for entry, error in new_entries:
+            if error:
+                widget.insert(tk.END, entry + "\n", "error")
+            else:
+                widget.insert(tk.END, entry + "\n")
+        self.shown += len(new_entries)
+        if self.shown > self.visible_lines:
+            # 删除最早的若干行
+            widget.delete("1.0", f"{self.shown - self.visible_lines + 1}.0")
+            self.shown = self.visible_lines
+        widget.config(state=tk.DISABLED)
+        widget.see(tk.END)  # 滚动到最新内容
+        self.refresh_count += 1
+        return added
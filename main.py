@@ -5,7 +5,6 @@ import time
 import csv
 import uuid
 import datetime
-import queue
 import threading
 
 # 尝试导入tkinter，兼容不同版本Python
@@ -63,6 +62,8 @@ try:
     import win32gui
     import win32process
     import win32con
+    import win32api
+    import win32ui
     has_win32 = True
 except ImportError:
     missing_modules.append(("pywin32", "pip install pywin32"))
@@ -100,6 +101,102 @@ if missing_modules:
     
     sys.exit(1)
 
+from event_writer import EventWriter
+from event_queue import BoundedEventQueue, POLICY_KEEP, POLICY_COALESCE
+from sqlite_store import SqliteSink
+from csv_segments import RotatingCsvSink
+from event_journal import EventJournal, journal_path, find_unfinished_journals, read_journal_header, recover_journal
+from event_record import CsvRowFormatter
+from event_logger import EventLogger, OPERATION_MAPPING
+from clipboard_capture import ClipboardCapture, ClipboardStore
+from capture_governor import CaptureProfile, CaptureGovernor, SystemSampler, describe_sample
+from event_sources import PeriodicSource
+from input_hooks import KeyboardHookSource, MouseHookSource
+from screenshot_pipeline import CaptureThread, ScreenshotEncoder, EncodeProfile, CAPTURE_FULL, CAPTURE_MONITOR, CAPTURE_WINDOW, clip_bbox
+from frame_dedup import FrameDeduplicator
+from window_info import ProcessNameCache, ForegroundWindow, UNKNOWN_WINDOW
+from window_tracker import WindowTracker, PollingWindowBackend, WinEventHookBackend, DESKTOP_TITLE
+from log_panel import LogPanel
+from scheduler import Scheduler
+from input_coalescer import KeystrokeCoalescer, ScrollAggregator
+from trajectory import TrajectoryRecorder
+from change_detector import ChangeDetector, make_probe
+from capture_debouncer import SwitchCaptureDebouncer
+from metrics import Metrics, MetricsReporter, NULL_METRICS, summarize
+
+# BitBlt 光栅操作：同时抓取分层窗口（透明、置顶提示等），win32con 的旧版本没有该常量
+CAPTUREBLT = 0x40000000
+
+def set_dpi_awareness():
+    """
+    声明按显示器感知DPI（需在创建任何窗口前调用），否则缩放比例不是100%时
+    窗口坐标和截图区域按缩放后的逻辑像素计算，截图模糊或偏移
+    依次尝试 Windows 10 的 Per-Monitor V2、Windows 8.1 的按显示器感知、Vista 的系统感知
+    """
+    if not has_win32:
+        return False
+    import ctypes
+    try:
+        # DPI_AWARENESS_CONTEXT_PER_MONITOR_AWARE_V2 = -4
+        if ctypes.windll.user32.SetProcessDpiAwarenessContext(ctypes.c_void_p(-4)):
+            return True
+    except (AttributeError, OSError):
+        pass
+    try:
+        # PROCESS_PER_MONITOR_DPI_AWARE = 2；返回 S_OK(0) 表示成功
+        if ctypes.windll.shcore.SetProcessDpiAwareness(2) == 0:
+            return True
+    except (AttributeError, OSError):
+        pass
+    try:
+        return bool(ctypes.windll.user32.SetProcessDPIAware())
+    except (AttributeError, OSError):
+        return False
+
+def grab_region_win32(bbox):
+    """使用 BitBlt 只抓取指定区域的屏幕画面（虚拟桌面坐标）"""
+    left, top, right, bottom = bbox
+    width, height = right - left, bottom - top
+    desktop = win32gui.GetDesktopWindow()
+    desktop_dc = win32gui.GetWindowDC(desktop)
+    src_dc = win32ui.CreateDCFromHandle(desktop_dc)
+    mem_dc = src_dc.CreateCompatibleDC()
+    bitmap = win32ui.CreateBitmap()
+    try:
+        bitmap.CreateCompatibleBitmap(src_dc, width, height)
+        mem_dc.SelectObject(bitmap)
+        mem_dc.BitBlt((0, 0), (width, height), src_dc, (left, top), win32con.SRCCOPY | CAPTUREBLT)
+        bits = bitmap.GetBitmapBits(True)
+        return Image.frombuffer("RGB", (width, height), bits, "raw", "BGRX", 0, 1)
+    finally:
+        win32gui.DeleteObject(bitmap.GetHandle())
+        mem_dc.DeleteDC()
+        src_dc.DeleteDC()
+        win32gui.ReleaseDC(desktop, desktop_dc)
+
+def grab_probe_win32(bbox, size):
+    """使用 StretchBlt 把指定区域直接缩小抓取为 size 大小的灰度画面，避免复制整屏像素"""
+    left, top, right, bottom = bbox
+    width, height = size
+    desktop = win32gui.GetDesktopWindow()
+    desktop_dc = win32gui.GetWindowDC(desktop)
+    src_dc = win32ui.CreateDCFromHandle(desktop_dc)
+    mem_dc = src_dc.CreateCompatibleDC()
+    bitmap = win32ui.CreateBitmap()
+    try:
+        bitmap.CreateCompatibleBitmap(src_dc, width, height)
+        mem_dc.SelectObject(bitmap)
+        mem_dc.SetStretchBltMode(win32con.HALFTONE)
+        mem_dc.StretchBlt((0, 0), (width, height), src_dc, (left, top), (right - left, bottom - top),
+                          win32con.SRCCOPY | CAPTUREBLT)
+        bits = bitmap.GetBitmapBits(True)
+        return Image.frombuffer("RGB", (width, height), bits, "raw", "BGRX", 0, 1).convert("L")
+    finally:
+        win32gui.DeleteObject(bitmap.GetHandle())
+        mem_dc.DeleteDC()
+        src_dc.DeleteDC()
+        win32gui.ReleaseDC(desktop, desktop_dc)
+
 class UserBehaviorCollector(tk.Tk):
     """
     用户行为数据采集工具
@@ -107,22 +204,145 @@ class UserBehaviorCollector(tk.Tk):
     """
     
     # 操作类型映射
-    OPERATION_MAPPING = {
-        "剪贴": ["键盘-组合键：Ctrl+X", "鼠标-操作：剪贴", "剪贴板操作：剪贴"],
-        "复制": ["键盘-组合键：Ctrl+C", "键盘-组合键：Ctrl+Insert", "鼠标-右键菜单：复制", "剪贴板操作：复制"],
-        "粘贴": ["键盘-组合键：Ctrl+V", "键盘-组合键：Shift+Insert", "鼠标-右键菜单：粘贴", "剪贴板操作：粘贴"],
-        "删除": ["键盘-特殊键：Delete", "键盘-特殊键：Backspace"],
-        "查看": ["截图：窗口切换", "窗口-状态：最小化", "窗口-状态：最大化", "窗口-状态：关闭",
-                "键盘-特殊键：↑", "键盘-特殊键：↓", "键盘-特殊键：←", "键盘-特殊键：→",
-                "键盘-特殊键：PageUp", "键盘-特殊键：PageDown",
-                "鼠标-滚轮：向上滑动", "鼠标-滚轮：向下滑动",
-                "鼠标-拖拽：完成",
-                "鼠标-拖拽：滚动条"],
-        "输入": ["键盘-输入：*", "键盘-特殊键：Space", "键盘-特殊键：Enter"],
-        "点击": ["鼠标-单击：左键", "鼠标-单击：右键", "鼠标-双击：左键", "鼠标-双击：右键"],
-        "其他": ["截图：定时截图", "键盘-组合键：Ctrl+A", "键盘-组合键：Ctrl+Z", "鼠标-操作：右键点击"]
+    OPERATION_MAPPING = OPERATION_MAPPING
+    
+    # 窗口监听方式：event 使用 SetWinEventHook 事件驱动，polling 定时轮询；及轮询间隔(秒)
+    WINDOW_TRACKER_MODE = "event"
+    WINDOW_POLL_INTERVAL = 0.5
+    
+    # 鼠标钩子不支持滚轮时，备用滚轮检测的间隔(秒)
+    MOUSE_WHEEL_POLL_INTERVAL = 0.05
+    
+    # 键盘输入超过该时间(秒)无新字符则合并提交为一条记录
+    KEYBOARD_IDLE_FLUSH = 1.0
+    
+    # 连续滚动汇总：超过该时间(秒)无滚轮事件视为本次滚动结束；单条汇总记录的最长时长(秒)
+    SCROLL_IDLE_FLUSH = 0.4
+    SCROLL_MAX_DURATION = 10.0
+    
+    # 剪贴板：后台读取的时间预算(秒)和重试间隔(秒)；全文按内容哈希保存到 clipboard 文件夹
+    CLIPBOARD_READ_TIMEOUT = 0.5
+    CLIPBOARD_RETRY_INTERVAL = 0.05
+    CLIPBOARD_STORE_ENABLED = True
+    
+    # 鼠标轨迹：按前台窗口分段保存到 trajectories 文件夹；抖动距离(像素)、偏离连线距离(像素)、方向变化角度(度)、停顿时间(秒)阈值
+    TRAJECTORY_ENABLED = True
+    TRAJECTORY_MIN_DISTANCE = 2
+    TRAJECTORY_MAX_DEVIATION = 2.0
+    TRAJECTORY_ANGLE_THRESHOLD = 15.0
+    TRAJECTORY_PAUSE_THRESHOLD = 0.2
+    
+    # 进程名缓存：缓存有效期(秒)和最大条目数
+    PROCESS_CACHE_TTL = 30.0
+    PROCESS_CACHE_SIZE = 256
+    
+    # CSV批量写入策略：达到行数或时间间隔(秒)即写入
+    CSV_BATCH_SIZE = 100
+    CSV_FLUSH_INTERVAL = 1.0
+    
+    # 事件队列上限(条)：写入停滞、队列已满时钩子线程不等待，按类别处理新事件：
+    # 窗口、截图、剪贴板等从不丢弃；连续输入和滚轮先与队尾合并，否则最先丢弃；其余事件其次丢弃。
+    # 丢失的条数以"事件队列-丢失"标记行写入CSV。未列出的类别按"-"前的大类查找，仍未列出时可丢弃
+    EVENT_QUEUE_SIZE = 5000
+    EVENT_QUEUE_POLICIES = {
+        "窗口": POLICY_KEEP,
+        "截图": POLICY_KEEP,
+        "采集": POLICY_KEEP,
+        "剪贴板操作": POLICY_KEEP,
+        "鼠标-轨迹": POLICY_KEEP,
+        "键盘-输入": POLICY_COALESCE,
+        "键盘-特殊键": POLICY_COALESCE,
+        "鼠标-滚轮": POLICY_COALESCE,
+    }
+    
+    # 崩溃恢复日志：事件先追加到日志再批量写入CSV，按间隔(秒) fsync 后改写日志；
+    # 下次启动时在后台补写未完成的会话，每补写该条数在界面日志中显示一次进度
+    JOURNAL_ENABLED = True
+    JOURNAL_FSYNC_INTERVAL = 5.0
+    JOURNAL_RECOVERY_BATCH = 10000
+    
+    # CSV分段：单个分段最大字节数和最长时长(秒)，0 表示不限；已关闭的分段在后台压缩为 .gz
+    CSV_SEGMENT_MAX_BYTES = 50 * 1024 * 1024
+    CSV_SEGMENT_MAX_SECONDS = 0
+    CSV_SEGMENT_COMPRESS = True
+    
+    # 界面日志：显示行数和刷新间隔(毫秒)
+    LOG_VISIBLE_LINES = 10
+    LOG_REFRESH_INTERVAL_MS = 100
+    
+    # 同时写入SQLite会话库（与CSV同名的 .db 文件，WAL模式，可用 sqlite_store.py 查询或导出CSV）
+    SQLITE_SINK_ENABLED = False
+    
+    # 窗口切换截图防抖：窗口在前台停留超过该时间(秒)才截图，快速切换经过的窗口只记录切换事件；
+    # 每分钟最多截图次数（超出时只记录切换事件）
+    SWITCH_CAPTURE_DWELL = 0.5
+    SWITCH_CAPTURE_MAX_PER_MINUTE = 20
+    
+    # 定时截图方式：change 按画面变化截图（定时抓取缩小的探测画面按块比较），timer 固定间隔截图
+    # SCREENSHOT_INTERVAL 为固定间隔，变化检测方式下为最长截图间隔（超过该时间无论画面是否变化都截图）
+    SCREENSHOT_TIMER_MODE = "change"
+    SCREENSHOT_INTERVAL = 60
+    
+    # 画面变化检测：探测间隔(秒)、探测画面尺寸、两次截图的最短间隔(秒)、触发截图的变化块比例、
+    # 块大小(探测画面像素)和块平均灰度差阈值
+    SCREENSHOT_PROBE_INTERVAL = 2.0
+    SCREENSHOT_PROBE_SIZE = (160, 90)
+    SCREENSHOT_CHANGE_MIN_INTERVAL = 10.0
+    SCREENSHOT_CHANGE_THRESHOLD = 0.1
+    SCREENSHOT_CHANGE_TILE_SIZE = 10
+    SCREENSHOT_CHANGE_PIXEL_THRESHOLD = 10
+    
+    # 截图编码线程数和待编码队列长度（每帧为未压缩画面，队列不宜过长）
+    SCREENSHOT_ENCODER_WORKERS = 2
+    SCREENSHOT_QUEUE_SIZE = 3
+    
+    # 各截图原因的截图范围：full 整个桌面 / monitor 前台窗口所在显示器 / window 仅前台窗口
+    SCREENSHOT_CAPTURE_MODES = {
+        "窗口切换": CAPTURE_WINDOW,
+        "定时截图": CAPTURE_MONITOR,
+        "内容变化": CAPTURE_MONITOR,
     }
     
+    # 各截图原因的编码设置：窗口切换保留无损PNG，定时截图和内容变化截图使用有损WebP并限制分辨率
+    SCREENSHOT_ENCODE_PROFILES = {
+        "窗口切换": EncodeProfile("PNG", compress_level=6),
+        "定时截图": EncodeProfile("WEBP", quality=75, max_dimension=1920),
+        "内容变化": EncodeProfile("WEBP", quality=75, max_dimension=1920),
+    }
+    SCREENSHOT_DEFAULT_ENCODE_PROFILE = EncodeProfile("PNG", compress_level=6)
+    
+    # 负载自适应：每隔 GOVERNOR_INTERVAL 秒采样系统和本程序的CPU/内存，负载持续偏高时逐级降低采集精度，
+    # 持续回落后逐级恢复；每次切换都记录一条"采集-配置"事件
+    GOVERNOR_ENABLED = True
+    GOVERNOR_INTERVAL = 5.0
+    CAPTURE_PROFILES = [
+        CaptureProfile("正常"),
+        CaptureProfile("节能", screenshot_interval=120, window_poll_interval=1.0, scroll_idle_flush=0.8,
+                       change_min_interval=30.0,
+                       encode_profiles={
+                           "窗口切换": EncodeProfile("WEBP", quality=80, max_dimension=1600, method=2),
+                           "定时截图": EncodeProfile("WEBP", quality=60, max_dimension=1280, method=2),
+                           "内容变化": EncodeProfile("WEBP", quality=60, max_dimension=1280, method=2),
+                       }),
+        CaptureProfile("最低", screenshot_interval=300, window_poll_interval=2.0, scroll_idle_flush=1.5,
+                       change_min_interval=120.0,
+                       encode_profiles={
+                           "窗口切换": EncodeProfile("JPEG", quality=60, max_dimension=1280),
+                           "定时截图": EncodeProfile("JPEG", quality=50, max_dimension=960),
+                           "内容变化": EncodeProfile("JPEG", quality=50, max_dimension=960),
+                       }),
+    ]
+    
+    # 运行统计：记录钩子回调、事件记录各阶段、截图抓取/编码和写入的耗时，以及队列深度、丢弃数和线程是否存活，
+    # 每隔 METRICS_INTERVAL 秒以 JSON 行写入会话文件夹的 metrics.jsonl，停止监控时输出摘要
+    METRICS_ENABLED = True
+    METRICS_INTERVAL = 60.0
+    
+    # 重复截图检测：与最近若干张截图方式相同（尺寸、范围、编码设置）的截图像素完全相同时不再保存，
+    # 直接引用已有截图；只复用完全相同的画面，有任何变化的画面都照常保存
+    SCREENSHOT_DEDUP_ENABLED = True
+    SCREENSHOT_DEDUP_HISTORY = 8
+    
     def __init__(self):
         super().__init__()
         self.title("用户行为数据采集工具")
@@ -135,22 +355,69 @@ class UserBehaviorCollector(tk.Tk):
         self.name = tk.StringVar()
         self.storage_path = tk.StringVar(value=os.path.join(os.path.expanduser("~"), "Desktop"))
         
-        # 数据队列
-        self.data_queue = queue.Queue()
+        # 有界事件队列（由后台写入线程消费，放入时从不阻塞；每次开始监控时重新创建，统计按会话计）
+        self.data_queue = None
+        self.event_writer = None
+        
+        # 截图编码器和重复截图检测（监控期间有效）
+        self.screenshot_encoder = None
+        self.frame_deduplicator = None
         
         # 监控状态
         self.monitoring = False
         self.paused = False
         
-        # 线程列表
-        self.threads = []
-        
-        # 日志缓存
-        self.log_entries = []
-        self.max_log_entries = 1000
+        # 事件源列表（键盘、鼠标、窗口、定时截图等监听器）
+        self.sources = []
+        
+        # 事件记录器和剪贴板读取线程（监控期间有效）
+        self.event_logger = None
+        self.clipboard_capture = None
+        
+        # 共享定时线程、键盘输入合并、滚动汇总和鼠标轨迹（监控期间有效）
+        self.scheduler = None
+        self.keystroke_coalescer = None
+        self.scroll_aggregator = None
+        self.trajectory_recorder = None
+        
+        # 截图抓取线程、定时截图、窗口切换截图防抖、画面变化检测、窗口轮询事件源和负载自适应（监控期间有效）
+        self.capture_thread = None
+        self.screenshot_source = None
+        self.switch_capture = None
+        self.change_detector = None
+        self.window_backend = None
+        self.capture_governor = None
+        self.capture_profile = self.CAPTURE_PROFILES[0]
+        
+        # 运行统计（监控期间为 Metrics，其余时间为空统计）
+        self.metrics = NULL_METRICS
+        self.metrics_reporter = None
+        
+        # 前台窗口快照（由窗口监听线程维护，各钩子无锁读取）
+        self.foreground = UNKNOWN_WINDOW
+        self.window_tracker = None
+        # 缓冲中的键盘输入、滚动汇总和鼠标轨迹所属窗口的句柄（窗口变化时先提交缓冲）
+        self.input_handle = None
+        
+        # 进程名缓存（窗口句柄→PID→进程名）
+        self.process_name_cache = None
+        if has_win32 and psutil is not None:
+            self.process_name_cache = ProcessNameCache(
+                pid_lookup=lambda hwnd: win32process.GetWindowThreadProcessId(hwnd)[1],
+                name_lookup=lambda pid: psutil.Process(pid).name(),
+                pid_exists=psutil.pid_exists,
+                ttl=self.PROCESS_CACHE_TTL,
+                max_size=self.PROCESS_CACHE_SIZE)
+        
+        # 界面日志（创建界面时初始化）
+        self.log_panel = None
         
         # 初始化界面
         self.init_ui()
+        
+        # 在后台恢复默认存储目录中上次未正常结束的会话（其他目录在开始监控时检查）
+        self.recovery_lock = threading.Lock()
+        self.recover_unfinished_sessions()
     
     def get_mac_address(self):
         """获取MAC地址"""
@@ -211,6 +478,11 @@ class UserBehaviorCollector(tk.Tk):
         # 日志颜色标签
         self.log_text.tag_configure("error", foreground="red", font=("TkDefaultFont", 9, "bold"))
         
+        # 日志由各线程放入队列，有新日志时主线程在刷新间隔后批量刷新到文本框
+        self.log_panel = LogPanel(self.log_text, visible_lines=self.LOG_VISIBLE_LINES,
+                                  refresh_interval_ms=self.LOG_REFRESH_INTERVAL_MS)
+        self.log_panel.start()
+        
         # 设置窗口事件处理
         self.protocol("WM_DELETE_WINDOW", self.on_close)
         
@@ -289,6 +561,9 @@ class UserBehaviorCollector(tk.Tk):
         if self.monitoring:
             return
         
+        # 选择的存储目录可能不是启动时检查的默认目录：新会话开始前先恢复其中未正常结束的会话
+        self.recover_unfinished_sessions()
+        
         # 创建数据文件夹
         main_folder_path, csv_filepath, screenshots_folder = self.create_data_folder()
         if main_folder_path is None or csv_filepath is None or screenshots_folder is None:
@@ -298,6 +573,14 @@ class UserBehaviorCollector(tk.Tk):
         self.csv_filepath = csv_filepath
         self.screenshots_folder = screenshots_folder
         
+        # 运行统计需在各组件创建前启用
+        self.metrics = Metrics() if self.METRICS_ENABLED else NULL_METRICS
+        
+        # 启动后台写入线程；输出端无法打开时不开始监控，否则本次会话的事件都不会被保存
+        if not self.start_event_writer():
+            messagebox.showerror("错误", "无法打开数据文件，监控未开始!")
+            return
+        
         # 更新状态
         self.monitoring = True
         self.paused = False
@@ -332,11 +615,82 @@ class UserBehaviorCollector(tk.Tk):
         # 记录开始时间
         self.start_time = datetime.datetime.now()
         
+        # 启动剪贴板读取线程，创建事件记录器
+        clipboard_store = None
+        if self.CLIPBOARD_STORE_ENABLED:
+            clipboard_folder = os.path.join(self.main_folder_path, "clipboard")
+            try:
+                os.makedirs(clipboard_folder, exist_ok=True)
+                clipboard_store = ClipboardStore(clipboard_folder)
+            except Exception as e:
+                self.log_activity(f"错误：无法创建剪贴板文件夹 - {str(e)}", error=True)
+        self.clipboard_capture = ClipboardCapture(self.read_clipboard, self.emit_event, store=clipboard_store,
+                                                  timeout=self.CLIPBOARD_READ_TIMEOUT,
+                                                  retry_interval=self.CLIPBOARD_RETRY_INTERVAL,
+                                                  on_error=lambda msg: self.log_activity(msg, error=True))
+        self.clipboard_capture.start()
+        self.event_logger = EventLogger(self.emit_event,
+                                        clipboard_reader=self.read_clipboard,
+                                        on_error=lambda msg: self.log_activity(msg, error=True),
+                                        clipboard_capture=self.clipboard_capture,
+                                        metrics=self.metrics)
+        
+        # 启动截图编码线程
+        self.screenshot_encoder = ScreenshotEncoder(workers=self.SCREENSHOT_ENCODER_WORKERS,
+                                                    max_queue=self.SCREENSHOT_QUEUE_SIZE,
+                                                    on_error=lambda msg: self.log_activity(msg, error=True),
+                                                    metrics=self.metrics)
+        self.screenshot_encoder.start()
+        if self.SCREENSHOT_DEDUP_ENABLED:
+            self.frame_deduplicator = FrameDeduplicator(history=self.SCREENSHOT_DEDUP_HISTORY)
+        
+        # 启动共享定时线程和键盘输入合并
+        self.scheduler = Scheduler(on_error=lambda msg: self.log_activity(msg, error=True))
+        self.scheduler.start()
+        # 合并器在持有自身锁时查询前台窗口，使用不触发提交的 lookup_foreground
+        self.keystroke_coalescer = KeystrokeCoalescer(self.log_event, self.lookup_foreground, self.scheduler,
+                                                      idle_timeout=self.KEYBOARD_IDLE_FLUSH,
+                                                      is_paused=lambda: self.paused)
+        self.scroll_aggregator = ScrollAggregator(self.log_event, self.lookup_foreground, self.scheduler,
+                                                  idle_timeout=self.SCROLL_IDLE_FLUSH,
+                                                  max_duration=self.SCROLL_MAX_DURATION,
+                                                  is_paused=lambda: self.paused)
+        if self.TRAJECTORY_ENABLED:
+            trajectory_folder = os.path.join(self.main_folder_path, "trajectories")
+            try:
+                os.makedirs(trajectory_folder, exist_ok=True)
+                self.trajectory_recorder = TrajectoryRecorder(
+                    trajectory_folder, self.log_event, self.lookup_foreground,
+                    min_distance=self.TRAJECTORY_MIN_DISTANCE,
+                    max_deviation=self.TRAJECTORY_MAX_DEVIATION,
+                    angle_threshold=self.TRAJECTORY_ANGLE_THRESHOLD,
+                    pause_threshold=self.TRAJECTORY_PAUSE_THRESHOLD,
+                    on_error=lambda msg: self.log_activity(msg, error=True),
+                    scheduler=self.scheduler)
+            except Exception as e:
+                self.log_activity(f"错误：无法创建轨迹文件夹 - {str(e)}", error=True)
+        
+        # 截图抓取线程：定时线程和窗口监听只提交请求，抓取、探测和去重在该线程中执行
+        self.capture_thread = CaptureThread(on_error=lambda msg: self.log_activity(msg, error=True),
+                                            metrics=self.metrics)
+        self.start_source(self.capture_thread)
+        
+        # 窗口切换截图防抖（在窗口监听启动前创建）
+        self.switch_capture = SwitchCaptureDebouncer(self.scheduler, self.request_switch_capture,
+                                                     lambda: self.foreground.handle,
+                                                     dwell=self.SWITCH_CAPTURE_DWELL,
+                                                     max_per_minute=self.SWITCH_CAPTURE_MAX_PER_MINUTE,
+                                                     is_paused=lambda: self.paused)
+        
         # 启动各监听线程
         self.start_keyboard_listener()
         self.start_mouse_listener()
         self.start_window_listener()
         self.start_screenshot_timer()
+        if self.GOVERNOR_ENABLED:
+            self.start_capture_governor()
+        if self.metrics.enabled:
+            self.start_metrics_reporter()
         
         self.log_activity("监控已启动")
     
@@ -375,34 +729,85 @@ class UserBehaviorCollector(tk.Tk):
         self.monitoring = False
         self.log_activity("正在停止监控...")
         
-        # 停止所有线程
-        for thread in self.threads:
-            if thread.is_alive():
-                # 这里只能标记线程停止，无法强制结束线程
-                # 实际终止需要在线程循环中检测stop_flag
-                thread.stop_flag = True
-        
-        # 等待线程停止（最多等待5秒）
-        wait_time = 0
-        while any(t.is_alive() for t in self.threads) and wait_time < 5:
-            time.sleep(0.5)
-            wait_time += 0.5
-        
-        # 释放键盘和鼠标钩子
-        try:
-            self.log_activity("正在释放键盘钩子...")
-            keyboard.unhook_all()
-        except Exception as e:
-            self.log_activity(f"键盘钩子释放失败: {str(e)}", error=True)
-        
-        try:
-            self.log_activity("正在释放鼠标钩子...")
-            mouse.unhook_all()
-        except Exception as e:
-            self.log_activity(f"鼠标钩子释放失败: {str(e)}", error=True)
-        
-        # 清空线程列表
-        self.threads.clear()
+        # 停止所有事件源（定时任务直接取消，键盘和鼠标钩子释放，有独立线程的事件源通知其退出）
+        for source in self.sources:
+            source.stop()
+        
+        # 等待线程停止（最多共等待5秒）
+        deadline = time.monotonic() + 5
+        for source in self.sources:
+            source.join(max(0.0, deadline - time.monotonic()))
+        
+        # 清空事件源列表
+        self.sources.clear()
+        self.screenshot_source = None
+        self.window_backend = None
+        if self.switch_capture is not None:
+            self.switch_capture.cancel()
+            stats = self.switch_capture.stats()
+            self.log_activity(f"窗口切换截图：切换 {stats['switches']} 次，截图 {stats['captured']} 张，"
+                              f"被后续切换取代 {stats['superseded']} 次，超出每分钟次数 {stats['over_budget']} 次")
+            self.switch_capture = None
+        if self.capture_thread is not None:
+            stats = self.capture_thread.stats()
+            if stats["coalesced"]:
+                self.log_activity(f"截图抓取：请求 {stats['submitted']} 次，"
+                                  f"因上一次尚未完成而合并 {stats['coalesced']} 次")
+            self.capture_thread = None
+        if self.change_detector is not None:
+            stats = self.change_detector.stats()
+            self.log_activity(f"画面变化检测：探测 {stats['probes']} 次，平均 {stats['avg_probe_ms']:.1f} ms，"
+                              f"内容变化截图 {stats['change_captures']} 张，定时截图 {stats['forced_captures']} 张")
+            self.change_detector = None
+        if self.capture_governor is not None:
+            if self.capture_governor.changes:
+                self.log_activity(f"负载自适应：采样 {self.capture_governor.samples} 次，"
+                                  f"切换采集配置 {self.capture_governor.changes} 次")
+            self.capture_governor = None
+        self.capture_profile = self.CAPTURE_PROFILES[0]
+        
+        # 提交尚未提交的键盘输入、滚动汇总和鼠标轨迹，停止定时线程
+        for flusher in (self.keystroke_coalescer, self.scroll_aggregator, self.trajectory_recorder):
+            if flusher is not None:
+                flusher.flush()
+        self.keystroke_coalescer = None
+        self.scroll_aggregator = None
+        if self.scheduler is not None:
+            self.scheduler.stop()
+            self.scheduler = None
+        # 定时线程停止后写出剩余的轨迹文件
+        if self.trajectory_recorder is not None:
+            self.trajectory_recorder.drain()
+            stats = self.trajectory_recorder.stats()
+            self.log_activity(f"鼠标轨迹：采集 {stats['captured']} 点，保存 {stats['stored']} 点"
+                              f"（{stats['ratio']:.0%}），{stats['chunks']} 个文件共 {stats['bytes']} 字节")
+            self.trajectory_recorder = None
+        
+        # 等待剩余截图编码完成
+        self.stop_screenshot_encoder()
+        
+        # 等待剩余剪贴板读取完成
+        if self.clipboard_capture is not None:
+            self.clipboard_capture.stop()
+            stats = self.clipboard_capture.stats()
+            if stats["captured"]:
+                message = f"剪贴板：读取 {stats['captured']} 次，失败 {stats['failed']} 次，平均 {stats['avg_read_ms']:.1f} ms"
+                if "stored" in stats:
+                    message += f"，保存 {stats['stored']} 份，重复内容 {stats['reused']} 次"
+                self.log_activity(message)
+            self.clipboard_capture = None
+        
+        # 输出进程名缓存命中统计
+        if self.process_name_cache is not None:
+            stats = self.process_name_cache.stats()
+            self.log_activity(f"进程名缓存：命中 {stats['hits']} 次，未命中 {stats['misses']} 次，"
+                              f"命中率 {stats['hit_rate']:.0%}，失效 {stats['invalidations']} 次")
+        
+        # 停止写入线程，确保缓冲区数据全部写入文件
+        self.stop_event_writer()
+        
+        # 写入最终统计快照并输出摘要
+        self.stop_metrics_reporter()
         
         self.log_activity("监控已停止")
         
@@ -450,569 +855,324 @@ class UserBehaviorCollector(tk.Tk):
             self.attributes("-alpha", 0.3)  # 不透明度为30%
             self.geometry("350x150+0+0")  # 收缩窗口但保持足够宽度显示按钮
     
+    def open_sinks(self, csv_filepath, student_id, name, screenshots_folder, sqlite):
+        """打开会话的各输出端（CSV分段文件，可选SQLite数据库）"""
+        formatter = CsvRowFormatter(student_id, name, screenshots_folder)
+        try:
+            csv_sink = RotatingCsvSink(csv_filepath, formatter,
+                                       max_bytes=self.CSV_SEGMENT_MAX_BYTES,
+                                       max_seconds=self.CSV_SEGMENT_MAX_SECONDS,
+                                       compress=self.CSV_SEGMENT_COMPRESS,
+                                       on_error=lambda msg: self.log_activity(msg, error=True))
+        except Exception as e:
+            self.log_activity(f"错误：无法打开CSV文件 - {str(e)}", error=True)
+            return None
+        sinks = [csv_sink]
+        if sqlite:
+            try:
+                db_filepath = os.path.splitext(csv_filepath)[0] + ".db"
+                sinks.append(SqliteSink(db_filepath, student_id, name, screenshots_folder))
+            except Exception as e:
+                self.log_activity(f"错误：无法打开SQLite数据库 - {str(e)}", error=True)
+        return sinks
+    
+    def start_event_writer(self):
+        """为新会话创建事件队列并启动后台写入线程，输出端无法打开时返回 False"""
+        sinks = self.open_sinks(self.csv_filepath, self.student_id.get(), self.name.get(),
+                                self.screenshots_folder, self.SQLITE_SINK_ENABLED)
+        if sinks is None:
+            return False
+        self.data_queue = BoundedEventQueue(maxsize=self.EVENT_QUEUE_SIZE, policies=self.EVENT_QUEUE_POLICIES)
+        journal = None
+        if self.JOURNAL_ENABLED:
+            # 恢复日志中记录会话信息，供下次启动时重新打开输出端
+            header = {"csv_filepath": self.csv_filepath, "student_id": self.student_id.get(),
+                      "name": self.name.get(), "screenshots_folder": self.screenshots_folder,
+                      "sqlite": any(sink.kind == "sqlite" for sink in sinks)}
+            try:
+                journal = EventJournal(journal_path(self.csv_filepath), header,
+                                       fsync_interval=self.JOURNAL_FSYNC_INTERVAL)
+            except Exception as e:
+                self.log_activity(f"错误：无法创建恢复日志 - {str(e)}", error=True)
+        self.event_writer = EventWriter(self.data_queue, sinks,
+                                        batch_size=self.CSV_BATCH_SIZE,
+                                        flush_interval=self.CSV_FLUSH_INTERVAL,
+                                        on_error=lambda msg: self.log_activity(msg, error=True),
+                                        journal=journal,
+                                        metrics=self.metrics)
+        self.event_writer.start()
+        return True
+    
+    def recover_unfinished_sessions(self):
+        """
+        检查存储目录中上次未正常结束的会话，在后台线程中补写恢复日志中尚未写入的事件，进度显示在界面日志中
+        日志文件在主线程中查找（此时新会话的日志尚未创建），补写期间界面不会卡住
+        """
+        paths = find_unfinished_journals(self.storage_path.get())
+        if paths:
+            threading.Thread(target=self.recover_journals, args=(paths,), name="SessionRecovery",
+                             daemon=True).start()
+    
+    def recover_journals(self, paths):
+        """补写各恢复日志（后台线程中执行；同一时刻只恢复一个，已恢复的日志会被删除）"""
+        with self.recovery_lock:
+            for path in paths:
+                if not os.path.exists(path):
+                    continue
+                folder = os.path.basename(os.path.dirname(path))
+                try:
+                    header = read_journal_header(path)
+                    if header is None:
+                        continue
+                    sinks = self.open_sinks(header["csv_filepath"], header["student_id"], header["name"],
+                                            header["screenshots_folder"], header.get("sqlite", False))
+                    if sinks is None:
+                        continue
+                    self.log_activity(f"正在恢复上次未正常结束的会话 {folder}...")
+                    replayed = recover_journal(
+                        path, sinks, batch_size=self.JOURNAL_RECOVERY_BATCH,
+                        on_progress=lambda count: self.log_activity(f"会话 {folder}：已补写 {count} 条记录"))
+                    self.log_activity(f"已恢复上次未正常结束的会话 {folder}（补写 {replayed} 条记录）")
+                except Exception as e:
+                    self.log_activity(f"错误：恢复会话 {folder} 失败 - {str(e)}", error=True)
+    
+    def stop_event_writer(self):
+        """停止后台写入线程并强制刷新缓冲区"""
+        if self.event_writer is None:
+            return
+        self.log_activity("正在写入剩余数据...")
+        if not self.event_writer.stop(timeout=5):
+            self.log_activity("错误：数据写入超时，部分数据可能未保存", error=True)
+        self.event_writer = None
+        stats = self.data_queue.stats()
+        if stats["coalesced"] or stats["dropped"] or stats["over_bound"]:
+            self.log_activity(f"事件队列：最大 {stats['max_depth']} 条，合并 {stats['coalesced']} 条，"
+                              f"丢弃 {stats['dropped']} 条，超出上限 {stats['over_bound']} 条", error=True)
+    
+    def stop_screenshot_encoder(self):
+        """等待剩余截图编码完成并输出编码统计"""
+        if self.screenshot_encoder is None:
+            return
+        self.log_activity("正在保存剩余截图...")
+        if not self.screenshot_encoder.stop(timeout=10):
+            self.log_activity("错误：截图保存超时，部分截图可能未保存", error=True)
+        stats = self.screenshot_encoder.stats()
+        self.log_activity(f"截图统计：编码 {stats['encoded']} 张，丢弃 {stats['dropped']} 张，"
+                          f"最大队列 {stats['max_queue_depth']}，平均编码 {stats['avg_encode_ms']:.0f} ms，"
+                          f"最长编码 {stats['max_encode_ms']:.0f} ms")
+        self.screenshot_encoder = None
+        
+        if self.frame_deduplicator is not None:
+            stats = self.frame_deduplicator.stats()
+            self.log_activity(f"重复截图统计：检测 {stats['frames_checked']} 张，跳过 {stats['frames_saved']} 张，"
+                              f"节省约 {stats['bytes_saved'] / 1024:.0f} KB")
+            self.frame_deduplicator = None
+    
+    def start_metrics_reporter(self):
+        """登记队列深度、丢弃数和线程是否存活等取值，在共享定时线程中定时写入统计快照"""
+        metrics = self.metrics
+        # 取值函数引用组件本身，停止监控后写入的最终快照仍能反映各组件的最终状态
+        queue = self.data_queue
+        writer = self.event_writer
+        encoder = self.screenshot_encoder
+        clipboard = self.clipboard_capture
+        scheduler = self.scheduler
+        switch_capture = self.switch_capture
+        capture_thread = self.capture_thread
+        metrics.gauge("queue.events", queue.qsize)
+        metrics.gauge("queue.events.coalesced", lambda: queue.coalesced)
+        metrics.gauge("queue.events.dropped", lambda: queue.dropped)
+        if writer is not None:
+            metrics.gauge("thread.writer", writer.is_alive)
+        if encoder is not None:
+            metrics.gauge("queue.screenshot_encode", encoder.queue_depth)
+            metrics.gauge("screenshot.dropped", lambda: encoder.stats()["dropped"])
+            metrics.gauge("thread.screenshot_encoder", lambda: sum(t.is_alive() for t in encoder.threads))
+        if clipboard is not None:
+            metrics.gauge("queue.clipboard", clipboard.requests.qsize)
+            metrics.gauge("clipboard.dropped", lambda: clipboard.stats()["overflow"])
+            metrics.gauge("thread.clipboard", lambda: clipboard.thread is not None and clipboard.thread.is_alive())
+        if scheduler is not None:
+            metrics.gauge("thread.scheduler", scheduler.is_alive)
+            metrics.gauge("scheduler.wakeups", lambda: scheduler.wakeups)
+        if capture_thread is not None:
+            metrics.gauge("queue.screenshot_capture", lambda: capture_thread.stats()["pending"])
+            metrics.gauge("thread.screenshot_capture", capture_thread.is_alive)
+        if switch_capture is not None:
+            metrics.gauge("switch_capture.over_budget", lambda: switch_capture.stats()["over_budget"])
+        
+        self.metrics_reporter = MetricsReporter(metrics, os.path.join(self.main_folder_path, "metrics.jsonl"),
+                                                on_error=lambda msg: self.log_activity(msg, error=True))
+        self.start_source(PeriodicSource("metrics_reporter", self.scheduler, self.METRICS_INTERVAL,
+                                         self.metrics_reporter.write_snapshot))
+    
+    def stop_metrics_reporter(self):
+        """写入最终统计快照，输出耗时最多的各阶段摘要"""
+        if self.metrics_reporter is not None:
+            snapshot = self.metrics_reporter.write_snapshot(final=True)
+            for line in summarize(snapshot):
+                self.log_activity(f"运行统计：{line}")
+            self.metrics_reporter = None
+        self.metrics = NULL_METRICS
+    
+    def start_source(self, source):
+        """启动事件源并加入事件源列表"""
+        source.start()
+        self.sources.append(source)
+    
     def start_keyboard_listener(self):
-        """启动键盘监听线程"""
-        keyboard_thread = threading.Thread(target=self.keyboard_listener, daemon=True)
-        keyboard_thread.stop_flag = False
-        keyboard_thread.start()
-        self.threads.append(keyboard_thread)
+        """注册键盘钩子（回调在 keyboard 库的线程中执行，输入合并由共享定时线程提交）"""
+        self.start_source(KeyboardHookSource(keyboard, self.keystroke_coalescer,
+                                             is_paused=lambda: self.paused, metrics=self.metrics,
+                                             on_error=lambda msg: self.log_activity(msg, error=True)))
     
     def start_mouse_listener(self):
-        """启动鼠标监听线程"""
-        mouse_thread = threading.Thread(target=self.mouse_listener, daemon=True)
-        mouse_thread.stop_flag = False
-        mouse_thread.start()
-        self.threads.append(mouse_thread)
+        """注册鼠标钩子（回调在 mouse 库的线程中执行，无需单独的监听线程）"""
+        self.log_activity("正在注册鼠标钩子...")
+        source = MouseHookSource(mouse, self.log_foreground_event, self.scroll_aggregator,
+                                 trajectory_recorder=self.trajectory_recorder,
+                                 is_paused=lambda: self.paused, scheduler=self.scheduler,
+                                 wheel_poll_interval=self.MOUSE_WHEEL_POLL_INTERVAL, metrics=self.metrics,
+                                 on_error=lambda msg: self.log_activity(msg, error=True))
+        self.start_source(source)
+        if source.mode is not None:
+            self.log_activity(f"成功注册鼠标{source.mode}")
     
     def start_window_listener(self):
-        """启动窗口监听线程"""
-        window_thread = threading.Thread(target=self.window_listener, daemon=True)
-        window_thread.stop_flag = False
-        window_thread.start()
-        self.threads.append(window_thread)
-    
-    def start_screenshot_timer(self):
-        """启动定时截图线程"""
-        timer_thread = threading.Thread(target=self.screenshot_timer, daemon=True)
-        timer_thread.stop_flag = False
-        timer_thread.start()
-        self.threads.append(timer_thread)
-    
-    def keyboard_listener(self):
-        """键盘事件监听线程"""
-        # 字符缓冲区
-        buffer = []
-        last_input_time = time.time()
-        
-        # 映射特殊键名
-        special_key_map = {
-            "enter": "回车",
-            "backspace": "退格",
-            "delete": "删除",
-            "space": "空格",
-            "up": "↑",
-            "down": "↓",
-            "left": "←",
-            "right": "→",
-            "page up": "PageUp",
-            "page down": "PageDown"
-        }
-        
-        # 组合键检测
-        def on_hotkey(hotkey):
-            nonlocal buffer
-            
-            # 如果暂停状态，不记录
-            if self.paused:
-                return
-            
-            # 清空缓冲区
-            if buffer:
-                input_text = "".join(buffer)
-                operation_detail = f"键盘-输入：{input_text}"
-                try:
-                    window_title = gw.getActiveWindow().title if gw.getActiveWindow() else "未知窗口"
-                except:
-                    window_title = "未知窗口"
-                self.log_window_event(window_title, "NORMAL", operation_detail)
-                buffer = []
-            
-            # 记录组合键
-            operation_detail = f"键盘-组合键：{hotkey}"
+        """启动窗口监听（优先使用事件钩子，失败时回退为轮询）"""
+        self.window_tracker = WindowTracker(self.log_event,
+                                            on_switch=self.on_window_switch,
+                                            on_publish=self.publish_foreground,
+                                            final_state_lookup=self.get_window_state if has_win32 else None,
+                                            is_paused=lambda: self.paused)
+        on_error = lambda msg: self.log_activity(msg, error=True)
+        
+        if has_win32 and self.WINDOW_TRACKER_MODE == "event":
             try:
-                window_title = gw.getActiveWindow().title if gw.getActiveWindow() else "未知窗口"
-            except:
-                window_title = "未知窗口"
-            self.log_window_event(window_title, "NORMAL", operation_detail)
-        
-        # 注册组合键
-        try:
-            keyboard.add_hotkey('ctrl+c', lambda: on_hotkey("Ctrl+C"))
-            keyboard.add_hotkey('ctrl+insert', lambda: on_hotkey("Ctrl+Insert"))
-            keyboard.add_hotkey('ctrl+v', lambda: on_hotkey("Ctrl+V"))
-            keyboard.add_hotkey('shift+insert', lambda: on_hotkey("Shift+Insert"))
-            keyboard.add_hotkey('ctrl+x', lambda: on_hotkey("Ctrl+X"))
-            keyboard.add_hotkey('ctrl+z', lambda: on_hotkey("Ctrl+Z"))
-            keyboard.add_hotkey('ctrl+a', lambda: on_hotkey("Ctrl+A"))
-        except Exception as e:
-            self.log_activity(f"组合键注册失败: {str(e)}", error=True)
-        
-        # 按键释放回调
-        def on_key_release(e):
-            nonlocal buffer, last_input_time
-            
-            # 如果暂停状态，不记录
-            if self.paused:
+                self.start_source(WinEventHookBackend(self.window_tracker, self.query_foreground, on_error=on_error))
+                self.log_activity("已启用事件驱动的窗口监听")
                 return
-            
-            key_name = e.name.lower() if hasattr(e, 'name') else ""
-            
-            # 特殊键处理
-            if key_name in special_key_map:
-                # 先处理缓冲区
-                if buffer:
-                    input_text = "".join(buffer)
-                    operation_detail = f"键盘-输入：{input_text}"
-                    try:
-                        window_title = gw.getActiveWindow().title if gw.getActiveWindow() else "未知窗口"
-                    except:
-                        window_title = "未知窗口"
-                    self.log_window_event(window_title, "NORMAL", operation_detail)
-                    buffer = []
-                
-                # 记录特殊键
-                special_key = special_key_map[key_name]
-                operation_detail = f"键盘-特殊键：{special_key}"
-                try:
-                    window_title = gw.getActiveWindow().title if gw.getActiveWindow() else "未知窗口"
-                except:
-                    window_title = "未知窗口"
-                self.log_window_event(window_title, "NORMAL", operation_detail)
-                
-            # 可打印字符处理
-            elif len(key_name) == 1 or key_name in ['shift', 'ctrl', 'alt']:
-                # ctrl, shift, alt 等修饰键不处理
-                if key_name in ['shift', 'ctrl', 'alt']:
-                    return
-                
-                # 添加到缓冲区
-                buffer.append(key_name)
-                last_input_time = time.time()
-            
-            # 检查组合键情况
-            elif "+" in key_name:
-                # 这是组合键，已在hotkey处理，这里不再处理
-                pass
-            
-            # 处理其他键
-            else:
-                # 先处理缓冲区
-                if buffer:
-                    input_text = "".join(buffer)
-                    operation_detail = f"键盘-输入：{input_text}"
-                    try:
-                        window_title = gw.getActiveWindow().title if gw.getActiveWindow() else "未知窗口"
-                    except:
-                        window_title = "未知窗口"
-                    self.log_window_event(window_title, "NORMAL", operation_detail)
-                    buffer = []
-                
-                # 记录其他键
-                operation_detail = f"键盘-特殊键：{key_name}"
-                try:
-                    window_title = gw.getActiveWindow().title if gw.getActiveWindow() else "未知窗口"
-                except:
-                    window_title = "未知窗口"
-                self.log_window_event(window_title, "NORMAL", operation_detail)
+            except Exception as e:
+                self.log_activity(f"窗口事件钩子安装失败: {str(e)}，改用轮询", error=True)
         
-        # 注册按键释放事件
+        self.window_backend = PollingWindowBackend(self.window_tracker, self.query_foreground,
+                                                   interval=self.capture_profile.window_poll_interval
+                                                   or self.WINDOW_POLL_INTERVAL,
+                                                   on_error=on_error, scheduler=self.scheduler)
+        self.start_source(self.window_backend)
+    
+    def start_screenshot_timer(self):
+        """在共享定时线程中定时提交截图请求（变化检测方式下为探测画面），由截图抓取线程执行"""
+        interval = self.capture_profile.screenshot_interval or self.SCREENSHOT_INTERVAL
+        if self.SCREENSHOT_TIMER_MODE == "change":
+            self.change_detector = ChangeDetector(
+                self.grab_probe, self.take_screenshot,
+                min_interval=self.capture_profile.change_min_interval or self.SCREENSHOT_CHANGE_MIN_INTERVAL,
+                max_interval=interval,
+                change_threshold=self.SCREENSHOT_CHANGE_THRESHOLD,
+                tile_size=self.SCREENSHOT_CHANGE_TILE_SIZE,
+                pixel_threshold=self.SCREENSHOT_CHANGE_PIXEL_THRESHOLD,
+                is_paused=lambda: self.paused)
+            self.start_source(PeriodicSource("screenshot_probe", self.scheduler, self.SCREENSHOT_PROBE_INTERVAL,
+                                             self.probe_screen, first_delay=0))
+            return
+        self.screenshot_source = PeriodicSource("screenshot_timer", self.scheduler, interval,
+                                                self.timed_screenshot, first_delay=0)
+        self.start_source(self.screenshot_source)
+    
+    def start_capture_governor(self):
+        """在共享定时线程中定时采样系统负载，按负载切换采集配置"""
         try:
-            keyboard.on_release(on_key_release)
+            sampler = SystemSampler()
         except Exception as e:
-            self.log_activity(f"键盘监听失败: {str(e)}", error=True)
-        
-        # 主循环，定时检查缓冲区
-        current_thread = threading.current_thread()
-        while not getattr(current_thread, "stop_flag", False):
-            # 如果缓冲区有内容且超过1秒没有新输入，则提交
-            if buffer and (time.time() - last_input_time) > 1:
-                if not self.paused:
-                    input_text = "".join(buffer)
-                    operation_detail = f"键盘-输入：{input_text}"
-                    try:
-                        window_title = gw.getActiveWindow().title if gw.getActiveWindow() else "未知窗口"
-                    except:
-                        window_title = "未知窗口"
-                    self.log_window_event(window_title, "NORMAL", operation_detail)
-                buffer = []
-            
-            time.sleep(0.1)
-    
-    def mouse_listener(self):
-        """鼠标事件监听线程"""
-        # 拖拽状态跟踪
-        is_dragging = False
-        drag_start_pos = None
-        last_wheel_time = time.time()
-        wheel_cooldown = 0.4  # 防止滚轮事件过于频繁的冷却时间(秒)
-        # 鼠标点击事件
-        def on_click(event=None, *args, **kwargs):
-            nonlocal is_dragging, drag_start_pos # 声明使用外部变量
-            # 如果暂停状态，不记录
-            if self.paused:
-                return
-
-            # 处理不同调用方式
-            # 1. 通过hook函数调用时，传递event对象
-            # 2. 通过on_click函数调用时，传递x, y, button, pressed参数
-            if event is None and len(args) >= 3:
-                # on_click方式的调用 (这种方式似乎不再使用，但保留以防万一)
-                x, y, button, pressed = args[0], args[1], args[2], args[3] if len(args) > 3 else False
-
-                # 仅记录释放事件
-                if pressed:
-                    return
-
-                # 确定按钮类型
-                if hasattr(mouse, 'LEFT') and button == mouse.LEFT:
-                    button_name = "左键"
-                elif hasattr(mouse, 'RIGHT') and button == mouse.RIGHT:
-                    button_name = "右键"
-                else:
-                    button_name = "左键" if str(button).lower() == "left" else "右键" if str(button).lower() == "right" else "中键"
-
-                # 直接记录单击 (因为旧的on_click没有拖拽逻辑)
-                operation_detail = f"鼠标-单击：{button_name}"
-                try:
-                    window_title = gw.getActiveWindow().title if gw.getActiveWindow() else "未知窗口"
-                except:
-                    window_title = "未知窗口"
-                self.log_window_event(window_title, "NORMAL", operation_detail)
-
-            else:
-                # hook方式的调用
-                # 获取事件类型和按钮
-                event_type = event.event_type if hasattr(event, 'event_type') else None
-                button = event.button if hasattr(event, 'button') else None
-
-                # 确定鼠标按钮
-                button_name = "左键"
-                if button == 'right':
-                    button_name = "右键"
-                elif button == 'middle':
-                    button_name = "中键"
-
-                # --- 拖拽逻辑 --- 
-                if event_type == 'down' and button_name == '左键':
-                    is_dragging = True
-                    # 使用 mouse.get_position() 获取坐标
-                    try:
-                        drag_start_pos = mouse.get_position()
-                    except Exception as e:
-                        self.log_activity(f"获取鼠标位置失败: {e}", error=True)
-                        drag_start_pos = None
-                    return False # 按下事件不记录，等待释放
-
-                elif event_type == 'up':
-                    if button_name == "左键" and is_dragging:
-                        is_dragging = False
-                        # 使用 mouse.get_position() 获取坐标
-                        try:
-                            drag_end_pos = mouse.get_position()
-                        except Exception as e:
-                            self.log_activity(f"获取鼠标位置失败: {e}", error=True)
-                            drag_end_pos = None
-                        
-                        # 检查位移量
-                        if drag_start_pos and drag_end_pos and (abs(drag_start_pos[0] - drag_end_pos[0]) > 5 or abs(drag_start_pos[1] - drag_end_pos[1]) > 5):
-                            operation_detail = f"鼠标-拖拽：完成"
-                            try:
-                                window_title = gw.getActiveWindow().title if gw.getActiveWindow() else "未知窗口"
-                            except:
-                                window_title = "未知窗口"
-                            self.log_window_event(window_title, "NORMAL", operation_detail)
-                            drag_start_pos = None # 重置起始位置
-                            return False # 拖拽事件已处理，不再作为单击记录
-                        else:
-                             # 如果位移很小，视为单击
-                             operation_detail = f"鼠标-单击：{button_name}"
-                             try:
-                                 window_title = gw.getActiveWindow().title if gw.getActiveWindow() else "未知窗口"
-                             except:
-                                 window_title = "未知窗口"
-                             self.log_window_event(window_title, "NORMAL", operation_detail)
-                             drag_start_pos = None # 重置起始位置
-                             return False # 单击事件已处理
-
-                    # 如果不是左键释放，或者是左键释放但未处于拖拽状态（理论上不应发生，但作为保险）
-                    # 或者拖拽位移很小被判断为单击 (上面已处理)
-                    # 则记录为普通单击 (除左键外)
-                    elif button_name != "左键":
-                        operation_detail = f"鼠标-单击：{button_name}"
-                        try:
-                            window_title = gw.getActiveWindow().title if gw.getActiveWindow() else "未知窗口"
-                        except:
-                            window_title = "未知窗口"
-                        self.log_window_event(window_title, "NORMAL", operation_detail)
-                        return False # 非左键单击事件已处理
-
-                    # 重置拖拽起始位置，以防万一
-                    drag_start_pos = None
-                    is_dragging = False # 确保拖拽状态复位
-                
-                # 其他事件类型 (非 down/up) 不在此处理
-
-            return False  # 不拦截事件
-        
-        # 滚轮事件监听函数
-        def on_wheel(event=None, *args, **kwargs):
-            nonlocal last_wheel_time
-            
-            # 如果暂停状态，不记录
-            if self.paused:
-                return False
-            
-            # 添加冷却时间检查，防止滚轮事件过度记录
-            current_time = time.time()
-            if current_time - last_wheel_time < wheel_cooldown:
-                return False
-            
-            last_wheel_time = current_time
-            
-            # 处理不同调用方式并确定滚动方向
-            direction = None
-            
-            if event is None and len(args) >= 3:
-                # on_scroll方式的调用 (x, y, dx, dy)
-                try:
-                    x, y, dx, dy = args[0], args[1], args[2], args[3] if len(args) > 3 else 0
-                    direction = "向上" if dy > 0 else "向下" if dy < 0 else None
-                except Exception as e:
-                    self.log_activity(f"滚轮事件参数解析失败: {e}", error=True)
-            else:
-                # hook方式的调用 - 适应多种可能的属性名
-                try:
-                    # 检查多种可能的属性名
-                    if hasattr(event, 'delta'):
-                        wheel_value = event.delta
-                    elif hasattr(event, 'wheel_delta'):
-                        wheel_value = event.wheel_delta
-                    elif hasattr(event, 'y'):
-                        wheel_value = event.y  # 有些库使用y属性表示垂直滚动
-                    else:
-                        # 尝试从args中获取
-                        wheel_value = args[3] if len(args) > 3 else 0
-                    
-                    direction = "向上" if wheel_value > 0 else "向下" if wheel_value < 0 else None
-                except Exception as e:
-                    self.log_activity(f"无法确定滚轮方向: {e}", error=True)
-            
-            # 如果无法确定方向，则跳过记录
-            if direction is None:
-                return False
-            
-            # 记录事件
-            operation_detail = f"鼠标-滚轮：{direction}滑动"
-            
-            try:
-                window_title = gw.getActiveWindow().title if gw.getActiveWindow() else "未知窗口"
-            except:
-                window_title = "未知窗口"
-                
-            self.log_window_event(window_title, "NORMAL", operation_detail)
-            return False  # 不拦截事件
-        
-        # 通用鼠标事件处理函数
-        def generic_mouse_hook(event):
-            nonlocal is_dragging # 声明使用外部变量
-            
-            # 更健壮的事件类型检测
-            if hasattr(event, 'event_type'):
-                event_type = event.event_type
-                if event_type in ['up', 'down']:
-                    return on_click(event)
-                elif event_type == 'wheel':
-                    return on_wheel(event)
-                elif event_type == 'move':
-                    # 如果正在拖拽 (左键按下状态)，则忽略移动事件本身
-                    if is_dragging:
-                        return False
-            # 尝试使用其他方式检测滚轮事件
-            elif hasattr(event, 'delta') or hasattr(event, 'wheel_delta') or \
-                (hasattr(event, 'y') and not hasattr(event, 'x')): # 仅y属性可能是滚轮
-                return on_wheel(event)
-            
-            return False  # 允许事件传递
-        
-        # 尝试使用不同方法注册鼠标事件
+            self.log_activity(f"负载采样不可用: {str(e)}", error=True)
+            return
+        self.capture_governor = CaptureGovernor(self.CAPTURE_PROFILES, sampler.sample,
+                                                on_change=self.apply_capture_profile)
+        self.start_source(PeriodicSource("capture_governor", self.scheduler, self.GOVERNOR_INTERVAL,
+                                         self.capture_governor.tick))
+    
+    def apply_capture_profile(self, old_profile, profile, sample):
+        """切换采集配置（在共享定时线程中调用），并记录一条事件说明采集精度的变化"""
+        self.capture_profile = profile
+        if self.screenshot_source is not None:
+            self.screenshot_source.set_interval(profile.screenshot_interval or self.SCREENSHOT_INTERVAL)
+        if self.change_detector is not None:
+            self.change_detector.max_interval = profile.screenshot_interval or self.SCREENSHOT_INTERVAL
+            self.change_detector.min_interval = profile.change_min_interval or self.SCREENSHOT_CHANGE_MIN_INTERVAL
+        if self.window_backend is not None:
+            self.window_backend.set_interval(profile.window_poll_interval or self.WINDOW_POLL_INTERVAL)
+        if self.scroll_aggregator is not None:
+            self.scroll_aggregator.idle_timeout = profile.scroll_idle_flush or self.SCROLL_IDLE_FLUSH
+        self.log_foreground_event(f"采集-配置：{old_profile.name}→{profile.name}（{describe_sample(sample)}）")
+        self.log_activity(f"负载变化，采集配置切换为 {profile.describe()}（{describe_sample(sample)}）")
+    
+    def on_window_switch(self, window):
+        """切换到新窗口时安排截图（窗口在前台停留足够时间后由共享定时线程提交截图请求）"""
+        if self.switch_capture is not None:
+            self.switch_capture.on_switch(window)
+        else:
+            self.request_switch_capture(window)
+    
+    def request_capture(self, key, func, *args):
+        """把一次抓取交给截图抓取线程（不阻塞调用线程）；抓取线程未运行时直接执行"""
+        if self.capture_thread is not None:
+            self.capture_thread.submit(key, func, *args)
+        else:
+            func(*args)
+    
+    def request_switch_capture(self, window):
+        """提交窗口切换截图请求"""
+        self.request_capture("窗口切换", self.capture_switch, window)
+    
+    def probe_screen(self):
+        """提交画面变化探测请求（由共享定时线程每隔 SCREENSHOT_PROBE_INTERVAL 秒调用）"""
+        if self.change_detector is not None:
+            self.request_capture("内容变化", self.change_detector.check)
+    
+    def capture_switch(self, window):
+        """窗口切换截图（在截图抓取线程中执行）"""
         try:
-            self.log_activity("正在注册鼠标钩子...")
-            # 首选使用hook方法，兼容性更好
-            mouse.hook(generic_mouse_hook)
-            self.log_activity("成功注册鼠标通用钩子")
+            self.take_screenshot("窗口切换")
         except Exception as e:
-            self.log_activity(f"通用钩子注册失败: {str(e)}", error=True)
-            try:
-                # 尝试分别注册点击和滚轮
-                if hasattr(mouse, 'on_click'):
-                    mouse.on_click(on_click)
-                    self.log_activity("成功注册鼠标点击事件")
-                
-                if hasattr(mouse, 'on_scroll'):
-                    mouse.on_scroll(on_wheel)
-                    self.log_activity("成功注册鼠标滚轮事件")
-                else:
-                    # 备用滚轮监听方法
-                    def mouse_wheel_alternative():
-                        try:
-                            import pyautogui
-                            last_scroll = 0
-                            
-                            while not getattr(threading.current_thread(), "stop_flag", False):
-                                # 尝试检测滚轮变化
-                                for i in range(10):  # 每次检查10次
-                                    if pyautogui._mouseScrolled:
-                                        direction = "向上" if pyautogui._mouseScrollAmount > 0 else "向下"
-                                        operation_detail = f"鼠标-滚轮：{direction}"
-                                        
-                                        try:
-                                            window_title = gw.getActiveWindow().title if gw.getActiveWindow() else "未知窗口"
-                                        except:
-                                            window_title = "未知窗口"
-                                            
-                                        self.log_window_event(window_title, "NORMAL", operation_detail)
-                                        pyautogui._mouseScrolled = False
-                                    time.sleep(0.01)
-                                time.sleep(0.1)
-                        except:
-                            self.log_activity("备用滚轮监听失败", error=True)
-                    
-                    # 创建备用滚轮监听线程
-                    wheel_thread = threading.Thread(target=mouse_wheel_alternative, daemon=True)
-                    wheel_thread.stop_flag = False
-                    wheel_thread.start()
-                    self.threads.append(wheel_thread)
-                    self.log_activity("已启动备用滚轮监听")
-            except Exception as e:
-                self.log_activity(f"无法注册鼠标事件: {str(e)}", error=True)
-        
-        # 主循环，保持线程运行
-        current_thread = threading.current_thread()
-        while not getattr(current_thread, "stop_flag", False):
-            time.sleep(0.1)
-    
-    def window_listener(self):
-        """窗口事件监听线程"""
-        last_window_title = None
-        last_window_state = None
-        last_window_handle = None  # 跟踪上一个窗口句柄
-
-        current_thread = threading.current_thread()
-        while not getattr(current_thread, "stop_flag", False):
-            if self.paused:
-                time.sleep(0.5)
-                continue
-
-            current_title = None
-            current_state = None
-            current_handle = None
-
+            self.log_activity(f"窗口切换截图失败: {str(e)}", error=True)
+    
+    def publish_foreground(self, window):
+        """发布前台窗口快照，供键盘、鼠标钩子读取"""
+        if window.handle != self.input_handle:
+            self.flush_input(window)
+        self.foreground = window
+    
+    def flush_input(self, window):
+        """
+        前台窗口变为 window：先提交尚未提交的键盘输入、滚动汇总和鼠标轨迹（归属于原窗口）
+        是否提交按 input_handle 判断，不与 self.foreground 比较——钩子线程发现窗口变化时会先更新快照
+        """
+        self.input_handle = window.handle
+        for flusher in (self.keystroke_coalescer, self.scroll_aggregator, self.trajectory_recorder):
+            if flusher is not None:
+                flusher.flush()
+    
+    def grab_probe(self):
+        """抓取变化检测用的探测画面（内容变化截图的范围，缩小为灰度小图）"""
+        bbox = self.get_capture_bbox(self.SCREENSHOT_CAPTURE_MODES.get("内容变化", CAPTURE_FULL))
+        if has_win32:
             try:
-                # 优先使用 win32gui 获取前景窗口句柄
-                if has_win32:
-                    current_handle = win32gui.GetForegroundWindow()
-                    if current_handle:
-                        current_title = win32gui.GetWindowText(current_handle)
-                        # 使用 win32gui 判断状态
-                        placement = win32gui.GetWindowPlacement(current_handle)
-                        window_state_flag = placement[1] # 获取状态标志
-
-                        if win32gui.IsIconic(current_handle): # IsIconic 用于检测最小化
-                            current_state = "MINIMIZED"
-                        # elif win32gui.IsZoomed(current_handle): # IsZoomed 用于检测最大化
-                        elif window_state_flag == win32con.SW_SHOWMAXIMIZED: # 使用 GetWindowPlacement 判断最大化
-                            current_state = "MAXIMIZED"
-                        else:
-                            current_state = "NORMAL"
-                    else:
-                        # 没有前景窗口 (可能桌面获得焦点或所有窗口最小化)
-                        current_title = "桌面/无活动窗口"
-                        current_state = "NORMAL" # 或者定义一个特定状态？
-                else:
-                    # win32gui 不可用时，回退到 pygetwindow (可能不准)
-                    current_window = gw.getActiveWindow()
-                    if current_window:
-                        current_handle = getattr(current_window, '_hWnd', None) # 尝试获取句柄
-                        current_title = current_window.title
-                        try:
-                            if current_window.isMaximized:
-                                current_state = "MAXIMIZED"
-                            # pygetwindow 的 isMinimized 可能不准确
-                            # elif current_window.isMinimized:
-                            #     current_state = "MINIMIZED"
-                            else:
-                                current_state = "NORMAL"
-                        except:
-                             current_state = "NORMAL"
-                    else:
-                        current_title = "桌面/无活动窗口"
-                        current_state = "NORMAL"
-
-                # --- 逻辑判断 --- 
-
-                # 1. 窗口句柄发生变化 (窗口切换)
-                if current_handle != last_window_handle:
-                    # 检查上一个窗口的最终状态 (如果存在)
-                    if last_window_handle and has_win32:
-                        try:
-                            # 检查上一个窗口的最终状态
-                            last_placement = win32gui.GetWindowPlacement(last_window_handle)
-                            last_window_state_flag = last_placement[1]
-
-                            if win32gui.IsIconic(last_window_handle):
-                                final_last_state = "MINIMIZED"
-                            # elif win32gui.IsZoomed(last_window_handle):
-                            elif last_window_state_flag == win32con.SW_SHOWMAXIMIZED:
-                                final_last_state = "MAXIMIZED"
-                            else:
-                                final_last_state = "NORMAL"
-                            
-                            # 如果记录的最后状态与实际最终状态不同，补记一条
-                            if last_window_state != final_last_state:
-                                # 特别是记录最小化事件
-                                operation_detail = f"窗口-状态：{final_last_state}"
-                                self.log_window_event(last_window_title, final_last_state, operation_detail)
-                                last_window_state = final_last_state # 更新状态记录
-                        except win32gui.error: # 句柄可能已失效
-                            pass 
-                            
-                    # 记录窗口切换事件并截图
-                    if current_title and current_title != "桌面/无活动窗口": # 仅在切换到实际窗口时截图
-                        try:
-                            self.take_screenshot("窗口切换")
-                        except Exception as e:
-                            self.log_activity(f"窗口切换截图失败: {str(e)}", error=True)
-                    
-                    # 记录新窗口的信息 (如果不是桌面)
-                    if current_title != "桌面/无活动窗口":
-                        operation_detail = f"窗口-切换至：{current_title}"
-                        self.log_window_event(current_title, current_state, operation_detail)
-                    
-                    # 更新记录
-                    last_window_handle = current_handle
-                    last_window_title = current_title
-                    last_window_state = current_state
-
-                # 2. 窗口句柄未变，但状态发生变化 (同一窗口状态改变)
-                elif current_handle is not None and current_state != last_window_state:
-                     # 记录状态变化
-                     operation_detail = f"窗口-状态：{current_state}"
-                     self.log_window_event(current_title, current_state, operation_detail)
-                     last_window_state = current_state # 更新状态记录
-
-            except Exception as e:
-                self.log_activity(f"窗口监听错误: {str(e)}", error=True)
-                # 重置状态，避免连续错误
-                last_window_handle = None
-                last_window_title = None
-                last_window_state = None
-
-            # 每隔0.5秒检测一次
-            time.sleep(0.5)
-    
-    def screenshot_timer(self):
-        """定时截图线程"""
-        current_thread = threading.current_thread()
-        while not getattr(current_thread, "stop_flag", False):
-            if not self.paused:
-                # 每60秒截图一次
-                self.take_screenshot("定时截图")
-            
-            # 睡眠60秒
-            for _ in range(600):  # 60秒，每0.1秒检查一次停止标志
-                if getattr(current_thread, "stop_flag", False):
-                    break
-                time.sleep(0.1)
+                if bbox is None:
+                    left = win32api.GetSystemMetrics(win32con.SM_XVIRTUALSCREEN)
+                    top = win32api.GetSystemMetrics(win32con.SM_YVIRTUALSCREEN)
+                    bbox = (left, top,
+                            left + win32api.GetSystemMetrics(win32con.SM_CXVIRTUALSCREEN),
+                            top + win32api.GetSystemMetrics(win32con.SM_CYVIRTUALSCREEN))
+                return grab_probe_win32(bbox, self.SCREENSHOT_PROBE_SIZE)
+            except Exception:
+                pass
+        return make_probe(self.grab_screen(bbox), self.SCREENSHOT_PROBE_SIZE)
+    
+    def timed_screenshot(self):
+        """提交定时截图请求（由共享定时线程每隔 SCREENSHOT_INTERVAL 秒调用）"""
+        if not self.paused:
+            self.request_capture("定时截图", self.take_screenshot, "定时截图")
 
     def create_data_folder(self):
         """创建数据存储文件夹"""
@@ -1049,7 +1209,7 @@ class UserBehaviorCollector(tk.Tk):
         try:
             with open(csv_filepath, 'w', newline='', encoding='utf-8-sig') as csvfile:
                 writer = csv.writer(csvfile)
-                writer.writerow(['学号', '姓名', '时间戳', '操作类型', '操作详情', '窗口进程名', '窗口标签', '窗口状态', '剪贴板内容', '截图文件'])
+                writer.writerow(CsvRowFormatter.HEADER)
         except:
             messagebox.showerror("错误", "无法创建CSV文件!")
             return None, None, None
@@ -1060,225 +1220,241 @@ class UserBehaviorCollector(tk.Tk):
         """捕获当前活动窗口的截图"""
         try:
             # 获取当前活动窗口
-            active_window = None
-            try:
-                active_window = gw.getActiveWindow()
-                if not active_window:
-                    self.log_activity("无法获取活动窗口，使用全屏截图", error=False)
-            except Exception as e:
-                self.log_activity(f"获取活动窗口失败: {str(e)}，使用全屏截图", error=True)
+            active_window = self.current_foreground()
+            if not active_window.handle:
+                self.log_activity("无法获取活动窗口，使用全屏截图", error=False)
             
             # 获取窗口标签
-            window_title = "未知窗口"
-            if active_window:
-                try:
-                    window_title = active_window.title
-                except:
-                    window_title = "无法获取窗口标题"
+            window_title = active_window.title or "未知窗口"
             
             # 清理窗口标签中的非法字符
             cleaned_title = re.sub(r'[\\/*?:"<>|]', '-', window_title)
             # 限制文件名长度
             cleaned_title = cleaned_title[:30]
             
-            # 生成截图文件名: 学号_开始时间_毫秒_窗口标签.png
+            # 生成截图文件名: 学号_开始时间_毫秒_窗口标签.扩展名
             now = datetime.datetime.now()
             timestamp = now.strftime("%H%M%S")
             milliseconds = now.microsecond // 1000
             
-            screenshot_filename = f"{self.student_id.get()}_{timestamp}_{milliseconds:02d}_{cleaned_title}.png"
+            encode_profile = self.capture_profile.encode_profiles.get(reason) or \
+                self.SCREENSHOT_ENCODE_PROFILES.get(reason, self.SCREENSHOT_DEFAULT_ENCODE_PROFILE)
+            screenshot_filename = f"{self.student_id.get()}_{timestamp}_{milliseconds:02d}_{cleaned_title}{encode_profile.extension}"
             screenshot_path = os.path.join(self.screenshots_folder, screenshot_filename)
             
-            # 捕获截图
+            # 捕获截图，编码和保存交给后台编码线程
+            start = self.metrics.clock()
             try:
-                screenshot = ImageGrab.grab()
-                screenshot.save(screenshot_path)
+                capture_mode = self.SCREENSHOT_CAPTURE_MODES.get(reason, CAPTURE_FULL)
+                screenshot = self.grab_screen(self.get_capture_bbox(capture_mode, active_window.handle))
             except Exception as e:
                 self.log_activity(f"截图保存失败: {str(e)}", error=True)
                 return None
+            self.metrics.observe("screenshot.grab", start)
+            
+            # 与最近的截图比较，画面未变化时直接引用已有截图文件
+            duplicate_path = None
+            frame_hash = None
+            dedup_key = (screenshot.size, capture_mode, encode_profile.describe())
+            deduplicator = self.frame_deduplicator
+            if deduplicator is not None:
+                start = self.metrics.clock()
+                try:
+                    duplicate_path, frame_hash = deduplicator.find_duplicate(screenshot, dedup_key)
+                except Exception as e:
+                    self.log_activity(f"截图去重失败: {str(e)}", error=True)
+                self.metrics.observe("screenshot.dedup", start)
+            
+            if duplicate_path:
+                screenshot_filename = os.path.basename(duplicate_path)
+            else:
+                # 文件写入成功后才记录为可引用的截图
+                on_saved = None
+                if frame_hash is not None:
+                    on_saved = lambda: deduplicator.remember(frame_hash, screenshot_path, screenshot, dedup_key)
+                if self.screenshot_encoder is None or not self.screenshot_encoder.submit(
+                        screenshot, screenshot_path, encode_profile.encode, on_saved):
+                    self.log_activity("截图保存失败: 截图编码队列已满", error=True)
+                    return None
+            
+            # 变化检测以最近一次截图为比较基准
+            if self.change_detector is not None:
+                self.change_detector.mark_captured()
             
             # 生成操作详情
             operation_detail = f"截图：{reason}"
             
             # 记录到CSV
-            self.log_window_event(window_title, "NORMAL", operation_detail, screenshot_filename)
+            self.log_event(active_window, operation_detail, screenshot_filename)
             
             # 记录到日志
-            self.log_activity(f"【查看】 {operation_detail} {screenshot_filename}")
+            if duplicate_path:
+                self.log_activity(f"【查看】 {operation_detail} {screenshot_filename}（画面未变化，引用已有截图）")
+            else:
+                self.log_activity(f"【查看】 {operation_detail} {screenshot_filename}")
             
             return screenshot_filename
         except Exception as e:
             self.log_activity(f"截图过程出错: {str(e)}", error=True)
             return None
             
-    def log_window_event(self, window_title, window_state, operation_detail, screenshot_filename=None):
-        """记录窗口事件到CSV"""
+    def get_capture_bbox(self, mode, hwnd=None):
+        """根据截图范围模式计算截图区域，返回 None 表示整个桌面"""
+        if mode == CAPTURE_FULL or not has_win32:
+            return None
         try:
-            # 获取当前活动窗口的进程名
-            process_name = "未知"
+            if hwnd is None:
+                hwnd = win32gui.GetForegroundWindow()
+            # 没有前台窗口或窗口已最小化时截取整个桌面
+            if not hwnd or win32gui.IsIconic(hwnd):
+                return None
             
-            # 使用不同方法尝试获取进程名
+            if mode == CAPTURE_MONITOR:
+                monitor = win32api.MonitorFromWindow(hwnd, win32con.MONITOR_DEFAULTTONEAREST)
+                return tuple(win32api.GetMonitorInfo(monitor)["Monitor"])
+            
+            # 窗口区域需裁剪到虚拟桌面范围内（最大化窗口的边框会超出屏幕）
+            left = win32api.GetSystemMetrics(win32con.SM_XVIRTUALSCREEN)
+            top = win32api.GetSystemMetrics(win32con.SM_YVIRTUALSCREEN)
+            virtual_screen = (left, top,
+                              left + win32api.GetSystemMetrics(win32con.SM_CXVIRTUALSCREEN),
+                              top + win32api.GetSystemMetrics(win32con.SM_CYVIRTUALSCREEN))
+            return clip_bbox(win32gui.GetWindowRect(hwnd), virtual_screen)
+        except Exception as e:
+            self.log_activity(f"获取截图区域失败: {str(e)}，使用全屏截图", error=True)
+            return None
+    
+    def grab_screen(self, bbox=None):
+        """抓取屏幕画面，bbox 为 (left, top, right, bottom) 虚拟桌面坐标，None 表示整个桌面"""
+        if bbox is not None and has_win32:
             try:
-                active_window = gw.getActiveWindow()
-                
-                # 方法1: 如果可用，使用Win32 API获取PID
-                if has_win32 and psutil is not None:
-                    try:
-                        hwnd = win32gui.GetForegroundWindow()
-                        _, pid = win32process.GetWindowThreadProcessId(hwnd)
-                        process = psutil.Process(pid)
-                        process_name = process.name()
-                    except Exception as e:
-                        # 仅调试日志
-                        # self.log_activity(f"获取进程名方法1失败: {str(e)}", error=False)
-                        pass
-                
-                # 方法2: 如果方法1失败，尝试使用pygetwindow自带的属性
-                if process_name == "未知" and active_window and psutil is not None:
-                    try:
-                        if hasattr(active_window, '_hWnd'):
-                            pid = active_window._hWnd
-                            try:
-                                # 尝试直接将_hWnd作为PID使用
-                                process = psutil.Process(pid)
-                                process_name = process.name()
-                            except:
-                                pass
-                    except:
-                        pass
-            except:
+                return grab_region_win32(bbox)
+            except Exception:
                 pass
-            
-            # 从窗口标题中提取核心内容（针对浏览器）
-            window_core_title = window_title
-            if any(browser in window_title.lower() for browser in ["chrome", "firefox", "edge", "opera", "safari"]):
-                # 尝试使用常见的分隔符分割标题
-                for separator in [" - ", " | ", " — "]:
-                    if separator in window_title:
-                        parts = window_title.split(separator)
-                        if len(parts) > 1:
-                            window_core_title = parts[1].strip()
-                            break
-            
-            # 准备CSV数据
-            timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-            # 操作类型映射 - 移到前面，以便后面判断剪贴板
-            operation_type = "其他"  # 默认操作类型
-            for op_type, patterns in self.OPERATION_MAPPING.items():
-                # 优化匹配逻辑：优先完全匹配，其次前缀匹配
-                if operation_detail in patterns:
-                    operation_type = op_type
-                    break
-                elif any(operation_detail.startswith(p.replace('*', '')) for p in patterns if '*' in p):
-                     operation_type = op_type
-                     break
-                # 保留原来的模糊匹配作为后备，但可能不太精确
-                elif any(pattern in operation_detail for pattern in patterns if '*' not in pattern):
-                    operation_type = op_type
-                    # 注意：这里如果匹配到多个，可能取第一个匹配到的，不一定最准确
-                    # break # 暂时不break，看看是否有更精确的匹配
-
-            # 获取剪贴板内容 - 根据 operation_type 判断
-            clipboard_content = ""
-            # if any(keyword in operation_detail for keyword in ["复制", "剪贴", "粘贴"]):
-            if operation_type in ["复制", "剪贴", "粘贴"]:
-                try:
-                    # 增加超时和重试机制，提高稳定性
-                    for _ in range(3): # 重试3次
-                        try:
-                            clip_text = pyperclip.paste()
-                            if clip_text is not None: # 确保获取到内容
-                                break # 成功获取，跳出重试
-                        except pyperclip.PyperclipTimeoutException:
-                            time.sleep(0.1) # 超时稍等重试
-                            clip_text = None
-                    
-                    if clip_text:
-                        # 格式化剪贴板内容: 【字数】内容（来源：窗口标签）
-                        text_len = len(clip_text)
-                        if text_len > 200:
-                            # 如果超过200字，只显示前50个和后50个字符
-                            formatted_content = f"【{text_len}】{clip_text[:50]}......{clip_text[-50:]}（来源：{window_core_title}）"
-                        else:
-                            formatted_content = f"【{text_len}】{clip_text}（来源：{window_core_title}）"
-                        clipboard_content = formatted_content
-                except Exception as e: # 捕获更广泛的异常
-                    clipboard_content = f"无法获取剪贴板内容: {e}"
-            
-            # 准备截图文件的超链接 (如果存在)
-            hyperlink_value = ""
-            if screenshot_filename:
+        return ImageGrab.grab(bbox=bbox, all_screens=True)
+    
+    def log_event(self, window, operation_detail, screenshot_filename=None):
+        """使用已解析的前台窗口快照记录事件到CSV"""
+        if self.event_logger is not None:
+            self.event_logger.log_event(window, operation_detail, screenshot_filename)
+    
+    def log_foreground_event(self, operation_detail):
+        """记录键盘、鼠标事件，前台窗口信息取自窗口快照"""
+        self.log_event(self.current_foreground(), operation_detail)
+    
+    def current_foreground(self):
+        """
+        返回当前前台窗口快照；窗口已变化时先提交缓冲的输入，使其记录排在新窗口的事件之前
+        （不能在合并器持有锁时调用，合并器使用 lookup_foreground）
+        """
+        window = self.lookup_foreground()
+        if window.handle != self.input_handle:
+            self.flush_input(window)
+        return window
+    
+    def lookup_foreground(self):
+        """
+        返回当前前台窗口快照（不提交缓冲的输入）
+        快照由窗口监听线程维护；仅当句柄已变化（监听线程尚未轮询到）时才重新解析
+        """
+        window = self.foreground
+        try:
+            if has_win32:
+                if win32gui.GetForegroundWindow() != window.handle:
+                    window = self.query_foreground()
+                    self.foreground = window
+            elif window is UNKNOWN_WINDOW:
+                window = self.query_foreground()
+        except Exception:
+            pass
+        return window
+    
+    def query_foreground(self):
+        """查询当前前台窗口的句柄、标题、进程名和状态"""
+        # 优先使用 win32gui 获取前景窗口句柄
+        if has_win32:
+            handle = win32gui.GetForegroundWindow()
+            if not handle:
+                # 没有前景窗口 (可能桌面获得焦点或所有窗口最小化)
+                return ForegroundWindow(handle, DESKTOP_TITLE, "未知", "NORMAL")
+            return ForegroundWindow(handle, win32gui.GetWindowText(handle),
+                                    self.get_foreground_process_name(hwnd=handle),
+                                    self.get_window_state(handle))
+        
+        # win32gui 不可用时，回退到 pygetwindow (可能不准)
+        active_window = gw.getActiveWindow()
+        if not active_window:
+            return ForegroundWindow(None, DESKTOP_TITLE, "未知", "NORMAL")
+        try:
+            # pygetwindow 的 isMinimized 可能不准确
+            state = "MAXIMIZED" if active_window.isMaximized else "NORMAL"
+        except:
+            state = "NORMAL"
+        return ForegroundWindow(getattr(active_window, '_hWnd', None), active_window.title,
+                                self.get_foreground_process_name(active_window=active_window), state)
+    
+    def get_window_state(self, hwnd):
+        """使用 win32gui 判断窗口状态"""
+        placement = win32gui.GetWindowPlacement(hwnd)
+        window_state_flag = placement[1] # 获取状态标志
+        
+        if win32gui.IsIconic(hwnd): # IsIconic 用于检测最小化
+            return "MINIMIZED"
+        # elif win32gui.IsZoomed(hwnd): # IsZoomed 用于检测最大化
+        elif window_state_flag == win32con.SW_SHOWMAXIMIZED: # 使用 GetWindowPlacement 判断最大化
+            return "MAXIMIZED"
+        return "NORMAL"
+    
+    def get_foreground_process_name(self, hwnd=None, active_window=None):
+        """获取前台窗口的进程名，可传入已获取的窗口句柄或 pygetwindow 窗口对象"""
+        # 获取当前活动窗口的进程名
+        process_name = "未知"
+        
+        # 使用不同方法尝试获取进程名
+        try:
+            # 方法1: 如果可用，使用Win32 API获取PID（通过缓存，同一窗口只查询一次）
+            if self.process_name_cache is not None:
                 try:
-                    # 获取截图文件的绝对路径
-                    full_screenshot_path = os.path.abspath(os.path.join(self.screenshots_folder, screenshot_filename))
-                    # 构造 Excel 超链接公式 (注意路径中的反斜杠可能需要转义，但Excel通常能处理)
-                    # Excel 需要双引号包围参数
-                    hyperlink_value = f'=HYPERLINK("{full_screenshot_path}", "{screenshot_filename}")'
+                    if hwnd is None:
+                        hwnd = win32gui.GetForegroundWindow()
+                    process_name = self.process_name_cache.get(hwnd)
                 except Exception as e:
-                    self.log_activity(f"创建截图超链接失败: {e}", error=True)
-                    hyperlink_value = screenshot_filename # 如果失败，则只写入文件名
-
-            # 准备数据行
-            data_row = [
-                self.student_id.get(),
-                self.name.get(),
-                timestamp,
-                operation_type,
-                operation_detail,
-                process_name,
-                window_core_title,
-                window_state,
-                clipboard_content,
-                # screenshot_filename or ""
-                hyperlink_value # 使用构造好的超链接或空字符串
-            ]
+                    # 仅调试日志
+                    # self.log_activity(f"获取进程名方法1失败: {str(e)}", error=False)
+                    pass
             
-            # 写入CSV
-            self.write_to_csv(data_row)
-            
-        except Exception as e:
-            self.log_activity(f"记录窗口事件失败: {str(e)}", error=True)
+            # 方法2: 如果方法1失败，尝试使用pygetwindow自带的属性
+            if process_name == "未知" and psutil is not None:
+                try:
+                    if active_window is None:
+                        active_window = gw.getActiveWindow()
+                    if active_window and hasattr(active_window, '_hWnd'):
+                        pid = active_window._hWnd
+                        try:
+                            # 尝试直接将_hWnd作为PID使用
+                            process = psutil.Process(pid)
+                            process_name = process.name()
+                        except:
+                            pass
+                except:
+                    pass
+        except:
+            pass
+        
+        return process_name
+    
+    def read_clipboard(self):
+        """读取剪贴板文本（在剪贴板读取线程中调用，失败时由读取线程在时间预算内重试）"""
+        return pyperclip.paste()
 
     def log_activity(self, log_text, error=False):
-        """记录活动到界面日志"""
-        # 添加时间戳
-        now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_entry = f"[{now}] {log_text}"
-        
-        # 添加到日志列表
-        self.log_entries.append(log_entry)
-        
-        # 如果日志超过最大数量，移除最早的记录
-        if len(self.log_entries) > self.max_log_entries:
-            self.log_entries.pop(0)
-        
-        # 更新界面日志
-        self.log_text.config(state=tk.NORMAL)
-        self.log_text.delete(1.0, tk.END)
-        
-        # 如果日志条目很多，只显示最新的10条
-        entries_to_show = self.log_entries[-10:] if len(self.log_entries) > 10 else self.log_entries
+        """记录活动到界面日志（可在任意线程调用，由主线程定时刷新显示）"""
+        if self.log_panel is not None:
+            self.log_panel.append(log_text, error)
         
-        for entry in entries_to_show:
-            if error and entry == log_entry:
-                self.log_text.insert(tk.END, entry + "\n", "error")
-            else:
-                self.log_text.insert(tk.END, entry + "\n")
-        
-        self.log_text.config(state=tk.DISABLED)
-        self.log_text.see(tk.END)  # 滚动到最新内容
-        
-    def write_to_csv(self, data):
-        """写入数据到CSV文件"""
-        try:
-            # 确保所有数据元素都是字符串，以防万一
-            string_data = [str(item) if item is not None else "" for item in data]
-            with open(self.csv_filepath, 'a', newline='', encoding='utf-8-sig') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow(string_data) # 写入字符串列表
-        except Exception as e:
-            self.log_activity(f"错误：无法写入CSV文件 - {str(e)}", error=True)
+    def emit_event(self, record):
+        """将事件记录放入有界写入队列（不阻塞），由后台写入线程格式化并批量写入CSV文件"""
+        self.data_queue.put(record)
 
     def on_close(self):
         """窗口关闭处理"""
@@ -1291,5 +1467,6 @@ class UserBehaviorCollector(tk.Tk):
             self.destroy()
 
 if __name__ == "__main__":
+    set_dpi_awareness()
     app = UserBehaviorCollector()
     app.mainloop()
\ No newline at end of file
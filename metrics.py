@@ -0,0 +1,218 @@
+"""
+运行统计（耗时直方图、计数器、队列深度等）
+
+各阶段用单调时钟计时，耗时按固定的分桶边界计入直方图；计数器记录次数；
+取值函数(gauge)在生成快照时才调用，用于队列深度、线程是否存活和各组件的丢弃计数。
+快照定时以 JSON 行写入会话文件夹，停止监控时再写一行最终快照并输出摘要。
+
+未启用时使用 NULL_METRICS：clock() 返回 0，observe/incr 为空操作，wrap 直接返回原函数，
+调用处不需要判断是否启用。
+"""
+import json
+import time
+import bisect
+import threading
+from collections import deque
+
+# 耗时直方图的分桶上界（微秒），最后一个桶为超过最大边界的耗时
+BUCKET_BOUNDS_US = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000,
+                    100000, 200000, 500000, 1000000)
+_BUCKET_BOUNDS_NS = tuple(bound * 1000 for bound in BUCKET_BOUNDS_US)
+
+
+class Histogram:
+    """
+    固定分桶的耗时直方图（纳秒计入，微秒统计）
+    记录时只把耗时追加到队列（deque.append 线程安全，不需要加锁），生成快照时才计入分桶，
+    钩子线程上的开销只有一次追加
+    """
+
+    __slots__ = ("pending", "add", "counts", "count", "total_ns", "max_ns", "lock")
+
+    def __init__(self):
+        self.pending = deque()
+        self.add = self.pending.append  # 记录一次耗时(纳秒)
+        self.counts = [0] * (len(BUCKET_BOUNDS_US) + 1)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.lock = threading.Lock()
+
+    def _fold(self):
+        """把队列中的耗时计入分桶（调用方持有锁）"""
+        pending = self.pending
+        counts = self.counts
+        for _ in range(len(pending)):
+            duration_ns = pending.popleft()
+            counts[bisect.bisect_left(_BUCKET_BOUNDS_NS, duration_ns)] += 1
+            self.count += 1
+            self.total_ns += duration_ns
+            if duration_ns > self.max_ns:
+                self.max_ns = duration_ns
+
+    def percentile(self, fraction):
+        """按分桶估计的分位数（微秒，取所在桶的上界）"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                if index < len(BUCKET_BOUNDS_US):
+                    return float(min(BUCKET_BOUNDS_US[index], self.max_ns / 1000))
+                return self.max_ns / 1000
+        return self.max_ns / 1000
+
+    def summary(self):
+        with self.lock:
+            self._fold()
+            count = self.count
+            total_ns = self.total_ns
+            max_ns = self.max_ns
+        return {
+            "count": count,
+            "mean_us": round(total_ns / count / 1000, 2) if count else 0.0,
+            "p50_us": self.percentile(0.5),
+            "p90_us": self.percentile(0.9),
+            "p99_us": self.percentile(0.99),
+            "max_us": round(max_ns / 1000, 2),
+        }
+
+
+class Metrics:
+    """运行统计"""
+
+    enabled = True
+
+    def __init__(self, clock=time.perf_counter_ns):
+        self.clock = clock              # 计时用的单调时钟(纳秒)
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.started = time.monotonic()
+
+    def _histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(name, Histogram())
+        return histogram
+
+    def observe(self, name, start_ns):
+        """记录从 start_ns（clock() 的返回值）到现在的耗时"""
+        self._histogram(name).add(self.clock() - start_ns)
+
+    def observe_ns(self, name, duration_ns):
+        """记录一段已知耗时(纳秒)"""
+        self._histogram(name).add(duration_ns)
+
+    def incr(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name, func):
+        """注册取值函数，生成快照时调用"""
+        with self.lock:
+            self.gauges[name] = func
+
+    def wrap(self, name, func):
+        """包装回调函数，记录每次调用的耗时"""
+        clock = self.clock
+        histogram = self._histogram(name)
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.add(clock() - start)
+        return wrapper
+
+    def snapshot(self):
+        """当前统计的快照（可序列化为 JSON）"""
+        with self.lock:
+            histograms = dict(self.histograms)
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+        values = {}
+        for name, func in gauges.items():
+            try:
+                values[name] = func()
+            except Exception as e:
+                values[name] = f"error: {e}"
+        return {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "uptime": round(time.monotonic() - self.started, 1),
+            "histograms": {name: h.summary() for name, h in sorted(histograms.items())},
+            "counters": counters,
+            "gauges": values,
+        }
+
+
+class NullMetrics:
+    """未启用时的空统计"""
+
+    enabled = False
+
+    @staticmethod
+    def clock():
+        return 0
+
+    def observe(self, name, start_ns):
+        pass
+
+    def observe_ns(self, name, duration_ns):
+        pass
+
+    def incr(self, name, value=1):
+        pass
+
+    def gauge(self, name, func):
+        pass
+
+    def wrap(self, name, func):
+        return func
+
+    def snapshot(self):
+        return {}
+
+
+NULL_METRICS = NullMetrics()
+
+
+class MetricsReporter:
+    """把统计快照以 JSON 行追加到文件（由共享定时线程定时调用 write_snapshot）"""
+
+    def __init__(self, metrics, path, on_error=None):
+        self.metrics = metrics
+        self.path = path
+        self.on_error = on_error
+        self.snapshots = 0
+
+    def write_snapshot(self, final=False):
+        """写入一行快照并返回快照"""
+        snapshot = self.metrics.snapshot()
+        if final:
+            snapshot["final"] = True
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(snapshot, ensure_ascii=False, default=str) + "\n")
+            self.snapshots += 1
+        except Exception as e:
+            if self.on_error:
+                self.on_error(f"错误：无法写入运行统计 - {str(e)}")
+        return snapshot
+
+
+def summarize(snapshot, limit=8):
+    """快照摘要：耗时总和最多的若干阶段，每行如 hook.keyboard：1234 次，平均 12.3 µs，p99 50 µs，最长 800 µs"""
+    histograms = snapshot.get("histograms", {})
+    ranked = sorted(histograms.items(), key=lambda item: item[1]["count"] * item[1]["mean_us"], reverse=True)
+    lines = []
+    for name, h in ranked[:limit]:
+        if h["count"]:
+            lines.append(f"{name}：{h['count']} 次，平均 {h['mean_us']:.1f} µs，p99 {h['p99_us']:g} µs，"
+                         f"最长 {h['max_us']:.0f} µs")
+    return lines
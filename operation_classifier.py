@@ -0,0 +1,52 @@
+from functools import lru_cache
+
+
+class OperationClassifier:
+    """
+    预编译的操作类型分类器
+    在加载时把操作类型映射编译为：完全匹配字典、按类别顺序排列的前缀表（带 * 的模式）
+    和子串表，并缓存分类结果；分类结果与逐类别扫描映射完全一致：
+
+    1. 按类别顺序，第一个“完全匹配”或“前缀匹配”的类别直接生效；
+    2. 否则取“子串匹配”的最后一个类别（原逻辑不 break，后面的类别会覆盖前面的）；
+    3. 都不匹配时为默认类型。
+    """
+
+    def __init__(self, mapping, default="其他", cache_size=4096):
+        self.categories = list(mapping)
+        self.default = default
+
+        self.exact = {}       # 操作详情 → 最小类别序号
+        self.prefixes = []    # (前缀, 类别序号)，按类别顺序
+        self.substrings = []  # (模式, 类别序号)，按类别顺序
+        for index, patterns in enumerate(mapping.values()):
+            for pattern in patterns:
+                self.exact.setdefault(pattern, index)
+                if '*' in pattern:
+                    self.prefixes.append((pattern.replace('*', ''), index))
+                else:
+                    self.substrings.append((pattern, index))
+
+        self.classify = lru_cache(maxsize=cache_size)(self._classify)
+
+    def _classify(self, operation_detail):
+        """返回操作详情对应的操作类型"""
+        stop = self.exact.get(operation_detail)
+        for prefix, index in self.prefixes:
+            if stop is not None and index >= stop:
+                break
+            if operation_detail.startswith(prefix):
+                stop = index
+                break
+        if stop is not None:
+            return self.categories[stop]
+
+        operation_type = self.default
+        for pattern, index in self.substrings:
+            if pattern in operation_detail:
+                operation_type = self.categories[index]
+        return operation_type
+
+    def cache_info(self):
+        """分类结果缓存的命中统计"""
+        return self.classify.cache_info()
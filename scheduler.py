@@ -0,0 +1,127 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+class ScheduledCall:
+    """已安排的定时调用，可取消"""
+
+    __slots__ = ("deadline", "func", "cancelled")
+
+    def __init__(self, deadline, func):
+        self.deadline = deadline
+        self.func = func
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class PeriodicCall:
+    """
+    周期调用，可取消
+    下一次的截止时间按上一次的截止时间加间隔计算（固定频率）；执行超时错过的周期不补执行
+    """
+
+    __slots__ = ("scheduler", "interval", "func", "call", "cancelled")
+
+    def __init__(self, scheduler, interval, func):
+        self.scheduler = scheduler
+        self.interval = interval
+        self.func = func
+        self.call = None
+        self.cancelled = False
+
+    def _schedule(self, deadline):
+        self.call = self.scheduler.call_at(deadline, lambda: self._run(deadline))
+
+    def _run(self, deadline):
+        if self.cancelled:
+            return
+        try:
+            self.func()
+        finally:
+            if not self.cancelled:
+                next_deadline = deadline + self.interval
+                now = self.scheduler.clock()
+                if next_deadline <= now:
+                    next_deadline = now + self.interval
+                self._schedule(next_deadline)
+
+    def cancel(self):
+        self.cancelled = True
+        if self.call is not None:
+            self.call.cancel()
+
+
+class Scheduler(threading.Thread):
+    """
+    共享定时线程
+    按截止时间维护一个最小堆，只在最近的截止时间到达（或有更早的任务加入）时唤醒，
+    各组件不必各自开线程循环 sleep 检查
+    """
+
+    def __init__(self, name="Scheduler", clock=time.monotonic, on_error=None):
+        super().__init__(name=name, daemon=True)
+        self.clock = clock
+        self.on_error = on_error
+        self.heap = []
+        self.counter = itertools.count()   # 截止时间相同时按加入顺序执行
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.calls_run = 0
+        self.wakeups = 0
+
+    def call_at(self, deadline, func):
+        """在单调时钟 deadline 时刻调用 func，返回 ScheduledCall"""
+        call = ScheduledCall(deadline, func)
+        with self.condition:
+            heapq.heappush(self.heap, (deadline, next(self.counter), call))
+            # 新任务成为最早的任务时唤醒线程重新计算等待时间
+            if self.heap[0][2] is call:
+                self.condition.notify()
+        return call
+
+    def call_later(self, delay, func):
+        """delay 秒后调用 func"""
+        return self.call_at(self.clock() + delay, func)
+
+    def call_every(self, interval, func, first_delay=None):
+        """每隔 interval 秒调用 func（第一次在 first_delay 秒后，默认为一个间隔），返回 PeriodicCall"""
+        periodic = PeriodicCall(self, interval, func)
+        periodic._schedule(self.clock() + (interval if first_delay is None else first_delay))
+        return periodic
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.stopped:
+                    if self.heap:
+                        timeout = self.heap[0][0] - self.clock()
+                        if timeout <= 0:
+                            break
+                        self.condition.wait(timeout)
+                    else:
+                        self.condition.wait()
+                    self.wakeups += 1
+                if self.stopped:
+                    return
+                _, _, call = heapq.heappop(self.heap)
+            if call.cancelled:
+                continue
+            try:
+                call.func()
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(f"定时任务执行失败: {str(e)}")
+            self.calls_run += 1
+
+    def stop(self, timeout=5):
+        """停止定时线程，未到期的任务不再执行"""
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        if self.is_alive():
+            self.join(timeout)
+        return not self.is_alive()
@@ -0,0 +1,296 @@
+import time
+import queue
+import threading
+
+from PIL import Image
+
+from event_sources import EventSource
+from metrics import NULL_METRICS
+
+# 截图范围模式
+CAPTURE_FULL = "full"        # 整个虚拟桌面（全部显示器）
+CAPTURE_MONITOR = "monitor"  # 前台窗口所在的显示器
+CAPTURE_WINDOW = "window"    # 仅前台窗口区域
+CAPTURE_MODES = (CAPTURE_FULL, CAPTURE_MONITOR, CAPTURE_WINDOW)
+
+
+def clip_bbox(rect, bounds):
+    """
+    将矩形 (left, top, right, bottom) 裁剪到 bounds 范围内，
+    结果为空时返回 None
+    """
+    left = max(rect[0], bounds[0])
+    top = max(rect[1], bounds[1])
+    right = min(rect[2], bounds[2])
+    bottom = min(rect[3], bounds[3])
+    if right <= left or bottom <= top:
+        return None
+    return (left, top, right, bottom)
+
+
+def save_image(image, path):
+    """默认编码函数：按文件扩展名保存图片"""
+    image.save(path)
+
+
+# 图片格式对应的文件扩展名
+FORMAT_EXTENSIONS = {"PNG": ".png", "JPEG": ".jpg", "WEBP": ".webp"}
+
+
+class EncodeProfile:
+    """
+    截图编码设置
+    format: PNG / JPEG / WEBP
+    quality: JPEG、WEBP 的质量(1-100)，WEBP 为 None 时使用无损压缩
+    max_dimension: 长边超过该像素数时等比缩小，None 表示保持原始分辨率
+    compress_level: PNG 压缩级别(0-9)
+    method: WEBP 压缩方法(0-6)，越小越快
+    """
+
+    def __init__(self, format="PNG", quality=None, max_dimension=None, compress_level=6, method=4):
+        format = format.upper()
+        if format not in FORMAT_EXTENSIONS:
+            raise ValueError(f"不支持的截图格式: {format}")
+        self.format = format
+        self.quality = quality
+        self.max_dimension = max_dimension
+        self.compress_level = compress_level
+        self.method = method
+
+    @property
+    def extension(self):
+        """截图文件扩展名"""
+        return FORMAT_EXTENSIONS[self.format]
+
+    def describe(self):
+        """简短描述，用于日志和基准测试报告"""
+        parts = [self.format]
+        if self.format == "PNG":
+            parts.append(f"level={self.compress_level}")
+        elif self.quality is None:
+            parts.append("lossless")
+        else:
+            parts.append(f"q={self.quality}")
+        if self.format == "WEBP":
+            parts.append(f"m={self.method}")
+        if self.max_dimension:
+            parts.append(f"max={self.max_dimension}")
+        return " ".join(parts)
+
+    def resize(self, image):
+        """按最大边长等比缩小画面"""
+        if not self.max_dimension:
+            return image
+        width, height = image.size
+        longest = max(width, height)
+        if longest <= self.max_dimension:
+            return image
+        scale = self.max_dimension / longest
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        return image.resize(size, Image.BILINEAR, reducing_gap=2.0)
+
+    def encode(self, image, fp):
+        """编码并写入文件路径或文件对象"""
+        image = self.resize(image)
+        if self.format == "PNG":
+            image.save(fp, format="PNG", compress_level=self.compress_level)
+        elif self.format == "JPEG":
+            if image.mode != "RGB":
+                image = image.convert("RGB")
+            image.save(fp, format="JPEG", quality=self.quality or 75)
+        elif self.quality is None:
+            image.save(fp, format="WEBP", lossless=True, method=self.method)
+        else:
+            image.save(fp, format="WEBP", quality=self.quality, method=self.method)
+
+
+class CaptureThread(EventSource):
+    """
+    截图抓取线程
+    定时截图、画面变化探测和窗口切换截图只把抓取请求交给该线程，整屏抓取、探测比较和重复截图检测
+    在这里依次执行，不占用共享定时线程；同一种请求尚未执行时再次提交会被合并
+    """
+
+    name = "screenshot_capture"
+
+    def __init__(self, on_error=None, metrics=NULL_METRICS):
+        self.on_error = on_error          # 错误回调，参数为错误信息
+        self.metrics = metrics            # 运行统计（请求等待时间）
+        self.condition = threading.Condition()
+        self.pending = {}                 # 请求名 -> (提交时间, 函数, 参数)，按提交顺序执行
+        self.running = False
+        self.thread = None
+
+        # 统计信息
+        self.submitted = 0
+        self.coalesced = 0
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="ScreenshotCapture", daemon=True)
+        self.thread.start()
+
+    def submit(self, key, func, *args):
+        """
+        提交一次抓取请求（不阻塞），已停止时返回 False
+        同名请求尚未执行时不再重复加入，由等待中的请求完成
+        """
+        with self.condition:
+            if not self.running:
+                return False
+            if key in self.pending:
+                self.coalesced += 1
+                return True
+            self.pending[key] = (self.metrics.clock(), func, args)
+            self.submitted += 1
+            self.condition.notify()
+        return True
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.running and not self.pending:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                key = next(iter(self.pending))
+                submitted_at, func, args = self.pending.pop(key)
+            self.metrics.observe("screenshot.capture_wait", submitted_at)
+            try:
+                func(*args)
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(f"截图抓取失败: {str(e)}")
+
+    def stop(self):
+        """停止线程，尚未执行的请求被丢弃，正在进行的抓取会完成"""
+        with self.condition:
+            self.running = False
+            self.pending.clear()
+            self.condition.notify_all()
+
+    def is_alive(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def join(self, timeout=None):
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def stats(self):
+        """返回抓取请求统计"""
+        with self.condition:
+            return {"submitted": self.submitted, "coalesced": self.coalesced, "pending": len(self.pending)}
+
+
+class ScreenshotEncoder:
+    """
+    截图编码器
+    捕获阶段只负责抓取原始画面并放入有界队列，
+    由若干工作线程完成压缩编码和文件写入，避免阻塞监听线程
+    """
+
+    # 停止信号
+    _STOP = object()
+
+    def __init__(self, workers=2, max_queue=3, encode_func=save_image, on_error=None, metrics=NULL_METRICS):
+        self.workers = workers
+        self.encode_queue = queue.Queue(maxsize=max_queue)
+        self.encode_func = encode_func    # 编码函数，参数为 (image, path)
+        self.on_error = on_error          # 错误回调，参数为错误信息
+        self.metrics = metrics            # 运行统计（编码耗时）
+        self.threads = []
+
+        # 统计信息
+        self.lock = threading.Lock()
+        self.submitted = 0
+        self.encoded = 0
+        self.failed = 0
+        self.dropped = 0
+        self.max_queue_depth = 0
+        self.total_encode_time = 0.0
+        self.max_encode_time = 0.0
+
+    def start(self):
+        """启动编码工作线程"""
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"ScreenshotEncoder-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, image, path, encode_func=None, on_saved=None):
+        """
+        提交一帧待编码画面，队列已满时丢弃并返回 False
+        encode_func 为 None 时使用默认编码函数；on_saved 在文件写入成功后于编码线程中调用
+        """
+        try:
+            self.encode_queue.put_nowait((image, path, encode_func or self.encode_func, on_saved))
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+            return False
+        with self.lock:
+            self.submitted += 1
+            depth = self.encode_queue.qsize()
+            if depth > self.max_queue_depth:
+                self.max_queue_depth = depth
+        return True
+
+    def _worker(self):
+        """编码工作线程"""
+        while True:
+            item = self.encode_queue.get()
+            if item is self._STOP:
+                break
+            image, path, encode_func, on_saved = item
+            start = time.perf_counter()
+            try:
+                encode_func(image, path)
+            except Exception as e:
+                with self.lock:
+                    self.failed += 1
+                if self.on_error:
+                    self.on_error(f"截图保存失败: {str(e)}")
+                continue
+            elapsed = time.perf_counter() - start
+            self.metrics.observe_ns("screenshot.encode", int(elapsed * 1e9))
+            if on_saved is not None:
+                try:
+                    on_saved()
+                except Exception as e:
+                    if self.on_error:
+                        self.on_error(f"截图保存后处理失败: {str(e)}")
+            with self.lock:
+                self.encoded += 1
+                self.total_encode_time += elapsed
+                if elapsed > self.max_encode_time:
+                    self.max_encode_time = elapsed
+
+    def queue_depth(self):
+        """当前等待编码的帧数"""
+        return self.encode_queue.qsize()
+
+    def stats(self):
+        """返回编码统计信息"""
+        with self.lock:
+            avg = self.total_encode_time / self.encoded if self.encoded else 0.0
+            return {
+                "queue_depth": self.encode_queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "submitted": self.submitted,
+                "encoded": self.encoded,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "avg_encode_ms": avg * 1000,
+                "max_encode_ms": self.max_encode_time * 1000,
+            }
+
+    def stop(self, timeout=10):
+        """等待队列中的画面全部编码完成后停止工作线程"""
+        for _ in self.threads:
+            self.encode_queue.put(self._STOP)
+        deadline = time.monotonic() + timeout
+        for thread in self.threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        alive = any(t.is_alive() for t in self.threads)
+        self.threads = []
+        return not alive
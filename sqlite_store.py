@@ -0,0 +1,258 @@
+"""
+SQLite 会话存储（可选输出端）
+
+事件、窗口、进程、截图分表保存，按时间、操作类型、进程建立索引，
+便于直接查询长时间会话；export_csv 可导出与原CSV完全相同的列格式。
+
+命令行用法：
+    python sqlite_store.py export 会话.db 输出.csv
+    python sqlite_store.py query 会话.db --type 复制 --process WINWORD.EXE --start "2025-04-12 10:00:00" --end "2025-04-12 10:30:00"
+"""
+import csv
+import sys
+import sqlite3
+import argparse
+
+from event_record import CsvRowFormatter, OPERATION_TYPES, WINDOW_STATES
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS session (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS processes (
+    id   INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS windows (
+    id         INTEGER PRIMARY KEY,
+    title      TEXT NOT NULL,
+    process_id INTEGER NOT NULL REFERENCES processes(id),
+    UNIQUE (title, process_id)
+);
+CREATE TABLE IF NOT EXISTS screenshots (
+    id       INTEGER PRIMARY KEY,
+    filename TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS events (
+    id            INTEGER PRIMARY KEY,
+    ts_ns         INTEGER NOT NULL,
+    timestamp     TEXT NOT NULL,
+    op_type       TEXT NOT NULL,
+    detail        TEXT NOT NULL,
+    process_id    INTEGER NOT NULL REFERENCES processes(id),
+    window_id     INTEGER NOT NULL REFERENCES windows(id),
+    state         TEXT NOT NULL,
+    clipboard     TEXT NOT NULL DEFAULT '',
+    screenshot_id INTEGER REFERENCES screenshots(id)
+);
+CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events(timestamp);
+CREATE INDEX IF NOT EXISTS idx_events_type_time ON events(op_type, timestamp);
+CREATE INDEX IF NOT EXISTS idx_events_process_time ON events(process_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_events_window ON events(window_id);
+"""
+
+# 导出时使用的查询，列顺序与CSV一致
+EXPORT_QUERY = """
+SELECT e.timestamp, e.op_type, e.detail, p.name, w.title, e.state, e.clipboard, s.filename
+FROM events e
+JOIN processes p ON p.id = e.process_id
+JOIN windows w ON w.id = e.window_id
+LEFT JOIN screenshots s ON s.id = e.screenshot_id
+"""
+
+
+def connect(db_path):
+    """打开数据库并启用WAL日志模式"""
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class SqliteSink:
+    """
+    SQLite输出端
+    由写入线程调用：每批事件在一个事务中写入；窗口、进程、截图使用内存中的ID缓存避免重复查询，
+    事务回滚时清空缓存（缓存中可能有未提交的ID）
+    """
+
+    kind = "sqlite"
+
+    def __init__(self, db_path, student_id, name, screenshots_folder=""):
+        self.db_path = db_path
+        self.conn = connect(db_path)
+        self.formatter = CsvRowFormatter(student_id, name, screenshots_folder)
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO session(key, value) VALUES (?, ?)",
+                                  [("student_id", student_id), ("name", name),
+                                   ("screenshots_folder", screenshots_folder)])
+        self.process_ids = {}
+        self.window_ids = {}
+        self.screenshot_ids = {}
+
+    def _get_id(self, cache, key, select_sql, insert_sql, params):
+        """查找或插入维表记录，返回ID"""
+        row_id = cache.get(key)
+        if row_id is None:
+            row = self.conn.execute(select_sql, params).fetchone()
+            if row is None:
+                row_id = self.conn.execute(insert_sql, params).lastrowid
+            else:
+                row_id = row[0]
+            cache[key] = row_id
+        return row_id
+
+    def process_id(self, name):
+        return self._get_id(self.process_ids, name,
+                            "SELECT id FROM processes WHERE name = ?",
+                            "INSERT INTO processes(name) VALUES (?)", (name,))
+
+    def window_id(self, title, process_id):
+        return self._get_id(self.window_ids, (title, process_id),
+                            "SELECT id FROM windows WHERE title = ? AND process_id = ?",
+                            "INSERT INTO windows(title, process_id) VALUES (?, ?)", (title, process_id))
+
+    def screenshot_id(self, filename):
+        if not filename:
+            return None
+        return self._get_id(self.screenshot_ids, filename,
+                            "SELECT id FROM screenshots WHERE filename = ?",
+                            "INSERT INTO screenshots(filename) VALUES (?)", (filename,))
+
+    def insert_values(self, ts_ns, timestamp, op_type, detail, process_name, window_title, state,
+                      clipboard, screenshot):
+        """插入一条事件（需在事务中调用）"""
+        process_id = self.process_id(process_name)
+        self.conn.execute(
+            "INSERT INTO events(ts_ns, timestamp, op_type, detail, process_id, window_id, state, clipboard, screenshot_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (ts_ns, timestamp, op_type, detail, process_id, self.window_id(window_title, process_id),
+             state, clipboard or "", self.screenshot_id(screenshot)))
+
+    def write_rows(self, records):
+        """在一个事务中批量写入事件记录"""
+        op_names = OPERATION_TYPES.names
+        state_names = WINDOW_STATES.names
+        try:
+            with self.conn:
+                for record in records:
+                    self.insert_values(record.wall_ns,
+                                       self.formatter.format_timestamp(record.wall_ns),
+                                       op_names[record.op_code], record.detail, record.process_name,
+                                       record.window_title, state_names[record.state_code],
+                                       record.clipboard, record.screenshot)
+        except Exception:
+            self.clear_cache()
+            raise
+
+    def clear_cache(self):
+        """清空ID缓存，之后按数据库中实际已提交的记录重新查询"""
+        self.process_ids.clear()
+        self.window_ids.clear()
+        self.screenshot_ids.clear()
+
+    def flush(self):
+        """每批写入都已提交，无需额外操作"""
+        pass
+
+    def sync(self):
+        """将WAL中已提交的事务写回数据库文件"""
+        self.conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def position(self):
+        """当前写入位置（用于崩溃恢复的检查点）"""
+        return {"events": self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]}
+
+    def can_restore(self, position):
+        return self.position()["events"] >= position["events"]
+
+    def truncate_to(self, position):
+        """删除检查点之后写入的事件"""
+        with self.conn:
+            self.conn.execute("DELETE FROM events WHERE id > ?", (position["events"],))
+
+    def close(self):
+        self.conn.close()
+
+
+def export_csv(db_path, csv_path):
+    """导出为与原CSV完全相同的列格式，返回导出的行数"""
+    conn = sqlite3.connect(db_path)
+    try:
+        session = dict(conn.execute("SELECT key, value FROM session"))
+        formatter = CsvRowFormatter(session.get("student_id", ""), session.get("name", ""),
+                                    session.get("screenshots_folder", ""))
+        count = 0
+        with open(csv_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(CsvRowFormatter.HEADER)
+            for timestamp, op_type, detail, process_name, title, state, clipboard, screenshot in \
+                    conn.execute(EXPORT_QUERY + " ORDER BY e.id"):
+                writer.writerow([formatter.student_id, formatter.name, timestamp, op_type, detail,
+                                 process_name, title, state, clipboard,
+                                 formatter.format_hyperlink(screenshot)])
+                count += 1
+        return count
+    finally:
+        conn.close()
+
+
+def query_events(db_path, op_type=None, process_name=None, start=None, end=None):
+    """
+    按操作类型、进程名和时间范围（"YYYY-MM-DD HH:MM:SS"）查询事件，
+    返回 (时间戳, 操作类型, 操作详情, 进程名, 窗口标签, 窗口状态, 剪贴板内容, 截图文件) 列表
+    """
+    conditions, params = [], []
+    if op_type:
+        conditions.append("e.op_type = ?")
+        params.append(op_type)
+    if process_name:
+        conditions.append("e.process_id = (SELECT id FROM processes WHERE name = ?)")
+        params.append(process_name)
+    if start:
+        conditions.append("e.timestamp >= ?")
+        params.append(start)
+    if end:
+        conditions.append("e.timestamp <= ?")
+        params.append(end)
+    sql = EXPORT_QUERY
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY e.timestamp, e.id"
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite 会话存储工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="导出为CSV")
+    export_parser.add_argument("db")
+    export_parser.add_argument("csv")
+
+    query_parser = subparsers.add_parser("query", help="查询事件")
+    query_parser.add_argument("db")
+    query_parser.add_argument("--type", help="操作类型，如 复制")
+    query_parser.add_argument("--process", help="进程名，如 WINWORD.EXE")
+    query_parser.add_argument("--start", help="开始时间 YYYY-MM-DD HH:MM:SS")
+    query_parser.add_argument("--end", help="结束时间 YYYY-MM-DD HH:MM:SS")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        count = export_csv(args.db, args.csv)
+        print(f"已导出 {count} 行到 {args.csv}")
+    else:
+        writer = csv.writer(sys.stdout)
+        for row in query_events(args.db, args.type, args.process, args.start, args.end):
+            writer.writerow(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+鼠标轨迹记录
+
+鼠标移动事件在钩子线程中写入预分配的整数数组（x、y、距上一保存点的毫秒数），
+写入前在线抽稀：与上一候选点距离小于阈值的抖动点丢弃；沿近似直线移动时只保留端点。
+偏差用扇形区域（sleeve）判断：上一保存点之后丢弃的每个点都把"上一保存点→新点"的允许方向
+收窄到与该点距离不超过偏差阈值的范围，新点方向落在范围外、比丢弃的点更近，
+或方向变化超过角度阈值、停顿超过时间阈值时才保存候选点，因此保存的折线与每个采集点的距离都不超过偏差阈值。
+每个前台窗口停留期间的轨迹写为一个二进制文件（缓冲区写满时分为多个文件），
+由定时线程写出，并在CSV中记录一行"鼠标-轨迹"引用该文件。
+
+文件格式（小端）：
+    头部  4s 魔数 "UBCT" | H 版本 | H 保留 | q 第一个点的系统时间(纳秒) | I 保存点数 | I 采集点数
+    数据  int32 x[n] | int32 y[n] | int32 dt_ms[n]
+"""
+import os
+import sys
+import math
+import time
+import struct
+import threading
+from array import array
+from collections import deque
+
+MAGIC = b"UBCT"
+VERSION = 1
+_HEADER = struct.Struct("<4sHHqII")
+
+
+def _to_little_endian(values):
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def write_trajectory(path, start_wall_ns, captured, xs, ys, dts):
+    """写入一个轨迹文件，返回文件大小"""
+    data = b"".join([_HEADER.pack(MAGIC, VERSION, 0, start_wall_ns, len(xs), captured),
+                     _to_little_endian(xs), _to_little_endian(ys), _to_little_endian(dts)])
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+
+def read_trajectory(path):
+    """读取轨迹文件，返回 (第一个点的系统时间(纳秒), 采集点数, [(x, y, 相对第一个点的毫秒数), ...])"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, version, _, start_wall_ns, count, captured = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"不是轨迹文件: {path}")
+    columns = []
+    offset = _HEADER.size
+    for _ in range(3):
+        values = array('i')
+        values.frombytes(data[offset:offset + 4 * count])
+        if sys.byteorder == "big":
+            values.byteswap()
+        columns.append(values)
+        offset += 4 * count
+    points = []
+    elapsed = 0
+    for x, y, dt in zip(*columns):
+        elapsed += dt
+        points.append((x, y, elapsed))
+    return start_wall_ns, captured, points
+
+
+def _wrap_angle(angle):
+    """把角度差规整到 [-π, π)"""
+    return (angle + math.pi) % (2 * math.pi) - math.pi
+
+
+class TrajectoryRecorder:
+    """
+    鼠标轨迹记录器
+    add_point 在鼠标钩子线程中调用，只做少量运算，不写文件；flush 在窗口切换和停止监控时调用，
+    取出的轨迹段交给定时线程写出（未提供 scheduler 时直接写出），drain 写出剩余的轨迹段
+    """
+
+    def __init__(self, folder, log_event, current_window, min_distance=2, max_deviation=2.0,
+                 angle_threshold=15.0, pause_threshold=0.2, capacity=4096, on_error=None, scheduler=None):
+        self.folder = folder                    # 轨迹文件目录
+        self.log_event = log_event              # 记录回调，参数为 (窗口快照, 操作详情)
+        self.current_window = current_window    # 返回当前前台窗口快照
+        # 抖动阈值(像素)的平方；不超过偏差阈值，丢弃的抖动点与保存点的距离不会超过偏差阈值
+        jitter = min(min_distance, max_deviation)
+        self.min_distance_sq = jitter * jitter
+        self.max_deviation = max_deviation      # 偏差阈值(像素)
+        self.cos_threshold = math.cos(math.radians(angle_threshold))  # 方向变化阈值
+        self.pause_ms = int(pause_threshold * 1000)  # 停顿超过该时间(毫秒)时保留停顿前的点
+        self.capacity = capacity
+        self.on_error = on_error
+        self.scheduler = scheduler
+        self.lock = threading.Lock()
+        self.pending = deque()                  # 等待写出的轨迹段
+
+        # 预分配的缓冲区
+        self.xs = array('i', bytes(4 * capacity))
+        self.ys = array('i', bytes(4 * capacity))
+        self.dts = array('i', bytes(4 * capacity))
+        self.count = 0
+        self._reset_interval()
+
+        # 统计
+        self.total_captured = 0
+        self.total_stored = 0
+        self.chunks = 0
+        self.bytes_written = 0
+
+    def _reset_interval(self):
+        self.active = False       # 当前是否有未写出的轨迹段
+        self.count = 0
+        self.captured = 0
+        self.window = None
+        self.start_wall_ns = 0
+        self.last_ms = 0          # 最后保存点的时间（毫秒，相对本段起点）
+        self.candidate = None     # 尚未保存的最新点 (x, y, 毫秒)
+        self._reset_sleeve()
+
+    def _reset_sleeve(self):
+        """以最后保存点为顶点重新开始扇形区域"""
+        self.sleeve_ref = None    # 扇形的参考方向（弧度），尚无约束时为 None
+        self.sleeve_lo = -math.pi  # 允许方向相对参考方向的范围
+        self.sleeve_hi = math.pi
+        self.reach = 0.0          # 丢弃的点与最后保存点的最大距离
+
+    def _constrain(self, dx, dy):
+        """把相对最后保存点 (dx, dy) 的点加入扇形约束：之后的保存点方向须使该点与连线的距离不超过偏差阈值"""
+        dist = math.hypot(dx, dy)
+        if dist <= self.max_deviation:
+            return
+        if dist > self.reach:
+            self.reach = dist
+        theta = math.atan2(dy, dx)
+        half = math.asin(self.max_deviation / dist)
+        if self.sleeve_ref is None:
+            self.sleeve_ref = theta
+            self.sleeve_lo = -half
+            self.sleeve_hi = half
+        else:
+            rel = _wrap_angle(theta - self.sleeve_ref)
+            self.sleeve_lo = max(self.sleeve_lo, rel - half)
+            self.sleeve_hi = min(self.sleeve_hi, rel + half)
+
+    def _fits(self, dx, dy):
+        """相对最后保存点 (dx, dy) 的点作为下一个保存点时，已丢弃的点是否都在偏差范围内"""
+        if self.sleeve_ref is None:
+            return True
+        if math.hypot(dx, dy) < self.reach:
+            return False
+        rel = _wrap_angle(math.atan2(dy, dx) - self.sleeve_ref)
+        return self.sleeve_lo <= rel <= self.sleeve_hi
+
+    def _start_interval(self, window, timestamp, x, y):
+        """开始新的一段，第一个点直接保存"""
+        self.active = True
+        self.window = window
+        self.start_wall_ns = int(timestamp * 1e9)
+        self.captured = 1
+        self._store(x, y, 0)
+
+    def add_point(self, x, y, timestamp=None):
+        """记录一个鼠标移动点，timestamp 为事件的系统时间(秒)"""
+        if timestamp is None:
+            timestamp = time.time()
+        x = int(x)
+        y = int(y)
+        chunk = None
+        with self.lock:
+            if not self.active:
+                self._start_interval(self.current_window(), timestamp, x, y)
+                return
+            self.captured += 1
+            ms = int(timestamp * 1e9 - self.start_wall_ns) // 1_000_000
+            last = self.count - 1
+            px = self.xs[last]
+            py = self.ys[last]
+            candidate = self.candidate
+            if candidate is None:
+                dx = x - px
+                dy = y - py
+            else:
+                dx = x - candidate[0]
+                dy = y - candidate[1]
+            if dx * dx + dy * dy < self.min_distance_sq:
+                # 抖动：丢弃，但仍须落在保存的折线附近；候选点因此不再满足时保存候选点
+                self._constrain(x - px, y - py)
+                if candidate is not None and not self._fits(candidate[0] - px, candidate[1] - py):
+                    chunk = self._store_candidate(timestamp, x, y)
+                    if chunk is None:
+                        self._constrain(x - candidate[0], y - candidate[1])
+            else:
+                if candidate is not None:
+                    # 新点方向超出扇形（已丢弃的点会偏离连线过远）、前后两段方向夹角过大，或候选点之后有停顿，则保存候选点
+                    ax = candidate[0] - px
+                    ay = candidate[1] - py
+                    if not self._fits(x - px, y - py) \
+                            or ax * dx + ay * dy < self.cos_threshold * math.sqrt((ax * ax + ay * ay) * (dx * dx + dy * dy)) \
+                            or ms - candidate[2] > self.pause_ms:
+                        chunk = self._store_candidate(timestamp, x, y)
+                if chunk is None:
+                    last = self.count - 1
+                    self._constrain(x - self.xs[last], y - self.ys[last])
+                    self.candidate = (x, y, ms)
+        if chunk is not None:
+            self._queue_chunk(chunk)
+
+    def _store_candidate(self, timestamp, x, y):
+        """
+        保存候选点作为扇形的新顶点（需持有锁）
+        缓冲区已满时取出当前段并从 (x, y) 开始同一窗口的下一段，返回取出的轨迹段，否则返回 None
+        """
+        self._store(*self.candidate)
+        self.candidate = None
+        self._reset_sleeve()
+        if self.count < self.capacity:
+            return None
+        window = self.window
+        self.captured -= 1
+        chunk = self._take_chunk()
+        self._start_interval(window, timestamp, x, y)
+        return chunk
+
+    def _store(self, x, y, ms):
+        index = self.count
+        self.xs[index] = x
+        self.ys[index] = y
+        self.dts[index] = ms - self.last_ms
+        self.last_ms = ms
+        self.count = index + 1
+
+    def _take_chunk(self):
+        """取出当前段的数据并清空缓冲区（需持有锁）"""
+        if self.candidate is not None:
+            self._store(*self.candidate)
+        count = self.count
+        self.chunks += 1
+        self.total_captured += self.captured
+        self.total_stored += count
+        chunk = (f"traj_{self.chunks:05d}.bin", self.window, self.start_wall_ns, self.captured,
+                 self.xs[:count], self.ys[:count], self.dts[:count])
+        self._reset_interval()
+        return chunk
+
+    def _write_chunk(self, filename, window, start_wall_ns, captured, xs, ys, dts):
+        """写入轨迹文件并在CSV中记录引用"""
+        try:
+            size = write_trajectory(os.path.join(self.folder, filename), start_wall_ns, captured, xs, ys, dts)
+        except Exception as e:
+            if self.on_error:
+                self.on_error(f"错误：轨迹文件写入失败 - {str(e)}")
+            return
+        self.bytes_written += size
+        self.log_event(window, f"鼠标-轨迹：{len(xs)}点（采集{captured}点）{filename}")
+
+    def _queue_chunk(self, chunk):
+        """把轨迹段交给定时线程写出，不在钩子线程中写文件"""
+        self.pending.append(chunk)
+        if self.scheduler is not None:
+            self.scheduler.call_later(0, self.drain)
+        else:
+            self.drain()
+
+    def drain(self):
+        """写出等待中的轨迹段（定时线程中调用；停止监控时在定时线程停止后再调用一次）"""
+        while True:
+            try:
+                chunk = self.pending.popleft()
+            except IndexError:
+                return
+            self._write_chunk(*chunk)
+
+    def flush(self):
+        """结束当前窗口的轨迹段（窗口切换、停止监控时调用）"""
+        with self.lock:
+            chunk = self._take_chunk() if self.active else None
+        if chunk is not None:
+            self._queue_chunk(chunk)
+
+    def stats(self):
+        """采集点数与保存点数统计"""
+        return {
+            "captured": self.total_captured,
+            "stored": self.total_stored,
+            "ratio": self.total_stored / self.total_captured if self.total_captured else 0.0,
+            "chunks": self.chunks,
+            "bytes": self.bytes_written,
+        }
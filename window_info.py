@@ -0,0 +1,153 @@
+import time
+import threading
+from collections import OrderedDict
+
+# 常见浏览器关键字，用于提取窗口标签核心内容
+BROWSER_KEYWORDS = ["chrome", "firefox", "edge", "opera", "safari"]
+
+
+def extract_core_title(window_title):
+    """从窗口标题中提取核心内容（针对浏览器）"""
+    window_core_title = window_title
+    if window_title and any(browser in window_title.lower() for browser in BROWSER_KEYWORDS):
+        # 尝试使用常见的分隔符分割标题
+        for separator in [" - ", " | ", " — "]:
+            if separator in window_title:
+                parts = window_title.split(separator)
+                if len(parts) > 1:
+                    window_core_title = parts[1].strip()
+                    break
+    return window_core_title
+
+
+class ForegroundWindow:
+    """
+    前台窗口快照（只读）
+    由窗口监听线程整体替换，键盘、鼠标钩子直接读取，无需加锁；
+    一个事件只解析一次前台窗口，并随事件一起传给事件记录器
+    """
+
+    __slots__ = ("handle", "title", "core_title", "process_name", "state")
+
+    def __init__(self, handle, title, process_name="未知", state="NORMAL"):
+        self.handle = handle
+        self.title = title
+        self.core_title = extract_core_title(title)
+        self.process_name = process_name
+        self.state = state
+
+    def with_state(self, state):
+        """返回仅窗口状态不同的新快照"""
+        return ForegroundWindow(self.handle, self.title, self.process_name, state)
+
+    def __repr__(self):
+        return (f"ForegroundWindow(handle={self.handle!r}, title={self.title!r}, "
+                f"process_name={self.process_name!r}, state={self.state!r})")
+
+
+# 无法获取前台窗口时使用的快照
+UNKNOWN_WINDOW = ForegroundWindow(None, "未知窗口")
+
+
+class ProcessNameCache:
+    """
+    进程名缓存
+    缓存 窗口句柄→PID 和 PID→进程名 两级映射，带过期时间(TTL)和LRU淘汰，
+    同一窗口内的大量事件只需一次字典查找；PID 消失时清除相关缓存
+    """
+
+    def __init__(self, pid_lookup, name_lookup, pid_exists=None, ttl=30.0, max_size=256,
+                 clock=time.monotonic):
+        self.pid_lookup = pid_lookup     # 窗口句柄 → PID
+        self.name_lookup = name_lookup   # PID → 进程名，进程不存在时抛出异常
+        self.pid_exists = pid_exists     # PID 是否仍然存在，可选
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+
+        self.lock = threading.Lock()
+        self.hwnd_cache = OrderedDict()  # hwnd → (pid, 缓存时间)
+        self.pid_cache = OrderedDict()   # pid → (进程名, 缓存时间)
+
+        # 命中统计
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, hwnd):
+        """返回窗口句柄对应的进程名"""
+        now = self.clock()
+        with self.lock:
+            pid = self._lookup(self.hwnd_cache, hwnd, now)
+            if pid is not None:
+                name = self._lookup(self.pid_cache, pid, now)
+                if name is not None:
+                    self.hits += 1
+                    return name
+            self.misses += 1
+
+        # 未命中：在锁外查询系统信息
+        if pid is None:
+            pid = self.pid_lookup(hwnd)
+        try:
+            name = self.name_lookup(pid)
+        except Exception:
+            self.invalidate_pid(pid)
+            raise
+
+        with self.lock:
+            self._store(self.hwnd_cache, hwnd, pid, now)
+            self._store(self.pid_cache, pid, name, now)
+        return name
+
+    def _lookup(self, cache, key, now):
+        """查找未过期的缓存项，过期项直接删除"""
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        value, stored_at = entry
+        if now - stored_at >= self.ttl:
+            del cache[key]
+            # PID 过期时顺便确认进程是否已退出
+            if cache is self.pid_cache and self.pid_exists is not None and not self.pid_exists(key):
+                self._drop_pid(key)
+            return None
+        cache.move_to_end(key)
+        return value
+
+    def _store(self, cache, key, value, now):
+        """写入缓存项，超过容量时淘汰最久未使用的项"""
+        cache[key] = (value, now)
+        cache.move_to_end(key)
+        while len(cache) > self.max_size:
+            cache.popitem(last=False)
+
+    def _drop_pid(self, pid):
+        """删除 PID 及指向它的窗口句柄缓存（需持有锁）"""
+        self.pid_cache.pop(pid, None)
+        for hwnd in [h for h, (p, _) in self.hwnd_cache.items() if p == pid]:
+            del self.hwnd_cache[hwnd]
+        self.invalidations += 1
+
+    def invalidate_pid(self, pid):
+        """进程已退出时清除相关缓存"""
+        with self.lock:
+            self._drop_pid(pid)
+
+    def clear(self):
+        """清空缓存"""
+        with self.lock:
+            self.hwnd_cache.clear()
+            self.pid_cache.clear()
+
+    def stats(self):
+        """返回命中统计"""
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "invalidations": self.invalidations,
+                "size": len(self.pid_cache),
+            }
@@ -0,0 +1,314 @@
+import time
+import threading
+
+from event_sources import EventSource
+from window_info import ForegroundWindow, UNKNOWN_WINDOW
+
+# 没有前台窗口时的标题
+DESKTOP_TITLE = "桌面/无活动窗口"
+
+
+class WindowTracker:
+    """
+    窗口切换/状态变化判断逻辑
+    与平台无关：后端（事件钩子、轮询或模拟）把每次观察到的前台窗口快照
+    交给 observe()，由这里决定记录窗口切换、状态变化，以及为上一个窗口补记最终状态
+    """
+
+    def __init__(self, log_event, on_switch=None, on_publish=None, final_state_lookup=None,
+                 is_paused=None):
+        self.log_event = log_event                    # 记录事件，参数为 (窗口快照, 操作详情)
+        self.on_switch = on_switch                    # 切换到实际窗口时回调（如截图）
+        self.on_publish = on_publish                  # 每次观察到新快照时回调（供钩子读取）
+        self.final_state_lookup = final_state_lookup  # 查询某窗口句柄当前状态，用于补记
+        self.is_paused = is_paused
+        self.lock = threading.Lock()
+        self.last_window = UNKNOWN_WINDOW             # 上一个窗口的快照
+        self.observations = 0
+
+    def reset(self):
+        """清除上一个窗口记录（出错后避免连续错误）"""
+        with self.lock:
+            self.last_window = UNKNOWN_WINDOW
+
+    def observe(self, window):
+        """处理一次前台窗口观察结果"""
+        if self.is_paused is not None and self.is_paused():
+            return
+        with self.lock:
+            self.observations += 1
+            if self.on_publish is not None:
+                self.on_publish(window)
+
+            last_window = self.last_window
+
+            # 1. 窗口句柄发生变化 (窗口切换)
+            if window.handle != last_window.handle:
+                # 检查上一个窗口的最终状态，与记录的状态不同则补记一条（特别是最小化事件）
+                if last_window.handle and self.final_state_lookup is not None:
+                    try:
+                        final_last_state = self.final_state_lookup(last_window.handle)
+                    except Exception:  # 句柄可能已失效
+                        final_last_state = None
+                    if final_last_state and final_last_state != last_window.state:
+                        self.log_event(last_window.with_state(final_last_state), f"窗口-状态：{final_last_state}")
+
+                # 仅在切换到实际窗口时截图
+                if window.title and window.title != DESKTOP_TITLE and self.on_switch is not None:
+                    self.on_switch(window)
+
+                # 记录新窗口的信息（无标题的窗口也记录，桌面除外）
+                if window.title != DESKTOP_TITLE:
+                    self.log_event(window, f"窗口-切换至：{window.title}")
+
+                self.last_window = window
+
+            # 2. 窗口句柄未变，但状态发生变化 (同一窗口状态改变)
+            elif window.handle is not None and window.state != last_window.state:
+                self.log_event(window, f"窗口-状态：{window.state}")
+                self.last_window = window
+
+
+class PollingWindowBackend(EventSource):
+    """
+    轮询后端：定时查询前台窗口（原有的 0.5 秒轮询方式，作为备用）
+    传入共享定时线程(scheduler)时在定时线程中轮询，否则单独开一个轮询线程
+    """
+
+    name = "window_polling"
+
+    def __init__(self, tracker, query, interval=0.5, on_error=None, scheduler=None):
+        self.tracker = tracker
+        self.query = query          # 返回当前前台窗口快照
+        self.interval = interval
+        self.on_error = on_error
+        self.scheduler = scheduler
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.periodic = None
+        self.polls = 0
+
+    def start(self):
+        self.stop_event.clear()
+        if self.scheduler is not None:
+            self.periodic = self.scheduler.call_every(self.interval, self.poll_once, first_delay=0)
+            return
+        self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.periodic is not None:
+            self.periodic.cancel()
+            self.periodic = None
+
+    def is_alive(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def join(self, timeout=None):
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def set_interval(self, interval):
+        """修改轮询间隔（轮询线程在下一次等待时生效）"""
+        self.interval = interval
+        if self.periodic is not None:
+            self.periodic.cancel()
+            self.periodic = self.scheduler.call_every(interval, self.poll_once)
+
+    def poll_once(self):
+        """查询一次前台窗口并交给判断逻辑"""
+        self.polls += 1
+        try:
+            self.tracker.observe(self.query())
+        except Exception as e:
+            if self.on_error:
+                self.on_error(f"窗口监听错误: {str(e)}")
+            self.tracker.reset()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            self.poll_once()
+            self.stop_event.wait(self.interval)
+
+
+class WinEventHookBackend(EventSource):
+    """
+    事件驱动后端（Windows）
+    使用 SetWinEventHook 监听前台窗口切换和最小化/最大化/还原，
+    没有事件时线程阻塞在消息循环中，不会定时唤醒
+    """
+
+    name = "window_winevent"
+
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    EVENT_SYSTEM_MINIMIZESTART = 0x0016
+    EVENT_SYSTEM_MINIMIZEEND = 0x0017
+    EVENT_OBJECT_LOCATIONCHANGE = 0x800B
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    WINEVENT_SKIPOWNPROCESS = 0x0002
+    OBJID_WINDOW = 0
+    WM_QUIT = 0x0012
+
+    def __init__(self, tracker, query, on_error=None):
+        self.tracker = tracker
+        self.query = query
+        self.on_error = on_error
+        self.thread = None
+        self.thread_id = None
+        self.ready = threading.Event()
+        self.started_ok = False
+        self.events_received = 0
+
+    def start(self):
+        """启动消息循环线程并安装钩子，安装失败时抛出 OSError"""
+        self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        self.thread.start()
+        self.ready.wait(5)
+        if not self.started_ok:
+            raise OSError("SetWinEventHook 安装失败")
+
+    def stop(self):
+        if self.thread_id is not None:
+            import ctypes
+            ctypes.windll.user32.PostThreadMessageW(self.thread_id, self.WM_QUIT, 0, 0)
+
+    def is_alive(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def join(self, timeout=None):
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def _observe(self):
+        try:
+            self.tracker.observe(self.query())
+        except Exception as e:
+            if self.on_error:
+                self.on_error(f"窗口监听错误: {str(e)}")
+            self.tracker.reset()
+
+    def run(self):
+        import ctypes
+        from ctypes import wintypes
+
+        user32 = ctypes.windll.user32
+        kernel32 = ctypes.windll.kernel32
+        WinEventProc = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                                          wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+        user32.SetWinEventHook.restype = wintypes.HANDLE
+
+        def callback(hook, event, hwnd, id_object, id_child, thread_id, event_time):
+            # 位置变化事件非常频繁，只关心前台窗口本身（最大化/还原）
+            if event == self.EVENT_OBJECT_LOCATIONCHANGE:
+                if id_object != self.OBJID_WINDOW or hwnd != user32.GetForegroundWindow():
+                    return
+            self.events_received += 1
+            self._observe()
+
+        # 回调对象需保持引用，避免被回收
+        self._callback = WinEventProc(callback)
+        flags = self.WINEVENT_OUTOFCONTEXT | self.WINEVENT_SKIPOWNPROCESS
+        hooks = [
+            user32.SetWinEventHook(self.EVENT_SYSTEM_FOREGROUND, self.EVENT_SYSTEM_FOREGROUND,
+                                   0, self._callback, 0, 0, flags),
+            user32.SetWinEventHook(self.EVENT_SYSTEM_MINIMIZESTART, self.EVENT_SYSTEM_MINIMIZEEND,
+                                   0, self._callback, 0, 0, flags),
+            user32.SetWinEventHook(self.EVENT_OBJECT_LOCATIONCHANGE, self.EVENT_OBJECT_LOCATIONCHANGE,
+                                   0, self._callback, 0, 0, flags),
+        ]
+        self.thread_id = kernel32.GetCurrentThreadId()
+        self.started_ok = all(hooks)
+        if not self.started_ok:
+            for hook in hooks:
+                if hook:
+                    user32.UnhookWinEvent(hook)
+            self.ready.set()
+            return
+        self.ready.set()
+
+        # 启动时先记录一次当前窗口
+        self._observe()
+
+        msg = wintypes.MSG()
+        try:
+            while user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+        finally:
+            for hook in hooks:
+                user32.UnhookWinEvent(hook)
+
+
+class SimulatedDesktop:
+    """
+    模拟桌面：维护若干窗口和前台窗口，供模拟后端和测试/基准测试使用
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.windows = {}          # 句柄 → [标题, 进程名, 状态]
+        self.foreground = None
+        self.listeners = []        # 前台窗口或状态变化时的回调
+        self.last_change = 0.0     # 最近一次变化的 perf_counter 时间
+
+    def add_window(self, handle, title, process_name="未知", state="NORMAL"):
+        with self.lock:
+            self.windows[handle] = [title, process_name, state]
+
+    def switch_to(self, handle):
+        """切换前台窗口"""
+        with self.lock:
+            self.foreground = handle
+            self.last_change = time.perf_counter()
+        self._notify()
+
+    def set_state(self, handle, state):
+        """改变窗口状态"""
+        with self.lock:
+            self.windows[handle][2] = state
+            self.last_change = time.perf_counter()
+        self._notify()
+
+    def _notify(self):
+        for listener in list(self.listeners):
+            listener()
+
+    def query(self):
+        """返回当前前台窗口快照（对应 win32 的 GetForegroundWindow 等查询）"""
+        with self.lock:
+            handle = self.foreground
+            if handle is None or handle not in self.windows:
+                return ForegroundWindow(None, DESKTOP_TITLE, "未知", "NORMAL")
+            title, process_name, state = self.windows[handle]
+            return ForegroundWindow(handle, title, process_name, state)
+
+    def window_state(self, handle):
+        """查询指定窗口的当前状态"""
+        with self.lock:
+            return self.windows[handle][2]
+
+
+class SimulatedWindowBackend(EventSource):
+    """模拟的事件驱动后端：模拟桌面每次变化都立即通知判断逻辑"""
+
+    name = "window_simulated"
+
+    def __init__(self, tracker, desktop):
+        self.tracker = tracker
+        self.desktop = desktop
+        self.running = False
+
+    def _on_change(self):
+        if self.running:
+            self.tracker.observe(self.desktop.query())
+
+    def start(self):
+        self.running = True
+        self.desktop.listeners.append(self._on_change)
+        self._on_change()
+
+    def stop(self):
+        self.running = False
+        if self._on_change in self.desktop.listeners:
+            self.desktop.listeners.remove(self._on_change)